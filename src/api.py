@@ -1,26 +1,71 @@
-from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Request, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
+from pydantic import BaseModel, Field
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import List, Literal, Optional
 import sys
 import os
+import time
 
 root_dir = Path(__file__).resolve().parent.parent
 sys.path.append(str(root_dir))
 
 from src.embeddings.product_embeddings import ProductEmbeddings
+from src.embeddings.bundle import StaleBundleError
+from src.embeddings.filters import SearchFilters
+from src.embeddings.cache import normalize_query
+from src.embeddings.evaluation import batch_metrics_from_mappings
+from src.embeddings.batching import SearchBatcher
+from src.embeddings.product_store import ResultView
+from src.utils.analysis import AnalysisStore
+from src.utils.genai_cache import GenAICache
+from src.utils.startup import BackgroundLoader
+from src.utils.instrumentation import metrics, server_timing_header, stage, start_request
+from src.utils.serialization import dumps, encode_body, parse_fields, project_results
+from src.utils.http_cache import cache_control, entity_digest, etag, if_none_match
 from src.utils.helper import (
     get_graded_relevance,
     graded_recall_at_k,
     graded_average_precision,
     format_results,
-    get_genai_response,
     init_genai
 )
 
 load_dotenv()
-app = FastAPI()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    engine.start()
+    yield
+    await batcher.close()
+    analysis_store.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+SEARCH_CACHE_CONTROL = cache_control(int(os.getenv("SEARCH_CACHE_MAX_AGE", "60")))
+
+
+class ResultsResponse(JSONResponse):
+    """JSONResponse that materializes product result views while encoding and compresses large bodies"""
+
+    def __init__(self, content, accept_encoding: Optional[str] = None, **kwargs):
+        super().__init__(content, **kwargs)
+        self.headers["Vary"] = "Accept-Encoding"
+        body, encoding = encode_body(self.body, accept_encoding, COMPRESS_MIN_BYTES)
+        if encoding is not None:
+            self.body = body
+            self.headers["Content-Encoding"] = encoding
+            self.headers["Content-Length"] = str(len(body))
+
+    def render(self, content) -> bytes:
+        return dumps(content)
 
 app.add_middleware(
     CORSMiddleware,
@@ -30,41 +75,362 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-embedder = ProductEmbeddings()
-embedder.load_products(str(root_dir / "src" / "data" / "shl_products.json"))
 
-index_path = root_dir / "src" / "embeddings" / "products.index"
-if index_path.exists():
-    embedder.load_index(str(index_path))
-else:
-    embedder.generate_embeddings()
-    embedder.save_index(str(index_path))
+# A 503 from /readyz while the engine warms up is the probe working, not an error
+PROBE_ENDPOINTS = frozenset(("/healthz", "/readyz"))
+
+
+async def instrument(request: Request, call_next):
+    timings = start_request()
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    metrics.inc("shl_requests_total", endpoint=path, status=response.status_code)
+    if response.status_code >= 500 and path not in PROBE_ENDPOINTS:
+        metrics.inc("shl_errors_total", endpoint=path)
+    metrics.observe("shl_request_seconds", elapsed, endpoint=path)
+
+    timings["total"] = elapsed
+    response.headers["Server-Timing"] = server_timing_header(timings)
+    return response
+
+
+# Without metrics the middleware is not installed at all, so requests pay nothing for it
+if metrics.enabled:
+    app.middleware("http")(instrument)
+
+catalog_path = root_dir / "src" / "data" / "shl_products.json"
+bundle_path = root_dir / "src" / "embeddings" / "products.bundle"
+
+
+def load_engine(loader: BackgroundLoader) -> ProductEmbeddings:
+    with loader.phase("models"):
+        embedder = ProductEmbeddings(
+            index_type=os.getenv("INDEX_TYPE", "flat"),
+            nprobe=int(os.environ["INDEX_NPROBE"]) if os.getenv("INDEX_NPROBE") else None,
+            ef_search=int(os.environ["INDEX_EF_SEARCH"]) if os.getenv("INDEX_EF_SEARCH") else None,
+            backend=os.getenv("INFERENCE_BACKEND", "torch"),
+            onnx_dir=os.getenv("ONNX_DIR") or None,
+            model_server=os.getenv("MODEL_SERVER") or None,
+            semantic_cache_size=int(os.getenv("SEMANTIC_CACHE_SIZE", "0")),
+            semantic_threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")),
+        )
+
+    try:
+        with loader.phase("index_load"):
+            embedder.load_bundle(str(bundle_path), catalog_path=str(catalog_path))
+    except (FileNotFoundError, StaleBundleError):
+        if os.getenv("MODEL_SERVER"):
+            # The model server owns the shared bundle; workers never rebuild it
+            raise
+        with loader.phase("index_build"):
+            embedder.load_products(str(catalog_path))
+            embedder.generate_embeddings()
+            embedder.save_bundle(str(bundle_path))
+    # Hashes the product store once here rather than on the first request
+    embedder.corpus_version
+
+    if os.getenv("STARTUP_WARMUP", "1") != "0":
+        with loader.phase("warmup"):
+            embedder.warm_up()
+
+    batcher.embedder = embedder
+    return embedder
+
+
+engine = BackgroundLoader(load_engine)
 
 genai_client = init_genai()
+analysis_store = AnalysisStore(
+    max_jobs=int(os.getenv("ANALYSIS_MAX_JOBS", "1000")),
+    max_workers=int(os.getenv("ANALYSIS_WORKERS", "4")),
+    cache=GenAICache(
+        os.getenv("GENAI_CACHE_PATH", str(root_dir / ".cache" / "genai_cache.sqlite3")),
+        memory_size=int(os.getenv("GENAI_CACHE_MEMORY_SIZE", "256")),
+        max_disk_bytes=int(os.getenv("GENAI_CACHE_MAX_MB", "64")) * 1024 * 1024,
+    ),
+)
+
+batcher = SearchBatcher(
+    None,
+    max_batch_size=int(os.getenv("SEARCH_BATCH_MAX_SIZE", "32")),
+    max_wait_ms=float(os.getenv("SEARCH_BATCH_MAX_WAIT_MS", "5")),
+    max_workers=int(os.getenv("SEARCH_WORKERS", "1")),
+)
+
+MAX_BATCH_QUERIES = 500
+
+
+class FilterRequest(BaseModel):
+    test_types: List[str] = []
+    job_levels: List[str] = []
+    languages: List[str] = []
+    remote_testing: Optional[bool] = None
+    min_duration: Optional[float] = None
+    max_duration: Optional[float] = None
+
+
+class BatchSearchRequest(BaseModel):
+    queries: List[str]
+    k: int = Field(5, ge=1)
+    rerank: bool = True
+    candidate_k: Optional[int] = Field(None, ge=1)
+    adaptive: bool = False
+    rerank_budget_ms: Optional[float] = None
+    filters: Optional[FilterRequest] = None
+    mode: Literal["dense", "lexical", "hybrid"] = "dense"
+    semantic_cache: bool = True
+    fields: List[str] = []
+    compact: bool = False
+
+
+def require_engine() -> ProductEmbeddings:
+    if not engine.ready:
+        status = engine.status()
+        detail = f"Search engine is not ready (phase: {status['phase']})"
+        if status["error"]:
+            detail += f": {status['error']}"
+        raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": "5"})
+    return engine.value
+
+
+def check_candidate_k(k: int, candidate_k: Optional[int]):
+    if candidate_k is not None and candidate_k < k:
+        raise HTTPException(status_code=400, detail=f"'candidate_k' ({candidate_k}) must be at least 'k' ({k})")
+
+
+def metric_rows(results):
+    """Only the url and similarity score of each result; product views read the url column, not the product"""
+    rows = []
+    for r in results:
+        if isinstance(r, ResultView):
+            row = {"similarity_score": r.scores.get("similarity_score", 0)}
+            url = r.store.string(r.pos, "url")
+            if url is not None:
+                row["url"] = url
+            rows.append(row)
+        else:
+            rows.append(r)
+    return rows
+
+
+def build_metrics(results, k):
+    results = metric_rows(results)
+    relevance = get_graded_relevance(results)
+    retrieved = [r["url"] for r in results if "url" in r]
+    return {
+        "graded_recall": graded_recall_at_k(relevance, retrieved, k),
+        "average_precision": graded_average_precision(relevance, retrieved, k),
+    }
+
+
+def build_batch_metrics(batch_results, k):
+    """build_metrics for every query of a batch, scored together in one batch_metrics call"""
+    batch_results = [metric_rows(results) for results in batch_results]
+    relevance = [get_graded_relevance(results) for results in batch_results]
+    retrieved = [[r["url"] for r in results if "url" in r] for results in batch_results]
+    scores = batch_metrics_from_mappings(relevance, retrieved, k)
+    return [
+        {"graded_recall": recall, "average_precision": ap}
+        for recall, ap in zip(scores["recall"].tolist(), scores["ap"].tolist())
+    ]
 
 
 @app.get("/search")
-async def search(query: str = None, k: int = 5):
+async def search(
+    request: Request,
+    query: str = None,
+    k: int = Query(5, ge=1),
+    mode: Literal["dense", "lexical", "hybrid"] = "dense",
+    rerank: bool = True,
+    candidate_k: Optional[int] = Query(None, ge=1),
+    adaptive: bool = False,
+    rerank_budget_ms: Optional[float] = None,
+    analysis: bool = True,
+    test_type: List[str] = Query(None),
+    job_level: List[str] = Query(None),
+    language: List[str] = Query(None),
+    remote: Optional[bool] = None,
+    min_duration: Optional[float] = None,
+    max_duration: Optional[float] = None,
+    semantic_cache: bool = True,
+    fields: List[str] = Query(None),
+    compact: bool = False,
+):
     if not query:
         raise HTTPException(status_code=400, detail="Missing 'query' parameter")
+    check_candidate_k(k, candidate_k)
+    embedder = require_engine()
 
-    try:
-        results = embedder.search(query, k=k)
-        relevance = get_graded_relevance(results)
-        retrieved = [r["url"] for r in results if "url" in r]
+    filters = SearchFilters.create(
+        test_types=[v for item in test_type or [] for v in item.split(",")],
+        job_levels=[v for item in job_level or [] for v in item.split(",")],
+        languages=[v for item in language or [] for v in item.split(",")],
+        remote_testing=remote,
+        min_duration=min_duration,
+        max_duration=max_duration,
+    )
+    fields = parse_fields(fields)
+    with_analysis = bool(genai_client and analysis)
 
-        response = {
-            "results": results,
-            "graded_recall": graded_recall_at_k(relevance, retrieved, k),
-            "average_precision": graded_average_precision(relevance, retrieved, k),
-        }
+    def request_digest(text: str) -> str:
+        # Everything the body depends on; the corpus version changes whenever the index is rebuilt or reloaded
+        return entity_digest(embedder.corpus_version, normalize_query(text), k, mode, rerank, candidate_k,
+                             adaptive, rerank_budget_ms, filters, fields, compact, with_analysis, semantic_cache)
+
+    digest = request_digest(query)
+    # The body is only equivalent, not byte-identical, when it may come from a similar query's cached results
+    # or when the rerank depth depends on the running latency estimate
+    weak = rerank_budget_ms is not None or (semantic_cache and embedder.semantic_cache.enabled and mode != "lexical")
+    cache_headers = {"Cache-Control": SEARCH_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    matched = if_none_match(request.headers.get("if-none-match"), digest, weak)
+    if matched is not None:
+        return Response(status_code=304, headers={"ETag": matched, **cache_headers})
 
-        if genai_client:
-            response["ai_analysis"] = get_genai_response(
-                genai_client, format_results(results, query), query
+    try:
+        with stage("search"):
+            results, rerank_info = await batcher.search(
+                query,
+                k=k,
+                rerank=rerank,
+                candidate_k=candidate_k,
+                adaptive=adaptive,
+                rerank_budget_ms=rerank_budget_ms,
+                filters=filters,
+                mode=mode,
+                semantic_cache=semantic_cache,
             )
+        semantic_match = rerank_info.get("semantic_match")
+        with stage("metrics"):
+            response = {
+                "results": project_results(results, fields, compact),
+                "rerank": rerank_info,
+                **build_metrics(results, k),
+            }
+
+        if with_analysis:
+            # A near-duplicate query reuses the analysis of the query whose results it was given
+            analysis_query = semantic_match["query"] if semantic_match else query
+            with stage("format_results"):
+                formatted = format_results(results, analysis_query)
+            # Keyed by the ETag digest, so a repeated request gets the same job and the same body
+            job = analysis_store.submit(genai_client, formatted, analysis_query,
+                                        job_id=request_digest(analysis_query))
+            response["analysis_id"] = job.id
+            response["analysis_url"] = f"/analysis/{job.id}"
+
+        with stage("serialize"):
+            encoded = ResultsResponse(content=response, accept_encoding=request.headers.get("accept-encoding"))
+        encoded.headers.update(cache_headers)
+        encoded.headers["ETag"] = etag(digest, encoded.headers.get("content-encoding"), weak=weak)
+        return encoded
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 
-        return JSONResponse(content=response)
+@app.post("/search/batch")
+async def search_batch(request: BatchSearchRequest, http_request: Request):
+    queries = [q for q in request.queries if q and q.strip()]
+    if not queries:
+        raise HTTPException(status_code=400, detail="Missing 'queries' in request body")
+    if len(queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_QUERIES} queries per batch"
+        )
+    check_candidate_k(request.k, request.candidate_k)
+    require_engine()
+
+    try:
+        batch_results = await batcher.search_many(
+            queries,
+            k=request.k,
+            rerank=request.rerank,
+            candidate_k=request.candidate_k,
+            adaptive=request.adaptive,
+            rerank_budget_ms=request.rerank_budget_ms,
+            filters=SearchFilters.create(**request.filters.dict()) if request.filters else None,
+            mode=request.mode,
+            semantic_cache=request.semantic_cache,
+        )
+        fields = parse_fields(request.fields)
+        with stage("metrics"):
+            batch_metrics = build_batch_metrics([results for results, _ in batch_results], request.k)
+        response = {
+            "results": [
+                {
+                    "query": query,
+                    "results": project_results(results, fields, request.compact),
+                    "rerank": rerank_info,
+                    **query_metrics,
+                }
+                for query, (results, rerank_info), query_metrics in zip(queries, batch_results, batch_metrics)
+            ]
+        }
+        with stage("serialize"):
+            return ResultsResponse(content=response,
+                                   accept_encoding=http_request.headers.get("accept-encoding"))
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def get_analysis_job(analysis_id: str):
+    job = analysis_store.get(analysis_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired analysis id")
+    return job
+
+
+@app.get("/analysis/{analysis_id}")
+async def get_analysis(analysis_id: str):
+    return JSONResponse(content=get_analysis_job(analysis_id).to_dict())
+
+
+@app.get("/analysis/{analysis_id}/stream")
+async def stream_analysis(analysis_id: str):
+    job = get_analysis_job(analysis_id)
+    return StreamingResponse(
+        analysis_store.stream(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@app.get("/stats")
+async def stats():
+    return JSONResponse(content={
+        "search_cache": engine.value.cache_stats() if engine.ready else None,
+        "genai_cache": analysis_store.cache.stats(),
+        "startup": engine.status(),
+    })
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS_ENABLED=0)")
+    if engine.ready:
+        cache_stats = engine.value.cache_stats()
+        for name in ("query_embeddings", "results", "semantic"):
+            metrics.set_total("shl_cache_hits_total", cache_stats[name]["hits"], cache=name)
+            metrics.set_total("shl_cache_misses_total", cache_stats[name]["misses"], cache=name)
+    genai_stats = analysis_store.cache.stats()
+    metrics.set_total("shl_cache_hits_total", genai_stats["memory_hits"] + genai_stats["disk_hits"], cache="genai")
+    metrics.set_total("shl_cache_misses_total", genai_stats["misses"], cache="genai")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    status = engine.status()
+    return JSONResponse(content=status, status_code=200 if status["ready"] else 503)
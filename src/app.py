@@ -14,6 +14,8 @@ try:
     src_path = project_root / "src"
     sys.path.append(str(project_root))
     from src.embeddings.product_embeddings import ProductEmbeddings
+    from src.embeddings.bundle import StaleBundleError
+    from src.embeddings.evaluation import graded_recall_at_k, average_precision_at_k as graded_average_precision
 except ImportError:
     st.error("Failed to import ProductEmbeddings. Please ensure src/embeddings/product_embeddings.py exists.")
     st.stop()
@@ -29,32 +31,6 @@ def get_graded_relevance(results: List[dict]) -> Dict[str, float]:
     max_score = max(r.get('similarity_score', 0) for r in results) or 1
     return {r['url']: (r.get('similarity_score', 0) / max_score) ** 2 for r in results if 'url' in r}
 
-def graded_recall_at_k(relevant_scores: Dict[str, float], retrieved: List[str], k: int) -> float:
-    """Calculate recall where items contribute proportionally to relevance"""
-    top_k = retrieved[:k]
-    total_relevance = sum(relevant_scores.values())
-    if total_relevance == 0:
-        return 0.0
-    retrieved_relevance = sum(relevant_scores.get(url, 0) for url in top_k)
-    return retrieved_relevance / total_relevance
-
-def graded_average_precision(relevant_scores: Dict[str, float], retrieved: List[str], k: int) -> float:
-    """Calculate graded average precision"""
-    hits = 0
-    sum_precisions = 0.0
-    total_relevant = sum(1 for score in relevant_scores.values() if score > 0)
-    
-    if total_relevant == 0:
-        return 0.0
-    
-    for i, item in enumerate(retrieved[:k], 1):
-        if item in relevant_scores and relevant_scores[item] > 0:
-            hits += 1
-            precision = hits / i
-            sum_precisions += precision * relevant_scores[item]
-            
-    return sum_precisions / min(total_relevant, k)
-
 def init_genai():
     """Initialize Genai client"""
     try:
@@ -122,15 +98,14 @@ def main():
     try:
         embedder = ProductEmbeddings()
         products_path = src_path / "data" / "shl_products.json"
-        embedder.load_products(str(products_path))
-        
-        index_path = src_path / "embeddings" / "products.index"
-        if index_path.exists():
-            embedder.load_index(str(index_path))
-        else:
+        bundle_path = src_path / "embeddings" / "products.bundle"
+        try:
+            embedder.load_bundle(str(bundle_path), catalog_path=str(products_path))
+        except (FileNotFoundError, StaleBundleError):
             with st.spinner("Generating embeddings..."):
+                embedder.load_products(str(products_path))
                 embedder.generate_embeddings()
-                embedder.save_index(str(index_path))
+                embedder.save_bundle(str(bundle_path))
                 
         genai_client = init_genai()
     except Exception as e:
@@ -0,0 +1,98 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(root_dir))
+
+from src.embeddings.indexes import INDEX_TYPES, add_vectors, build_index, index_kind, set_search_params
+
+
+def synthetic_vectors(n: int, dimension: int, seed: int = 0, clusters: int = 256) -> np.ndarray:
+    """Clustered unit vectors, closer to sentence embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype('float32')
+    vectors = np.empty((n, dimension), dtype='float32')
+    for start in range(0, n, 100_000):
+        stop = min(start + 100_000, n)
+        assignment = rng.integers(0, clusters, stop - start)
+        vectors[start:stop] = centers[assignment] + 0.6 * rng.standard_normal((stop - start, dimension)).astype('float32')
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 4)
+
+
+def bench_index(index_type, vectors, queries, truth, k, nprobe, ef_search):
+    ids = np.arange(len(vectors), dtype='int64')
+    start = time.perf_counter()
+    index = build_index(index_type, vectors.shape[1], len(vectors))
+    add_vectors(index, vectors, ids)
+    build_s = time.perf_counter() - start
+    set_search_params(index, nprobe=nprobe, ef_search=ef_search)
+
+    latencies = []
+    found = np.empty((len(queries), k), dtype='int64')
+    for i, query in enumerate(queries):
+        t0 = time.perf_counter()
+        _, found[i] = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - t0)
+
+    recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)]) if truth is not None else 1.0
+    return {
+        'index_type': index_type,
+        'built_as': index_kind(index),
+        'recall@k': round(float(recall), 4),
+        'p50_ms': percentile_ms(latencies, 50),
+        'p99_ms': percentile_ms(latencies, 99),
+        'build_s': round(build_s, 3),
+        'memory_mb': round(faiss.serialize_index(index).nbytes / 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall, latency, build time and memory of ANN index types vs flat")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--dim', type=int, default=768)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--nprobe', type=int, default=16)
+    parser.add_argument('--ef-search', type=int, default=128)
+    parser.add_argument('--types', nargs='+', default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    parser.add_argument('--output', help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    report = []
+    for n in args.sizes:
+        vectors = synthetic_vectors(n, args.dim)
+        queries = synthetic_vectors(args.queries, args.dim, seed=1)
+
+        exact = faiss.IndexFlatIP(args.dim)
+        exact.add(vectors)
+        _, truth = exact.search(queries, args.k)
+        del exact
+
+        for index_type in args.types:
+            row = {'n': n, 'dim': args.dim, **bench_index(index_type, vectors, queries, truth, args.k,
+                                                            args.nprobe, args.ef_search)}
+            report.append(row)
+            print(f"n={n:<8} {index_type:<9} recall@{args.k}={row['recall@k']:.3f} "
+                  f"p50={row['p50_ms']:.3f}ms p99={row['p99_ms']:.3f}ms "
+                  f"build={row['build_s']:.2f}s mem={row['memory_mb']:.1f}MB")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
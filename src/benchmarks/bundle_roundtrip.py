@@ -0,0 +1,116 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(root_dir))
+
+from src.benchmarks.synthetic_catalog import iter_catalog, synthetic_product
+from src.embeddings.bundle import read_manifest
+from src.embeddings.catalog import write_jsonl
+from src.embeddings.indexes import INDEX_TYPES, resolve_index_type
+from src.embeddings.product_embeddings import ProductEmbeddings, product_id
+
+# ivf_pq needs this many vectors to train; smaller catalogs fall back to a simpler index type
+DEFAULT_SIZE = 12_000
+
+
+def open_bundle(index_type: str, bundle: str) -> ProductEmbeddings:
+    embedder = ProductEmbeddings(backend='stub', index_type=index_type, cache_size=1, nprobe=64, ef_search=256)
+    embedder.load_bundle(bundle)
+    return embedder
+
+
+def check(index_type: str, catalog: str, workdir: str) -> Dict:
+    """Build, save, load, update, save and load the bundle again, then check what the last load holds"""
+    bundle = os.path.join(workdir, f'{index_type}.bundle')
+    timings = {}
+    start = time.perf_counter()
+    embedder = ProductEmbeddings(backend='stub', index_type=index_type, cache_size=1)
+    embedder.load_products(catalog)
+    embedder.generate_embeddings()
+    embedder.save_bundle(bundle)
+    timings['build_s'] = time.perf_counter() - start
+    size = len(embedder.products)
+
+    start = time.perf_counter()
+    embedder = open_bundle(index_type, bundle)
+    changed = dict(embedder.products[0])
+    changed['description'] += ' Now also covers forklift safety.'
+    added = synthetic_product(size, random.Random(size))
+    removed = embedder.products[1]['url']
+    upserted = embedder.upsert_products([changed, added])
+    embedder.remove_products([removed])
+    embedder.save_bundle(bundle)
+    timings['update_s'] = time.perf_counter() - start
+
+    embedder = open_bundle(index_type, bundle)
+    manifest = read_manifest(bundle)
+    errors: List[str] = []
+    expected_kind = resolve_index_type(index_type, size)
+    if manifest['index_kind'] != expected_kind:
+        errors.append(f"index kind {manifest['index_kind']}, expected {expected_kind}")
+    if embedder.index.ntotal != size or len(embedder.products) != size:
+        errors.append(f"{embedder.index.ntotal} vectors and {len(embedder.products)} products, expected {size}")
+    if upserted['added'] != 1 or upserted['updated'] != 1:
+        errors.append(f"upsert reported {upserted}")
+    # Approximate indexes need not rank a product first for its own text, but it must be retrievable
+    for product in (changed, added):
+        urls = [r['url'] for r in embedder.search(embedder.create_product_text(product), k=10, rerank=False)]
+        if product['url'] not in urls:
+            errors.append(f"{product['url']} not retrieved by its own text")
+    if product_id({'url': removed}) in embedder.id_to_pos:
+        errors.append(f"{removed} still in the bundle")
+    if embedder.products[embedder.id_to_pos[product_id(changed)]]['description'] != changed['description']:
+        errors.append("updated description not saved")
+    return {'index_type': index_type, 'index_kind': manifest['index_kind'], 'size': size,
+            **{key: round(value, 3) for key, value in timings.items()}, 'errors': errors}
+
+
+def run_check(index_type: str, catalog: str, workdir: str) -> Dict:
+    # One process per index type, so a crash while loading a broken bundle is reported rather than fatal
+    result = subprocess.run([sys.executable, __file__, '--check', index_type, catalog, workdir],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return {'index_type': index_type, 'errors': [f"exit code {result.returncode}: {result.stderr[-500:]}"]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load, update, save and reload an index bundle of every index type")
+    parser.add_argument('--index-types', nargs='+', default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    parser.add_argument('--size', type=int, default=DEFAULT_SIZE)
+    parser.add_argument('--output', help="Write the report as JSON to this path")
+    parser.add_argument('--check', nargs=3, metavar=('INDEX_TYPE', 'CATALOG', 'WORKDIR'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.check:
+        print(json.dumps(check(*args.check)))
+        return
+
+    report = []
+    with tempfile.TemporaryDirectory() as workdir:
+        catalog = os.path.join(workdir, 'catalog.jsonl')
+        write_jsonl(iter_catalog(args.size), catalog)
+        for index_type in args.index_types:
+            row = run_check(index_type, catalog, workdir)
+            report.append(row)
+            status = 'ok' if not row['errors'] else 'FAILED: ' + '; '.join(row['errors'])
+            print(f"{index_type:<9} {row.get('index_kind', '?'):<9} {status}", flush=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if any(row['errors'] for row in report):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
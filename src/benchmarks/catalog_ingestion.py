@@ -0,0 +1,115 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(root_dir))
+
+from src.benchmarks.synthetic_catalog import iter_catalog
+from src.embeddings.catalog import CatalogTexts, iter_products, write_jsonl
+from src.embeddings.product_embeddings import ProductEmbeddings
+
+READERS = ('json_load', 'stream_json_array', 'stream_jsonl', 'jsonl_text_index', 'load_products',
+           'load_products_dicts')
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def write_json_array(n: int, seed: int, path: str):
+    # Indented like the scraper output, written one product at a time so the benchmark itself stays small
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[\n')
+        for i, product in enumerate(iter_catalog(n, seed)):
+            if i:
+                f.write(',\n')
+            f.write(json.dumps(product, indent=2, ensure_ascii=False))
+        f.write('\n]')
+
+
+def measure(reader: str, path: str) -> Dict:
+    """Run one reader over a catalog in this (fresh) process"""
+    embedder = ProductEmbeddings(backend='stub', cache_size=1) if reader.startswith('load_products') else None
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if reader == 'load_products':
+        embedder.load_products(path)
+        count = len(embedder.products)
+    elif reader == 'load_products_dicts':
+        # What load_products did before streaming into the store: every product dict alive at once
+        embedder._set_products(list(iter_products(path)))
+        count = len(embedder.products)
+    elif reader == 'json_load':
+        with open(path, 'r', encoding='utf-8') as f:
+            count = len(json.load(f))
+    elif reader in ('stream_json_array', 'stream_jsonl'):
+        count = sum(1 for _ in iter_products(path))
+    else:
+        # The embedding build's first pass: offsets for every line, then every text once for its length
+        texts = CatalogTexts(path, ProductEmbeddings.create_product_text)
+        sum(len(texts[i]) for i in range(len(texts)))
+        count = len(texts)
+        texts.close()
+    return {
+        'count': count,
+        'seconds': round(time.perf_counter() - start, 3),
+        'peak_rss_mb': peak_rss_mb(),
+        'baseline_rss_mb': baseline,
+    }
+
+
+def run_reader(reader: str, path: str) -> Dict:
+    output = subprocess.run([sys.executable, __file__, '--measure', reader, path], capture_output=True, text=True,
+                            check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak RSS of catalog readers at growing catalog sizes")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--readers', nargs='+', default=list(READERS), choices=READERS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', help="Where to write the synthetic catalogs (default: a temporary directory)")
+    parser.add_argument('--output', help="Write the report as JSON to this path")
+    parser.add_argument('--measure', nargs=2, metavar=('READER', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(*args.measure)))
+        return
+
+    runs = []
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        for n in args.sizes:
+            array_path = os.path.join(workdir, f'catalog_{n}.json')
+            jsonl_path = os.path.join(workdir, f'catalog_{n}.jsonl')
+            write_json_array(n, args.seed, array_path)
+            write_jsonl(iter_catalog(n, args.seed), jsonl_path)
+            run = {'size': n, 'json_mb': round(os.path.getsize(array_path) / 2 ** 20, 1),
+                   'jsonl_mb': round(os.path.getsize(jsonl_path) / 2 ** 20, 1), 'readers': {}}
+            for reader in args.readers:
+                path = jsonl_path if reader in ('stream_jsonl', 'jsonl_text_index') else array_path
+                row = run['readers'][reader] = run_reader(reader, path)
+                print(f"n={n:<8} {reader:<19} {row['seconds']:>8.2f}s peak_rss={row['peak_rss_mb']:>7.1f}MB "
+                      f"(interpreter {row['baseline_rss_mb']:.1f}MB)", flush=True)
+            runs.append(run)
+
+    report = {'args': {k: v for k, v in vars(args).items() if k != 'measure'}, 'runs': runs}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
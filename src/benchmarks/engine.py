@@ -0,0 +1,145 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(root_dir))
+
+from src.benchmarks.synthetic_catalog import generate_catalog, synthetic_queries
+from src.embeddings.backends import BACKENDS
+from src.embeddings.product_embeddings import ProductEmbeddings
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def timed(fn: Callable, *args, **kwargs) -> Dict:
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return {'seconds': round(time.perf_counter() - start, 4), 'peak_rss_mb': peak_rss_mb()}
+
+
+def latency(fn: Callable, items: List) -> Dict:
+    samples = []
+    start = time.perf_counter()
+    for item in items:
+        t0 = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - t0)
+    total = time.perf_counter() - start
+    samples = np.array(samples) * 1000
+    return {
+        'count': len(items),
+        'p50_ms': round(float(np.percentile(samples, 50)), 4),
+        'p95_ms': round(float(np.percentile(samples, 95)), 4),
+        'p99_ms': round(float(np.percentile(samples, 99)), 4),
+        'mean_ms': round(float(samples.mean()), 4),
+        'per_s': round(len(items) / total, 1),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root_dir, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def bench_size(embedder: ProductEmbeddings, n: int, args, workdir: str) -> Dict:
+    catalog_path = os.path.join(workdir, f'catalog_{n}.json')
+    bundle_path = os.path.join(workdir, f'bundle_{n}')
+    with open(catalog_path, 'w', encoding='utf-8') as f:
+        json.dump(generate_catalog(n, args.seed), f)
+    with open(catalog_path, 'r', encoding='utf-8') as f:
+        products = json.load(f)
+
+    stages = {}
+    stages['create_product_text'] = latency(ProductEmbeddings.create_product_text, products)
+    stages['load_products'] = timed(embedder.load_products, catalog_path)
+    stages['generate_embeddings'] = timed(embedder.generate_embeddings)
+    stages['generate_embeddings']['products_per_s'] = round(n / stages['generate_embeddings']['seconds'], 1)
+    stages['save_bundle'] = timed(embedder.save_bundle, bundle_path)
+    stages['load_bundle'] = timed(embedder.load_bundle, bundle_path, catalog_path)
+
+    # Unique queries per stage so neither the query-embedding nor the result cache is hit
+    queries = iter(synthetic_queries(args.queries * 3 + args.batches * args.batch_size, args.seed + 1))
+    embedder.warm_up()
+    stages['search'] = latency(lambda q: embedder.search(q, k=args.k, rerank=False),
+                               [next(queries) for _ in range(args.queries)])
+    stages['search_rerank'] = latency(lambda q: embedder.search(q, k=args.k, candidate_k=args.candidate_k),
+                                      [next(queries) for _ in range(args.queries)])
+    stages['search_hybrid'] = latency(lambda q: embedder.search(q, k=args.k, rerank=False, mode='hybrid'),
+                                      [next(queries) for _ in range(args.queries)])
+    batches = [[next(queries) for _ in range(args.batch_size)] for _ in range(args.batches)]
+    stages['search_batch'] = latency(lambda batch: embedder.search_batch(batch, k=args.k, rerank=False), batches)
+    stages['search_batch']['queries_per_s'] = round(stages['search_batch']['per_s'] * args.batch_size, 1)
+
+    return {'size': n, 'stages': stages}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time ProductEmbeddings stages on synthetic catalogs")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000])
+    parser.add_argument('--backend', default='stub', choices=BACKENDS,
+                        help="'stub' needs no model download; use torch with --model for a small local model")
+    parser.add_argument('--model', default='multi-qa-mpnet-base-dot-v1')
+    parser.add_argument('--reranker', default='cross-encoder/ms-marco-MiniLM-L-6-v2')
+    parser.add_argument('--index-type', default='flat')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--batches', type=int, default=10)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--candidate-k', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    embedder = ProductEmbeddings(args.model, args.reranker, backend=args.backend, index_type=args.index_type)
+    model_load = {'seconds': round(time.perf_counter() - start, 4), 'peak_rss_mb': peak_rss_mb()}
+
+    runs = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in args.sizes:
+            run = bench_size(embedder, n, args, workdir)
+            runs.append(run)
+            for stage, row in run['stages'].items():
+                summary = f"{row['seconds']:.3f}s" if 'seconds' in row else \
+                    f"p50={row['p50_ms']:.3f}ms p99={row['p99_ms']:.3f}ms {row['per_s']:.0f}/s"
+                print(f"n={n:<8} {stage:<20} {summary} peak_rss={row['peak_rss_mb']:.0f}MB")
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'args': vars(args),
+            'model_load': model_load,
+        },
+        'runs': runs,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
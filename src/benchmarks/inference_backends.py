@@ -0,0 +1,102 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(root_dir))
+
+from src.embeddings.backends import BACKENDS, DEFAULT_MODEL, DEFAULT_ONNX_DIR, DEFAULT_RERANKER, PARITY_QUERIES, load_models
+from src.embeddings.product_embeddings import ProductEmbeddings
+from src.embeddings.reranking import PretokenizedReranker
+
+
+def percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 3)
+
+
+def bench_backend(backend, args, texts):
+    start = time.perf_counter()
+    encoder, cross_encoder = load_models(backend, args.model, args.reranker, args.onnx_dir)
+    load_s = time.perf_counter() - start
+
+    reranker = PretokenizedReranker(cross_encoder)
+    reranker.set_corpus(texts)
+    doc_vectors = encoder.encode(texts[:args.candidates])
+    queries = [PARITY_QUERIES[i % len(PARITY_QUERIES)] for i in range(args.queries)]
+    for query in queries[:3]:
+        encoder.encode([query])
+        reranker.predict([(query, i) for i in range(args.candidates)])
+
+    encode_times, rerank_times = [], []
+    for query in queries:
+        t0 = time.perf_counter()
+        vector = encoder.encode([query])[0]
+        encode_times.append(time.perf_counter() - t0)
+        pool = np.argsort(-(doc_vectors @ vector))
+        t0 = time.perf_counter()
+        reranker.predict([(query, int(i)) for i in pool])
+        rerank_times.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    encoder.encode(texts, batch_size=args.batch_size)
+    encode_throughput = len(texts) / (time.perf_counter() - t0)
+
+    pairs = [(queries[i % len(queries)], i % len(texts)) for i in range(args.rerank_pairs)]
+    t0 = time.perf_counter()
+    reranker.predict(pairs)
+    rerank_throughput = len(pairs) / (time.perf_counter() - t0)
+
+    return {
+        'backend': backend,
+        'load_s': round(load_s, 3),
+        'encode_p50_ms': percentile_ms(encode_times, 50),
+        'encode_p99_ms': percentile_ms(encode_times, 99),
+        f'rerank{args.candidates}_p50_ms': percentile_ms(rerank_times, 50),
+        f'rerank{args.candidates}_p99_ms': percentile_ms(rerank_times, 99),
+        'encode_texts_per_s': round(encode_throughput, 1),
+        'rerank_pairs_per_s': round(rerank_throughput, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-query latency and batch throughput of the inference backends")
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--reranker', default=DEFAULT_RERANKER)
+    parser.add_argument('--onnx-dir', default=DEFAULT_ONNX_DIR)
+    parser.add_argument('--catalog', default=str(root_dir / 'src' / 'data' / 'shl_products.json'))
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--candidates', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--rerank-pairs', type=int, default=512)
+    parser.add_argument('--output', help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    with open(args.catalog, 'r', encoding='utf-8') as f:
+        texts = [ProductEmbeddings.create_product_text(p) for p in json.load(f)]
+
+    report = []
+    for backend in args.backends:
+        try:
+            row = bench_backend(backend, args, texts)
+        except FileNotFoundError as e:
+            print(f"{backend:<10} skipped: {e}")
+            continue
+        report.append(row)
+        print(f"{backend:<10} encode p50={row['encode_p50_ms']:.2f}ms "
+              f"rerank@{args.candidates} p50={row[f'rerank{args.candidates}_p50_ms']:.2f}ms "
+              f"encode={row['encode_texts_per_s']:.0f} texts/s rerank={row['rerank_pairs_per_s']:.0f} pairs/s")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
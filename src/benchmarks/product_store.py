@@ -0,0 +1,129 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict
+
+import numpy as np
+
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(root_dir))
+
+from src.benchmarks.synthetic_catalog import generate_catalog
+from src.embeddings.product_store import ProductStore, json_default
+
+
+def traced_mb(fn: Callable):
+    """(result, Python heap MB held by the result) for a loader"""
+    tracemalloc.start()
+    result = fn()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, round(current / 2 ** 20, 2)
+
+
+def per_call_us(fn: Callable, items, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, time.perf_counter() - start)
+    return round(best / len(items) * 1e6, 3)
+
+
+def bench_size(n: int, args, workdir: str) -> Dict:
+    json_path = os.path.join(workdir, f'products_{n}.json')
+    store_path = os.path.join(workdir, f'products_{n}.store')
+    products = generate_catalog(n, args.seed)
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(products, f, ensure_ascii=False)
+    ProductStore.from_products(products).save(store_path)
+    del products
+
+    def load_dicts():
+        with open(json_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    start = time.perf_counter()
+    dicts, dicts_mb = traced_mb(load_dicts)
+    dicts_load_s = time.perf_counter() - start
+    start = time.perf_counter()
+    store, store_heap_mb = traced_mb(lambda: ProductStore.open(store_path))
+    store_load_s = time.perf_counter() - start
+
+    # One search response worth of hits: positions plus fresh score dicts, as _retrieve produces them
+    rng = np.random.default_rng(args.seed)
+    hits = [[(int(pos), {'similarity_score': 0.5}) for pos in rng.integers(0, n, args.k)]
+            for _ in range(args.queries)]
+
+    def dict_results(row):
+        results = []
+        for pos, scores in row:
+            result = dicts[pos].copy()
+            result.update(scores)
+            results.append(result)
+        return [dict(r) for r in results]
+
+    def view_results(row):
+        return [store.view(pos, dict(scores)).copy() for pos, scores in row]
+
+    dict_rows = [dict_results(row) for row in hits]
+    view_rows = [view_results(row) for row in hits]
+    identical = json.dumps(dict_rows) == json.dumps(view_rows, default=json_default)
+
+    return {
+        'size': n,
+        'identical_json': identical,
+        'memory': {
+            'dicts_heap_mb': dicts_mb,
+            'store_heap_mb': store_heap_mb,
+            'store_file_mb': round(os.path.getsize(store_path) / 2 ** 20, 2),
+            'json_file_mb': round(os.path.getsize(json_path) / 2 ** 20, 2),
+        },
+        'load_s': {'json_load': round(dicts_load_s, 4), 'store_open': round(store_load_s, 4)},
+        'per_query_us': {
+            'build_results_dicts': per_call_us(dict_results, hits),
+            'build_results_views': per_call_us(view_results, hits),
+            'serialize_dicts': per_call_us(json.dumps, dict_rows),
+            'serialize_views': per_call_us(lambda row: json.dumps(row, default=json_default), view_rows),
+            'metrics_fields_dicts': per_call_us(lambda row: [(r['url'], r['similarity_score']) for r in row],
+                                                dict_rows),
+            'metrics_fields_views': per_call_us(lambda row: [(r['url'], r['similarity_score']) for r in row],
+                                                view_rows),
+            # What build_metrics reads: the url column and the score dict, without going through the Mapping
+            'metrics_fields_columns': per_call_us(
+                lambda row: [(r.store.string(r.pos, 'url'), r.scores['similarity_score']) for r in row], view_rows),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List-of-dicts products vs the columnar ProductStore")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    runs = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in args.sizes:
+            run = bench_size(n, args, workdir)
+            runs.append(run)
+            print(json.dumps(run, indent=2), flush=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'runs': runs}, f, indent=2)
+    if not all(run['identical_json'] for run in runs):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
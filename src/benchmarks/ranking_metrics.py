@@ -0,0 +1,107 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(root_dir))
+
+from src.embeddings.evaluation import batch_metrics, batch_metrics_from_mappings, gains_from_ids
+
+
+def reference_recall(relevant_scores, retrieved, k):
+    # The per-query loop the vectorized metrics replaced
+    top_k = retrieved[:k]
+    total_relevance = sum(relevant_scores.values())
+    if total_relevance == 0:
+        return 0.0
+    retrieved_relevance = sum(relevant_scores.get(url, 0) for url in top_k)
+    return retrieved_relevance / total_relevance
+
+
+def reference_average_precision(relevant_scores, retrieved, k):
+    hits = 0
+    sum_precisions = 0.0
+    total_relevant = sum(1 for score in relevant_scores.values() if score > 0)
+    if total_relevant == 0:
+        return 0.0
+    for i, item in enumerate(retrieved[:k], 1):
+        if item in relevant_scores and relevant_scores[item] > 0:
+            hits += 1
+            precision = hits / i
+            sum_precisions += precision * relevant_scores[item]
+    return sum_precisions / min(total_relevant, k)
+
+
+def synthetic_judgments(num_queries: int, num_items: int, k: int, max_relevant: int = 10, seed: int = 0):
+    """Judged item ids and graded scores [Q, R] (-1 padded) and rankings [Q, k] that favour judged items"""
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(0, max_relevant + 1, num_queries)
+    relevant_ids = np.full((num_queries, max_relevant), -1, dtype='int64')
+    relevant_scores = np.zeros((num_queries, max_relevant), dtype='float64')
+    ranked = np.empty((num_queries, k), dtype='int64')
+    for q in range(num_queries):
+        items = rng.choice(num_items, counts[q] + k, replace=False)
+        relevant_ids[q, :counts[q]] = items[:counts[q]]
+        relevant_scores[q, :counts[q]] = rng.choice([0.25, 0.5, 1.0], counts[q]) * rng.uniform(0.5, 1.0, counts[q])
+        # Judged items get a head start, so rankings are better than random but not perfect
+        ranked[q] = items[np.argsort(rng.random(len(items)) - 0.5 * (np.arange(len(items)) < counts[q]))[:k]]
+    ranked[rng.random(num_queries) < 0.05, k // 2:] = -1
+    return relevant_ids, relevant_scores, ranked
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized ranking metrics vs the per-query Python loops")
+    parser.add_argument('--queries', type=int, default=100_000)
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--output', help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    relevant_ids, relevant_scores, ranked = synthetic_judgments(args.queries, args.items, args.k)
+    mappings = [{f'item_{i}': float(score) for i, score in zip(ids, scores) if i >= 0}
+                for ids, scores in zip(relevant_ids, relevant_scores)]
+    retrieved = [[f'item_{i}' for i in row if i >= 0] for row in ranked]
+
+    start = time.perf_counter()
+    reference = {
+        'recall': np.array([reference_recall(m, r, args.k) for m, r in zip(mappings, retrieved)]),
+        'ap': np.array([reference_average_precision(m, r, args.k) for m, r in zip(mappings, retrieved)]),
+    }
+    loop_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    from_mappings = batch_metrics_from_mappings(mappings, retrieved, args.k)
+    mappings_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    from_ids = batch_metrics(*gains_from_ids(relevant_ids, relevant_scores, ranked, args.k), args.k)
+    ids_s = time.perf_counter() - start
+
+    identical = all(
+        np.array_equal(reference[name], result[name])
+        for name in ('recall', 'ap') for result in (from_mappings, from_ids)
+    )
+    report = {
+        'queries': args.queries,
+        'k': args.k,
+        'identical_to_reference': identical,
+        'python_loop_s': round(loop_s, 4),
+        'vectorized_from_mappings_s': round(mappings_s, 4),
+        'vectorized_from_ids_s': round(ids_s, 4),
+        'speedup_from_ids': round(loop_s / ids_s, 1),
+        'means': {name: round(float(values.mean()), 6) for name, values in from_ids.items()},
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(root_dir))
+
+from sentence_transformers import CrossEncoder
+from src.embeddings.product_embeddings import ProductEmbeddings
+from src.embeddings.reranking import PretokenizedReranker
+
+QUERIES = [
+    "entry level sales position",
+    "java developer with spring experience",
+    "healthcare management role",
+    "customer service representative for a call center",
+]
+
+
+def time_per_search(fn, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for query in QUERIES:
+            fn(query)
+    return (time.perf_counter() - start) * 1000 / (repeats * len(QUERIES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-search rerank cost with and without the pre-tokenized corpus")
+    parser.add_argument('--products', default=os.path.join('src', 'data', 'shl_products.json'))
+    parser.add_argument('--reranker', default='cross-encoder/ms-marco-MiniLM-L-6-v2')
+    parser.add_argument('--k', type=int, nargs='+', default=[5, 20, 100])
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    with open(args.products, 'r', encoding='utf-8') as f:
+        products = json.load(f)
+    create_text = ProductEmbeddings.create_product_text
+    reranker = CrossEncoder(args.reranker)
+
+    report = []
+    for k in args.k:
+        k = min(k, len(products))
+        hits = list(range(k))
+
+        def baseline(query):
+            # Previous path: rebuild product text and re-tokenize it on every search
+            pairs = [[query, create_text(products[i])] for i in hits]
+            return reranker.predict(pairs)
+
+        corpus = PretokenizedReranker(reranker)
+        corpus.set_corpus([create_text(p) for p in products])
+        for i in hits:
+            corpus.product_token_ids(i)
+
+        def pretokenized(query):
+            return corpus.predict([(query, i) for i in hits])
+
+        baseline(QUERIES[0])
+        pretokenized(QUERIES[0])
+        baseline_ms = time_per_search(baseline, args.repeats)
+        pretokenized_ms = time_per_search(pretokenized, args.repeats)
+        report.append({
+            'k': k,
+            'baseline_ms': round(baseline_ms, 3),
+            'pretokenized_ms': round(pretokenized_ms, 3),
+            'saved_ms': round(baseline_ms - pretokenized_ms, 3),
+            'speedup': round(baseline_ms / pretokenized_ms, 2) if pretokenized_ms else None,
+        })
+        print(f"k={k:<4} baseline {baseline_ms:8.2f} ms | pre-tokenized {pretokenized_ms:8.2f} ms | "
+              f"saved {baseline_ms - pretokenized_ms:7.2f} ms per search")
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List
+
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(root_dir))
+
+from src.embeddings.reranking import PretokenizedReranker
+
+SPECIAL_TOKENS = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]']
+WORDS = [f'w{i}' for i in range(200)]
+
+
+def word_level_tokenizers() -> Dict[str, object]:
+    """BERT-style fast tokenizer over a generated vocabulary, plus the slow one where transformers still has it"""
+    from tokenizers import Tokenizer, models, pre_tokenizers, processors
+    from transformers import BertTokenizer, PreTrainedTokenizerFast
+
+    vocab = {token: i for i, token in enumerate(SPECIAL_TOKENS + WORDS)}
+    backend = Tokenizer(models.WordLevel(vocab, unk_token='[UNK]'))
+    backend.pre_tokenizer = pre_tokenizers.Whitespace()
+    backend.post_processor = processors.BertProcessing(('[SEP]', vocab['[SEP]']), ('[CLS]', vocab['[CLS]']))
+    tokenizers = {'fast': PreTrainedTokenizerFast(tokenizer_object=backend, unk_token='[UNK]', pad_token='[PAD]',
+                                                  cls_token='[CLS]', sep_token='[SEP]', mask_token='[MASK]')}
+
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False, encoding='utf-8') as f:
+        f.write('\n'.join(vocab))
+    try:
+        slow = BertTokenizer(vocab_file=f.name)
+        # transformers 5 backs BertTokenizer with the Rust tokenizer too
+        if not slow.is_fast:
+            tokenizers['slow'] = slow
+    finally:
+        os.unlink(f.name)
+    return tokenizers
+
+
+def check(tokenizer, max_length: int, max_words: int) -> Dict:
+    """Compare PretokenizedReranker's pair inputs with the tokenizer's own for every (query, document) length"""
+    reranker = PretokenizedReranker(SimpleNamespace(tokenizer=tokenizer, max_length=max_length, model=None))
+    mismatches: List[Dict] = []
+    pairs = 0
+    for n_query in range(1, max_words + 1):
+        query = ' '.join(WORDS[:n_query])
+        query_ids = tokenizer(query, add_special_tokens=False)['input_ids']
+        for n_doc in range(1, max_words + 1):
+            document = ' '.join(WORDS[-n_doc:])
+            doc_ids = tokenizer(document, add_special_tokens=False)['input_ids']
+            expected = tokenizer(query, document, truncation='longest_first', max_length=max_length)
+            input_ids, token_types = reranker._build_pair(*reranker._truncate(query_ids, doc_ids))
+            pairs += 1
+            if input_ids != expected['input_ids'] or \
+                    ('token_type_ids' in expected and token_types != expected['token_type_ids']):
+                mismatches.append({'query_words': n_query, 'doc_words': n_doc,
+                                   'expected_length': len(expected['input_ids']), 'length': len(input_ids)})
+    return {'is_fast': bool(tokenizer.is_fast), 'pairs': pairs, 'mismatches': len(mismatches),
+            'examples': mismatches[:5]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that pre-tokenized rerank inputs match the tokenizer's "
+                                                 "own 'longest_first' truncation")
+    parser.add_argument('--tokenizer', help="Hugging Face tokenizer to check (default: a generated word-level "
+                                            "vocabulary, so the check runs offline)")
+    parser.add_argument('--max-length', type=int, default=32)
+    parser.add_argument('--max-words', type=int, default=44)
+    parser.add_argument('--output', help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    if args.tokenizer:
+        from transformers import AutoTokenizer
+
+        tokenizers = {'fast': AutoTokenizer.from_pretrained(args.tokenizer, use_fast=True)}
+        slow = AutoTokenizer.from_pretrained(args.tokenizer, use_fast=False)
+        if not slow.is_fast:
+            tokenizers['slow'] = slow
+    else:
+        tokenizers = word_level_tokenizers()
+
+    report = {}
+    for name, tokenizer in tokenizers.items():
+        row = report[name] = check(tokenizer, args.max_length, args.max_words)
+        status = 'ok' if not row['mismatches'] else f"{row['mismatches']} MISMATCHED, e.g. {row['examples'][0]}"
+        print(f"{name:<5} {row['pairs']} pairs at max_length={args.max_length}: {status}", flush=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if any(row['mismatches'] for row in report.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(root_dir))
+
+from src.benchmarks.synthetic_catalog import generate_catalog
+from src.embeddings.product_store import ProductStore
+from src.utils.serialization import available_encodings, compress, dumps, orjson, project_results, stdlib_dumps
+
+SHAPES = {
+    'full': {},
+    'fields': {'fields': ['url', 'title', 'similarity_score', 'rerank_score']},
+    'compact': {'compact': True},
+}
+
+
+def per_call_us(fn: Callable, items: List, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, time.perf_counter() - start)
+    return round(best / len(items) * 1e6, 2)
+
+
+def search_responses(store: ProductStore, k: int, queries: int, seed: int) -> List[List]:
+    """Result views shaped like /search output: similarity plus rerank scores per hit"""
+    rng = np.random.default_rng(seed)
+    responses = []
+    for _ in range(queries):
+        positions = rng.choice(len(store), size=k, replace=False)
+        scores = np.sort(rng.random(k))[::-1]
+        responses.append([store.view(int(pos), {'similarity_score': float(score), 'rerank_score': float(score) * 4})
+                          for pos, score in zip(positions, scores)])
+    return responses
+
+
+def bench_k(store: ProductStore, k: int, args) -> Dict:
+    views = search_responses(store, k, args.queries, args.seed)
+    row = {'k': k, 'shapes': {}}
+    for shape, options in SHAPES.items():
+        def response(results):
+            return {'results': project_results(results, **options), 'rerank': {'path': 'full'},
+                    'graded_recall': 1.0, 'average_precision': 1.0}
+
+        contents = [response(results) for results in views]
+        bodies = [dumps(content) for content in contents]
+        entry = {
+            'bytes': int(np.mean([len(body) for body in bodies])),
+            'project_us': per_call_us(response, views),
+            'stdlib_json_us': per_call_us(stdlib_dumps, contents),
+        }
+        if orjson is not None:
+            entry['orjson_us'] = per_call_us(dumps, contents)
+            entry['identical'] = all(json.loads(stdlib_dumps(c)) == json.loads(b) for c, b in zip(contents, bodies))
+        for encoding in available_encodings():
+            compressed = [compress(body, encoding) for body in bodies]
+            entry[f'{encoding}_bytes'] = int(np.mean([len(body) for body in compressed]))
+            entry[f'{encoding}_us'] = per_call_us(lambda body: compress(body, encoding), bodies)
+        row['shapes'][shape] = entry
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Payload size and encode time of /search responses per k")
+    parser.add_argument('--catalog-size', type=int, default=10_000)
+    parser.add_argument('--k', type=int, nargs='+', default=[5, 10, 50, 100])
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    store = ProductStore.from_products(generate_catalog(args.catalog_size, args.seed))
+    runs = []
+    print(f"encoder: {'orjson' if orjson is not None else 'stdlib json'}, compression: {', '.join(available_encodings())}")
+    for k in args.k:
+        row = bench_k(store, k, args)
+        runs.append(row)
+        for shape, entry in row['shapes'].items():
+            encoded = f"orjson {entry['orjson_us']:>8.1f}us" if 'orjson_us' in entry else ''
+            print(f"k={k:<4} {shape:<8} {entry['bytes']:>8}B gzip {entry['gzip_bytes']:>7}B "
+                  f"project {entry['project_us']:>7.1f}us json {entry['stdlib_json_us']:>8.1f}us {encoded} "
+                  f"gzip {entry['gzip_us']:>7.1f}us", flush=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'runs': runs}, f, indent=2)
+    if not all(entry.get('identical', True) for row in runs for entry in row['shapes'].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
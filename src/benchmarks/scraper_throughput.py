@@ -0,0 +1,235 @@
+import argparse
+import asyncio
+import contextlib
+import html
+import io
+import json
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(root_dir))
+
+from src.scraper.async_scraper import BASE_URL, crawl
+from src.scraper.pages import parse_catalog_page
+
+CATALOG_PATH = '/solutions/products/product-catalog/'
+PAGE_SIZE = 12
+TABLE_TYPES = ((2, 'Pre-packaged Job Solutions'), (1, 'Individual Test Solutions'))
+# The fixed wait in the Selenium extract_product_info, on top of the page load and the h1 wait
+SELENIUM_SLEEP_S = 2.0
+
+
+def slug(url: str) -> str:
+    return urlsplit(url).path.rstrip('/').rsplit('/', 1)[-1]
+
+
+def page_chrome(fixture: str) -> str:
+    """Head, scripts and navigation of the saved page (minus its <h1>), so served pages weigh as much as real ones"""
+    with open(fixture, 'r', encoding='utf-8') as f:
+        page = f.read()
+    prefix = page[:page.find('<div class="custom__table-wrapper')]
+    return re.sub(r'<h1\b.*?</h1>', '', prefix, flags=re.S)
+
+
+def render_catalog_page(tables: List[Dict], chrome: str) -> str:
+    parts = [chrome or '<html><body>', '<main>']
+    for table in tables:
+        parts.append('<div class="custom__table-wrapper || js-target-table-wrapper">'
+                     '<div class="custom__table-responsive"><table><tbody><tr>'
+                     f'<th class="custom__table-heading__title">{html.escape(table["heading"])}</th>'
+                     '<th class="custom__table-heading__general">Remote Testing</th></tr>')
+        for product in table['rows']:
+            parts.append(f'<tr><td class="custom__table-heading__title"><a href="{CATALOG_PATH}view/'
+                         f'{slug(product["url"])}/">{html.escape(product["title"])}</a></td>'
+                         '<td class="custom__table-heading__general"></td></tr>')
+        parts.append('</tbody></table></div><ul class="pagination">')
+        if table['next']:
+            parts.append(f'<li class="pagination__item -arrow -next "><a class="pagination__arrow" '
+                         f'href="{html.escape(table["next"])}">Next</a></li>')
+        else:
+            parts.append('<li class="pagination__item -arrow -next -disabled">'
+                         '<span class="pagination__arrow">Next</span></li>')
+        parts.append('</ul></div>')
+    parts.append('</main></body></html>')
+    return ''.join(parts)
+
+
+def render_product_page(product: Dict, chrome: str) -> str:
+    """A product page with the structure the Selenium XPaths in extract_product_info address"""
+    def section(heading: str, text: str) -> str:
+        body = '<br>'.join(html.escape(line) for line in text.split('\n'))
+        return f'<div class="product-catalogue-training-calendar__row"><h4>{heading}</h4><p>{body}</p></div>'
+
+    keys = ''.join(f'<span class="product-catalogue__key">{html.escape(key)}</span>'
+                   for key in product.get('test_types', []))
+    remote = '-yes' if product.get('remote_testing') == 'yes' else '-no'
+    downloads = ''.join(f'<li><a href="{html.escape(link["url"])}">{html.escape(link["name"])}</a></li>'
+                        for link in product.get('pdf_links', []))
+    return (
+        (chrome or '<html><body>') + f'<main><h1>{html.escape(product["title"])}</h1>'
+        + section('Description', product.get('description', ''))
+        + section('Job levels', product.get('job_level', ''))
+        + section('Languages', product.get('languages', ''))
+        + section('Assessment length', f'Approximate Completion Time in minutes = {product.get("completion_time", "")}')
+        + f'<p class="product-catalogue__small-text">Test Type: {keys}</p>'
+        + '<p class="product-catalogue__small-text">Remote Testing: '
+        + f'<span class="catalogue__circle {remote}"></span></p>'
+        + f'<ul class="product-catalogue__downloads">{downloads}</ul></main></body></html>'
+    )
+
+
+class CatalogSite:
+    """A local stand-in for the catalog: listing pages per table type and product pages, with added latency"""
+
+    def __init__(self, products: List[Dict], latency_ms: float, chrome: str):
+        self.products = {slug(p['url']): p for p in products}
+        self.by_type = {table_type: products[i::len(TABLE_TYPES)] for i, (table_type, _) in enumerate(TABLE_TYPES)}
+        self.latency = latency_ms / 1000
+        self.chrome = chrome
+        self.requests = 0
+
+    def listing(self, start: int, page_type: Optional[int]) -> str:
+        tables = []
+        for table_type, heading in TABLE_TYPES:
+            # The paged table moves on; the other one stays on its first page, as on the real site
+            offset = start if table_type == page_type else 0
+            rows = self.by_type[table_type][offset:offset + PAGE_SIZE]
+            more = offset + PAGE_SIZE < len(self.by_type[table_type])
+            tables.append({'heading': heading, 'rows': rows,
+                           'next': f'{CATALOG_PATH}?start={offset + PAGE_SIZE}&type={table_type}' if more else None})
+        return render_catalog_page(tables, self.chrome)
+
+    def handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                site.requests += 1
+                time.sleep(site.latency)
+                parts = urlsplit(self.path)
+                query = parse_qs(parts.query)
+                body = None
+                if parts.path == CATALOG_PATH:
+                    page_type = int(query['type'][0]) if 'type' in query else None
+                    body = site.listing(int(query.get('start', ['0'])[0]), page_type)
+                elif parts.path.startswith(CATALOG_PATH + 'view/'):
+                    product = site.products.get(slug(parts.path))
+                    if product is not None:
+                        body = render_product_page(product, site.chrome)
+                data = (body or 'Not found').encode('utf-8')
+                self.send_response(200 if body else 404)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def compare(scraped: List[Dict], products: List[Dict]) -> Dict:
+    expected = {slug(p['url']): p for p in products}
+    mismatched = {}
+    for data in scraped:
+        source = expected[slug(data['url'])]
+        for key, value in data.items():
+            if key != 'url' and source.get(key, value) != value:
+                mismatched[key] = mismatched.get(key, 0) + 1
+    return {'scraped': len(scraped), 'expected': len(products), 'mismatched_fields': mismatched}
+
+
+def fixture_check(path: Path) -> List[Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        page = f.read()
+    start = time.perf_counter()
+    tables = parse_catalog_page(page, BASE_URL)
+    parse_ms = (time.perf_counter() - start) * 1000
+    return [{'heading': t.heading, 'links': len(t.links), 'next_url': t.next_url, 'parse_ms': round(parse_ms, 1)}
+            for t in tables]
+
+
+def selenium_run(base_url: str, links: List[str]) -> Dict:
+    # The Selenium path itself, when Chrome and undetected_chromedriver are available
+    from src.scraper.sh_test import extract_product_info, get_stealthy_driver
+
+    driver = get_stealthy_driver()
+    try:
+        start = time.perf_counter()
+        scraped = [extract_product_info(driver, base_url.rstrip('/') + urlsplit(url).path, i)
+                   for i, url in enumerate(links, 1)]
+        seconds = time.perf_counter() - start
+    finally:
+        driver.quit()
+    return {'pages': len(scraped), 'seconds': round(seconds, 3), 'pages_per_second': round(len(scraped) / seconds, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of the async HTTP scraper against a local catalog")
+    parser.add_argument('--catalog', default=str(root_dir / 'src' / 'data' / 'shl_products.json'))
+    parser.add_argument('--fixture', default=str(root_dir / 'debug_catalog.html'))
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--parse-workers', type=int, nargs='+', default=[0, 4])
+    parser.add_argument('--latency-ms', type=float, default=200.0, help="Added to every response")
+    parser.add_argument('--bare-pages', action='store_true',
+                        help="Serve pages without the saved page's header markup (measures the network path only)")
+    parser.add_argument('--selenium', type=int, metavar='N', help="Also scrape N product pages with Selenium")
+    parser.add_argument('--output', help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    with open(args.catalog, 'r', encoding='utf-8') as f:
+        products = json.load(f)
+    report = {'args': vars(args), 'fixture': fixture_check(Path(args.fixture)), 'runs': []}
+    for table in report['fixture']:
+        print(f"{Path(args.fixture).name}: {table['heading']!r} {table['links']} links, next {table['next_url']} "
+              f"(parsed in {table['parse_ms']}ms)")
+
+    site = CatalogSite(products, args.latency_ms, '' if args.bare_pages else page_chrome(args.fixture))
+    server = ThreadingHTTPServer(('127.0.0.1', 0), site.handler())
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}{CATALOG_PATH}'
+
+    try:
+        for parse_workers in args.parse_workers:
+            for concurrency in args.concurrency:
+                # The scraper's per-page progress lines would drown the report
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result = asyncio.run(crawl(base_url, concurrency, parse_workers))
+                run = {'concurrency': concurrency, 'parse_workers': parse_workers,
+                       **{k: v for k, v in result.items() if k != 'products'},
+                       **compare(result['products'], products)}
+                report['runs'].append(run)
+                print(f"concurrency={concurrency:<3} parse_workers={parse_workers} {run['seconds']:>7.2f}s "
+                      f"{run['pages_per_second']:>7.2f} pages/s {run['scraped']}/{run['expected']} products, "
+                      f"mismatched fields {run['mismatched_fields']}", flush=True)
+
+        # Every product page in the Selenium path pays at least the response latency plus time.sleep(2)
+        report['selenium_bound_pages_per_second'] = round(1 / (SELENIUM_SLEEP_S + args.latency_ms / 1000), 3)
+        print(f"Selenium path, one browser: at most {report['selenium_bound_pages_per_second']} product pages/s "
+              f"(latency + {SELENIUM_SLEEP_S:.0f}s sleep per page)")
+        if args.selenium:
+            report['selenium'] = selenium_run(base_url, [p['url'] for p in products[:args.selenium]])
+            print(f"Selenium: {report['selenium']}")
+    finally:
+        server.shutdown()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if any(run['mismatched_fields'] or run['scraped'] != run['expected'] for run in report['runs']):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import json
+import multiprocessing as mp
+import os
+import secrets
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(root_dir))
+
+QUERIES = [
+    "entry level sales position",
+    "technical programming job",
+    "healthcare management role",
+    "java developer with collaboration skills",
+    "numerical reasoning for bank analysts",
+]
+
+
+def memory_mb(pid: str = 'self') -> dict:
+    """RSS, private anonymous RSS (what memory-mapping cannot share) and PSS (shared pages split) from /proc"""
+    usage = {}
+    for path, field, key in ((f'/proc/{pid}/status', 'VmRSS:', 'rss_mb'),
+                             (f'/proc/{pid}/status', 'RssAnon:', 'anon_mb'),
+                             (f'/proc/{pid}/smaps_rollup', 'Pss:', 'pss_mb')):
+        try:
+            with open(path) as f:
+                for line in f:
+                    if line.startswith(field):
+                        usage[key] = round(int(line.split()[1]) / 1024, 1)
+                        break
+        except OSError:
+            pass
+    return usage
+
+
+def worker(args, model_server, ready, start, results):
+    from src.embeddings.product_embeddings import ProductEmbeddings
+
+    embedder = ProductEmbeddings(args.model, args.reranker, model_server=model_server, backend=args.backend,
+                                 cache_size=1)
+    embedder.load_bundle(args.bundle, catalog_path=args.catalog)
+    embedder.warm_up()
+
+    ready.put(os.getpid())
+    start.wait()
+    t0 = time.perf_counter()
+    for i in range(args.queries):
+        embedder.search(f"{QUERIES[i % len(QUERIES)]} {i}", k=5, candidate_k=args.candidate_k)
+    elapsed = time.perf_counter() - t0
+    results.put({'pid': os.getpid(), 'elapsed_s': elapsed, 'queries': args.queries, **memory_mb()})
+
+
+def run_mode(args, model_server):
+    ctx = mp.get_context('spawn')
+    ready, start, results = ctx.Queue(), ctx.Event(), ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(args, model_server, ready, start, results))
+             for _ in range(args.workers)]
+    for p in procs:
+        p.start()
+    for _ in procs:
+        ready.get(timeout=args.load_timeout)
+    t0 = time.perf_counter()
+    start.set()
+    rows = [results.get() for _ in procs]
+    wall = time.perf_counter() - t0
+    for p in procs:
+        p.join()
+
+    total = sum(r['queries'] for r in rows)
+    return {
+        'workers': args.workers,
+        'queries_per_s': round(total / wall, 1),
+        'worker_rss_mb': round(sum(r.get('rss_mb', 0) for r in rows) / len(rows), 1),
+        'worker_anon_mb': round(sum(r.get('anon_mb', 0) for r in rows) / len(rows), 1),
+        'worker_pss_mb': round(sum(r.get('pss_mb', 0) for r in rows) / len(rows), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory per worker and throughput: standalone vs shared model server")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--queries', type=int, default=100, help="Searches per worker")
+    parser.add_argument('--candidate-k', type=int, default=20)
+    parser.add_argument('--model', default='multi-qa-mpnet-base-dot-v1')
+    parser.add_argument('--reranker', default='cross-encoder/ms-marco-MiniLM-L-6-v2')
+    parser.add_argument('--backend', default='torch')
+    parser.add_argument('--bundle', default=str(root_dir / 'src' / 'embeddings' / 'products.bundle'))
+    parser.add_argument('--catalog', default=str(root_dir / 'src' / 'data' / 'shl_products.json'))
+    parser.add_argument('--load-timeout', type=float, default=300.0, help="Seconds allowed for models to load")
+    parser.add_argument('--output', help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    report = []
+    # Inherited by the model server and the spawned workers
+    os.environ.setdefault('MODEL_SERVER_AUTHKEY', secrets.token_hex(16))
+    socket_path = os.path.join(tempfile.mkdtemp(), 'model.sock')
+    server = subprocess.Popen([
+        sys.executable, str(root_dir / 'src' / 'embeddings' / 'model_server.py'), '--socket', socket_path,
+        '--model', args.model, '--reranker', args.reranker, '--backend', args.backend,
+        '--bundle', args.bundle, '--catalog', args.catalog,
+    ])
+    try:
+        deadline = time.monotonic() + args.load_timeout
+        while not os.path.exists(socket_path):
+            if server.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError("Model server failed to start")
+            time.sleep(0.2)
+
+        for mode, address in (('standalone', None), ('shared', socket_path)):
+            row = {'mode': mode, **run_mode(args, address)}
+            if address:
+                row['model_server_rss_mb'] = memory_mb(str(server.pid)).get('rss_mb')
+            report.append(row)
+            print(f"{mode:<10} workers={row['workers']} {row['queries_per_s']:.1f} q/s "
+                  f"rss/worker={row['worker_rss_mb']:.0f}MB anon/worker={row['worker_anon_mb']:.0f}MB "
+                  f"pss/worker={row['worker_pss_mb']:.0f}MB"
+                  + (f" model_server={row['model_server_rss_mb']}MB" if address else ""))
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
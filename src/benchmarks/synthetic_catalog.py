@@ -0,0 +1,94 @@
+import argparse
+import json
+import random
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(root_dir))
+
+from src.embeddings.catalog import JSONL_SUFFIXES, write_jsonl
+
+ROLES = [
+    'Sales', 'Customer Service', 'Bank', 'Insurance', 'Healthcare', 'Retail', 'Call Center', 'Industrial',
+    'Accounting', 'Administrative', 'Hospitality', 'Software', 'Data', 'Network', 'Manufacturing', 'Nursing',
+]
+SKILLS = [
+    'Java', 'Python', '.NET', 'SQL', 'C++', 'JavaScript', 'Excel', 'Docker', 'Linux', 'Selenium', 'Spring',
+    'Numerical Reasoning', 'Verbal Reasoning', 'Mechanical Comprehension', 'Typing', 'Data Entry',
+]
+FORMS = ['Solution', 'Short Form', '7.0 Solution', '7.1 (Americas)', '7.1 (International)', '8.0', '(New)']
+JOB_LEVELS = [
+    'Entry-Level', 'Graduate', 'Mid-Professional', 'Professional Individual Contributor', 'Front Line Manager',
+    'Supervisor', 'Manager', 'Director', 'Executive', 'General Population',
+]
+LANGUAGES = [
+    'English (USA)', 'English International', 'French (Canada)', 'Latin American Spanish', 'Portuguese (Brazil)',
+    'German', 'French', 'Italian', 'Dutch', 'Norwegian', 'Swedish', 'Danish',
+]
+TEST_TYPES = ['A', 'B', 'C', 'D', 'E', 'K', 'P', 'S']
+VERBS = ['measures', 'evaluates', 'assesses', 'predicts', 'screens for']
+TRAITS = [
+    'problem solving', 'attention to detail', 'teamwork', 'customer focus', 'safety', 'leadership',
+    'dependability', 'sales potential', 'technical knowledge', 'coding ability', 'communication',
+]
+
+
+def synthetic_product(i: int, rng: random.Random) -> Dict:
+    subject = rng.choice(SKILLS) if rng.random() < 0.35 else rng.choice(ROLES)
+    title = f"{subject} {rng.choice(['Associate', 'Manager', 'Specialist', 'Agent', 'Developer'])} {rng.choice(FORMS)} {i}"
+    slug = title.lower().replace(' ', '-').replace('(', '').replace(')', '').replace('.', '-')
+    traits = rng.sample(TRAITS, 3)
+    languages = rng.sample(LANGUAGES, rng.choice([1, 1, 1, 2, 4, 8]))
+    return {
+        'url': f"https://www.shl.com/solutions/products/product-catalog/view/{slug}/",
+        'title': title,
+        'description': (
+            f"Our {title} {rng.choice(VERBS)} {traits[0]}, {traits[1]} and {traits[2]} for {subject.lower()} roles. "
+            f"Sample tasks include {rng.choice(TRAITS)} and {rng.choice(TRAITS)} in realistic job scenarios.\n"
+            f"Report Language Availability: {', '.join(languages)}."
+        ),
+        'job_level': ', '.join(rng.sample(JOB_LEVELS, rng.randint(1, 3))) + ',',
+        'languages': ', '.join(languages) + ',',
+        'completion_time': str(rng.randint(5, 60)) if rng.random() < 0.9 else '',
+        'test_types': sorted(rng.sample(TEST_TYPES, rng.randint(1, 4))),
+        'remote_testing': 'yes' if rng.random() < 0.95 else 'no',
+        'pdf_links': [{'name': f"{title} Candidate Report",
+                       'url': f"https://service.shl.com/docs/{slug}-report.pdf"}],
+    }
+
+
+def iter_catalog(n: int, seed: int = 0) -> Iterator[Dict]:
+    """n products in the shl_products.json schema, deterministic for a given seed"""
+    rng = random.Random(seed)
+    return (synthetic_product(i, rng) for i in range(n))
+
+
+def generate_catalog(n: int, seed: int = 0) -> List[Dict]:
+    return list(iter_catalog(n, seed))
+
+
+def synthetic_queries(n: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    return [f"{rng.choice(JOB_LEVELS).lower()} {rng.choice(ROLES + SKILLS).lower()} "
+            f"{rng.choice(TRAITS)} test {i}" for i in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic product catalog in the shl_products.json schema")
+    parser.add_argument('output', help="A .jsonl/.ndjson path is written line by line, anything else as a JSON array")
+    parser.add_argument('--size', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.output.endswith(JSONL_SUFFIXES):
+        write_jsonl(iter_catalog(args.size, args.seed), args.output)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(generate_catalog(args.size, args.seed), f, indent=2, ensure_ascii=False)
+    print(f"Wrote {args.size} products to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
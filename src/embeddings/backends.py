@@ -0,0 +1,326 @@
+import argparse
+import inspect
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(root_dir))
+
+BACKENDS = ('torch', 'onnx', 'onnx-int8', 'stub')
+DEFAULT_ONNX_DIR = str(root_dir / 'models' / 'onnx')
+DEFAULT_MODEL = 'multi-qa-mpnet-base-dot-v1'
+DEFAULT_RERANKER = 'cross-encoder/ms-marco-MiniLM-L-6-v2'
+
+ENCODER_DIR = 'encoder'
+RERANKER_DIR = 'reranker'
+CONFIG_FILE = 'backend.json'
+FP32_FILE = 'model.onnx'
+INT8_FILE = 'model.int8.onnx'
+OPSET = 14
+
+PARITY_QUERIES = [
+    "entry level sales position",
+    "technical programming job",
+    "healthcare management role",
+    "java developer with collaboration skills",
+    "personality test for graduate hires under 30 minutes",
+    "numerical reasoning for bank analysts",
+]
+
+
+def _check_backend(backend: str):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {', '.join(BACKENDS)}")
+
+
+def load_encoder(backend: str, model_name: str, onnx_dir: Optional[str] = None):
+    """Sentence encoder alone, e.g. for embedding build workers that never rerank"""
+    _check_backend(backend)
+    if backend == 'torch':
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+    if backend == 'stub':
+        from src.embeddings.stub_models import StubEncoder
+        return StubEncoder()
+    return OnnxSentenceEncoder(os.path.join(onnx_dir or DEFAULT_ONNX_DIR, ENCODER_DIR), backend == 'onnx-int8',
+                               expected_model=model_name)
+
+
+def load_models(backend: str, model_name: str, reranker_name: str, onnx_dir: Optional[str] = None):
+    """(encoder, cross-encoder) pair for the requested inference backend"""
+    _check_backend(backend)
+    encoder = load_encoder(backend, model_name, onnx_dir)
+    if backend == 'torch':
+        from sentence_transformers import CrossEncoder
+        return encoder, CrossEncoder(reranker_name)
+    if backend == 'stub':
+        from src.embeddings.stub_models import StubCrossEncoder
+        return encoder, StubCrossEncoder()
+    reranker = OnnxCrossEncoder(os.path.join(onnx_dir or DEFAULT_ONNX_DIR, RERANKER_DIR), backend == 'onnx-int8',
+                                expected_model=reranker_name)
+    return encoder, reranker
+
+
+def _session(path: str):
+    import onnxruntime as ort
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found, run `python src/embeddings/backends.py export` first")
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+
+
+def _read_config(model_dir: str, expected_model: Optional[str]) -> Dict:
+    with open(os.path.join(model_dir, CONFIG_FILE), 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    if expected_model is not None and config['model_name'] != expected_model:
+        raise ValueError(f"{model_dir} was exported from '{config['model_name']}', not '{expected_model}'")
+    return config
+
+
+class _OnnxModel:
+    def __init__(self, model_dir: str, quantized: bool = False, expected_model: Optional[str] = None):
+        from transformers import AutoTokenizer
+
+        self.config = _read_config(model_dir, expected_model)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.session = _session(os.path.join(model_dir, INT8_FILE if quantized else FP32_FILE))
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def _run(self, inputs: Dict[str, np.ndarray]) -> np.ndarray:
+        feed = {name: np.ascontiguousarray(inputs[name], dtype='int64') for name in self.input_names}
+        return self.session.run(None, feed)[0]
+
+
+class OnnxSentenceEncoder(_OnnxModel):
+    """ONNX Runtime stand-in for SentenceTransformer.encode (transformer + CLS/mean pooling)"""
+
+    def __init__(self, model_dir: str, quantized: bool = False, expected_model: Optional[str] = None):
+        super().__init__(model_dir, quantized, expected_model)
+        self.pooling = self.config['pooling']
+        self.normalize = self.config.get('normalize', False)
+        self.max_seq_length = self.config['max_seq_length']
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config['dimension']
+
+    def encode(self, sentences, batch_size: int = 32, normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        sentences = [sentences] if single else list(sentences)
+        embeddings = np.zeros((len(sentences), self.config['dimension']), dtype='float32')
+        # Same (unstable) length sort as SentenceTransformer.encode, so batches line up with the torch path
+        order = np.argsort([-len(s) for s in sentences])
+
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            inputs = self.tokenizer([sentences[i] for i in batch], padding=True, truncation=True,
+                                    max_length=self.max_seq_length, return_tensors='np')
+            hidden = self._run(inputs)
+            if self.pooling == 'cls':
+                pooled = hidden[:, 0]
+            else:
+                mask = inputs['attention_mask'][:, :, None].astype('float32')
+                pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            embeddings[batch] = pooled
+
+        if normalize_embeddings or self.normalize:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings[0] if single else embeddings
+
+
+class OnnxCrossEncoder(_OnnxModel):
+    """ONNX Runtime stand-in for CrossEncoder.predict; score_batch takes already padded inputs"""
+
+    def __init__(self, model_dir: str, quantized: bool = False, expected_model: Optional[str] = None):
+        super().__init__(model_dir, quantized, expected_model)
+        self.max_length = self.config['max_length']
+        self.activation = self.config['activation']
+
+    def score_batch(self, inputs: Dict[str, np.ndarray]) -> np.ndarray:
+        logits = self._run(inputs).astype('float32')
+        if logits.shape[-1] == 1:
+            logits = logits[:, 0]
+        if self.activation == 'sigmoid':
+            logits = 1 / (1 + np.exp(-logits))
+        return logits
+
+    def predict(self, sentences: Sequence[Sequence[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        scores = []
+        for start in range(0, len(sentences), batch_size):
+            batch = sentences[start:start + batch_size]
+            inputs = self.tokenizer([p[0] for p in batch], [p[1] for p in batch], padding=True,
+                                    truncation='longest_first', max_length=self.max_length, return_tensors='np')
+            scores.append(self.score_batch(inputs))
+        return np.concatenate(scores) if scores else np.zeros(0, dtype='float32')
+
+
+def _pooling_mode(pooling) -> str:
+    config = pooling.get_config_dict()
+    mode = config.get('pooling_mode')
+    if mode is None:
+        mode = 'cls' if config.get('pooling_mode_cls_token') else \
+            'mean' if config.get('pooling_mode_mean_tokens') else None
+    if mode not in ('cls', 'mean'):
+        raise ValueError(f"Unsupported pooling for ONNX export: {config}")
+    return mode
+
+
+def _export(module, output_key: str, tokenizer, sample: Tuple, path: str):
+    import torch
+
+    names = [name for name in tokenizer.model_input_names if name in ('input_ids', 'attention_mask', 'token_type_ids')]
+
+    class Wrapper(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.module = module
+
+        def forward(self, *inputs):
+            return getattr(self.module(**dict(zip(names, inputs)), return_dict=True), output_key)
+
+    encoded = tokenizer(*sample, padding=True, return_tensors='pt')
+    kwargs = {'dynamo': False} if 'dynamo' in inspect.signature(torch.onnx.export).parameters else {}
+    module.eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            Wrapper(), tuple(encoded[name] for name in names), path,
+            input_names=names, output_names=[output_key],
+            dynamic_axes={**{name: {0: 'batch', 1: 'sequence'} for name in names}, output_key: {0: 'batch'}},
+            opset_version=OPSET, **kwargs
+        )
+
+
+def _quantize(model_dir: str):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(os.path.join(model_dir, FP32_FILE), os.path.join(model_dir, INT8_FILE),
+                     weight_type=QuantType.QInt8)
+
+
+def export_models(model_name: str, reranker_name: str, output_dir: str, quantize: bool = True):
+    """Export the encoder and cross-encoder to ONNX (FP32 and, optionally, dynamically quantized int8)"""
+    import torch
+    from sentence_transformers import SentenceTransformer, CrossEncoder
+
+    encoder_dir = os.path.join(output_dir, ENCODER_DIR)
+    reranker_dir = os.path.join(output_dir, RERANKER_DIR)
+    os.makedirs(encoder_dir, exist_ok=True)
+    os.makedirs(reranker_dir, exist_ok=True)
+
+    encoder = SentenceTransformer(model_name, device='cpu')
+    modules = [type(m).__name__ for m in encoder]
+    if modules[:2] != ['Transformer', 'Pooling'] or any(m != 'Normalize' for m in modules[2:]):
+        raise ValueError(f"Unsupported module stack for ONNX export: {modules}")
+    _export(encoder[0].auto_model, 'last_hidden_state', encoder.tokenizer,
+            (['a short query', 'a somewhat longer product description'],), os.path.join(encoder_dir, FP32_FILE))
+    encoder.tokenizer.save_pretrained(encoder_dir)
+    with open(os.path.join(encoder_dir, CONFIG_FILE), 'w', encoding='utf-8') as f:
+        json.dump({
+            'model_name': model_name,
+            'pooling': _pooling_mode(encoder[1]),
+            'normalize': 'Normalize' in modules,
+            'max_seq_length': encoder.max_seq_length,
+            'dimension': encoder.get_sentence_embedding_dimension(),
+        }, f, indent=2)
+
+    reranker = CrossEncoder(reranker_name, device='cpu')
+    _export(reranker.model, 'logits', reranker.tokenizer,
+            (['a query', 'another query'], ['a product description', 'a longer product description']),
+            os.path.join(reranker_dir, FP32_FILE))
+    reranker.tokenizer.save_pretrained(reranker_dir)
+    with open(os.path.join(reranker_dir, CONFIG_FILE), 'w', encoding='utf-8') as f:
+        json.dump({
+            'model_name': reranker_name,
+            'max_length': reranker.max_length,
+            'activation': 'sigmoid' if isinstance(reranker.default_activation_function, torch.nn.Sigmoid)
+            else 'identity',
+        }, f, indent=2)
+
+    if quantize:
+        _quantize(encoder_dir)
+        _quantize(reranker_dir)
+
+
+def check_parity(texts: List[str], queries: List[str], backend: str, model_name: str, reranker_name: str,
+                 onnx_dir: Optional[str] = None, candidates: int = 20, k: int = 5) -> Dict[str, float]:
+    """Compare an ONNX backend against torch: embedding cosine and top-k rerank overlap"""
+    from src.embeddings.reranking import PretokenizedReranker
+
+    reference = load_models('torch', model_name, reranker_name)
+    other = load_models(backend, model_name, reranker_name, onnx_dir)
+
+    ref_vectors = reference[0].encode(texts + queries)
+    other_vectors = other[0].encode(texts + queries)
+    cosine = np.sum(ref_vectors * other_vectors, axis=1) / (
+        np.linalg.norm(ref_vectors, axis=1) * np.linalg.norm(other_vectors, axis=1))
+
+    ref_rerank, other_rerank = PretokenizedReranker(reference[1]), PretokenizedReranker(other[1])
+    ref_rerank.set_corpus(texts)
+    other_rerank.set_corpus(texts)
+    doc_vectors, query_vectors = ref_vectors[:len(texts)], ref_vectors[len(texts):]
+    overlaps, top1 = [], []
+    for query, vector in zip(queries, query_vectors):
+        pool = np.argsort(-(doc_vectors @ vector), kind='stable')[:candidates]
+        pairs = [(query, int(i)) for i in pool]
+        ref_order = pool[np.argsort(-ref_rerank.predict(pairs), kind='stable')]
+        other_order = pool[np.argsort(-other_rerank.predict(pairs), kind='stable')]
+        top = min(k, len(pool))
+        overlaps.append(len(set(ref_order[:top]) & set(other_order[:top])) / top)
+        top1.append(float(ref_order[0] == other_order[0]))
+
+    return {
+        'min_cosine': float(cosine.min()),
+        'mean_cosine': float(cosine.mean()),
+        f'rerank_overlap@{k}': float(np.mean(overlaps)),
+        'rerank_top1_agreement': float(np.mean(top1)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the encoder and reranker to ONNX and check parity")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export = subparsers.add_parser('export', help="Convert the models to ONNX FP32 and int8")
+    export.add_argument('--output', default=DEFAULT_ONNX_DIR)
+    export.add_argument('--no-quantize', action='store_true')
+
+    parity = subparsers.add_parser('parity', help="Compare an ONNX backend against torch")
+    parity.add_argument('--onnx-dir', default=DEFAULT_ONNX_DIR)
+    parity.add_argument('--backend', default='onnx-int8', choices=('onnx', 'onnx-int8'))
+    parity.add_argument('--catalog', default=str(root_dir / 'src' / 'data' / 'shl_products.json'))
+    parity.add_argument('--samples', type=int, default=100)
+    parity.add_argument('--min-cosine', type=float, default=0.98)
+    parity.add_argument('--min-overlap', type=float, default=0.8)
+
+    for sub in (export, parity):
+        sub.add_argument('--model', default=DEFAULT_MODEL)
+        sub.add_argument('--reranker', default=DEFAULT_RERANKER)
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        export_models(args.model, args.reranker, args.output, quantize=not args.no_quantize)
+        print(f"Exported ONNX models to {args.output}")
+        return
+
+    from src.embeddings.product_embeddings import ProductEmbeddings
+
+    with open(args.catalog, 'r', encoding='utf-8') as f:
+        products = json.load(f)[:args.samples]
+    texts = [ProductEmbeddings.create_product_text(p) for p in products]
+    report = check_parity(texts, PARITY_QUERIES, args.backend, args.model, args.reranker, args.onnx_dir)
+    print(json.dumps(report, indent=2))
+
+    overlap = next(v for key, v in report.items() if key.startswith('rerank_overlap'))
+    if report['min_cosine'] < args.min_cosine or overlap < args.min_overlap:
+        print(f"Parity check failed (min cosine >= {args.min_cosine}, overlap >= {args.min_overlap})")
+        sys.exit(1)
+    print("Parity check passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+from src.utils.instrumentation import current_timings, merge_timings, metrics, run_with_timings
+
+
+class SearchBatcher:
+    """Coalesce concurrent searches into batched ProductEmbeddings.search_batch_with_info calls"""
+
+    def __init__(self, embedder, max_batch_size: int = 32, max_wait_ms: float = 5.0, max_workers: int = 1):
+        self.embedder = embedder
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search")
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight = set()
+
+    def _ensure_started(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._collect())
+
+    async def search(self, query: str, **options) -> Tuple[List[Dict], Dict]:
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, tuple(sorted(options.items())), future, current_timings()))
+        return await future
+
+    async def search_many(self, queries: List[str], **options) -> List[Tuple[List[Dict], Dict]]:
+        results, timings = await self._run(queries, options)
+        merge_timings(current_timings(), timings)
+        return results
+
+    async def _run(self, queries: List[str], options: Dict):
+        metrics.observe('shl_search_batch_size', len(queries))
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, partial(run_with_timings, self.embedder.search_batch_with_info, queries, **options)
+        )
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            groups: Dict[tuple, list] = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+            for options, items in groups.items():
+                task = loop.create_task(self._dispatch(items, dict(options)))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, items: list, options: Dict):
+        queries = [item[0] for item in items]
+        try:
+            batch_results, timings = await self._run(queries, options)
+        except Exception as e:
+            for item in items:
+                if not item[2].done():
+                    item[2].set_exception(e)
+            return
+        for item, results in zip(items, batch_results):
+            # Each request in the batch waited for the whole batch, so each gets its stage timings
+            merge_timings(item[3], timings)
+            if not item[2].done():
+                item[2].set_result(results)
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,75 @@
+import argparse
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(root_dir))
+
+from src.embeddings.backends import BACKENDS, DEFAULT_MODEL, DEFAULT_RERANKER, load_encoder
+from src.embeddings.catalog import CatalogTexts
+from src.embeddings.embedding_build import DEFAULT_CHUNK_SIZE, build_embeddings, print_progress
+from src.embeddings.product_embeddings import ProductEmbeddings
+
+
+def encode_catalog(args):
+    """Fill the checkpoint straight from a JSONL catalog, holding only line offsets and one chunk of texts"""
+    texts = CatalogTexts(args.catalog, ProductEmbeddings.create_product_text)
+    encoder = load_encoder(args.backend, args.model, args.onnx_dir)
+    # Same encoder key as ProductEmbeddings.generate_embeddings, so the full build resumes from this checkpoint
+    model_name = encoder.model_name if args.backend == 'stub' else args.model
+    start = time.perf_counter()
+    build_embeddings(len(texts), texts.__getitem__, encoder, encoder.get_sentence_embedding_dimension(),
+                     f'{args.backend}:{model_name}', chunk_size=args.chunk_size, workers=args.workers,
+                     encoder_spec=(args.backend, args.model, args.onnx_dir), checkpoint_dir=args.checkpoint,
+                     report=print_progress)
+    texts.close()
+    elapsed = time.perf_counter() - start
+    print(f"Encoded {len(texts)} products in {elapsed:.1f}s into {args.checkpoint}; "
+          f"rerun without --encode-only to assemble the bundle")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build an index bundle in checkpointed chunks across encoder processes; rerun to resume"
+    )
+    parser.add_argument('--catalog', default=os.path.join('src', 'data', 'shl_products.json'))
+    parser.add_argument('--bundle', default=os.path.join('src', 'embeddings', 'products.bundle'))
+    parser.add_argument('--checkpoint', default=os.path.join('src', 'embeddings', 'products.bundle.build'),
+                        help="Directory for per-chunk progress; removed once the bundle is saved")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--backend', default='torch', choices=BACKENDS)
+    parser.add_argument('--onnx-dir')
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--reranker', default=DEFAULT_RERANKER)
+    parser.add_argument('--index-type', default='flat')
+    parser.add_argument('--keep-checkpoint', action='store_true')
+    parser.add_argument('--encode-only', action='store_true',
+                        help="Stream a JSONL catalog into the checkpoint without loading it into memory")
+    args = parser.parse_args()
+
+    if args.encode_only:
+        encode_catalog(args)
+        return
+
+    embedder = ProductEmbeddings(args.model, args.reranker, backend=args.backend, onnx_dir=args.onnx_dir,
+                                 index_type=args.index_type)
+    embedder.load_products(args.catalog)
+
+    start = time.perf_counter()
+    embedder.generate_embeddings(chunk_size=args.chunk_size, workers=args.workers,
+                                 checkpoint_dir=args.checkpoint, report=print_progress)
+    elapsed = time.perf_counter() - start
+    embedder.save_bundle(args.bundle)
+    if not args.keep_checkpoint:
+        shutil.rmtree(args.checkpoint, ignore_errors=True)
+
+    print(f"Encoded {len(embedder.products)} products in {elapsed:.1f}s "
+          f"({len(embedder.products) / max(elapsed, 1e-9):.1f} products/s); bundle saved to {args.bundle}")
+
+
+if __name__ == "__main__":
+    main()
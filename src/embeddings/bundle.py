@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Optional
+
+import faiss
+
+BUNDLE_VERSION = 3
+MANIFEST_FILE = 'manifest.json'
+INDEX_FILE = 'index.faiss'
+EMBEDDINGS_FILE = 'embeddings.npy'
+PRODUCTS_FILE = 'products.store'
+
+
+class StaleBundleError(ValueError):
+    """Raised when an index bundle does not match the current catalog, model or bundle format"""
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_manifest(bundle_dir: str, model_name: str, dimension: int, catalog_hash: Optional[str],
+                   num_products: int, index_type: str, index_kind: str, index_params: Dict):
+    manifest = {
+        'format_version': BUNDLE_VERSION,
+        'model_name': model_name,
+        'dimension': dimension,
+        'catalog_hash': catalog_hash,
+        'num_products': num_products,
+        'index_type': index_type,
+        'index_kind': index_kind,
+        'index_params': index_params,
+        'created_at': time.time(),
+    }
+    with open(os.path.join(bundle_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def read_manifest(bundle_dir: str) -> Dict:
+    path = os.path.join(bundle_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No index bundle at {bundle_dir}")
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def check_manifest(manifest: Dict, model_name: str, dimension: int, catalog_hash: Optional[str] = None,
+                   index_type: Optional[str] = None, index_params: Optional[Dict] = None):
+    if manifest.get('format_version') != BUNDLE_VERSION:
+        raise StaleBundleError(
+            f"Bundle format {manifest.get('format_version')} does not match expected {BUNDLE_VERSION}"
+        )
+    if manifest.get('model_name') != model_name or manifest.get('dimension') != dimension:
+        raise StaleBundleError(
+            f"Bundle was built with {manifest.get('model_name')} ({manifest.get('dimension')}d), "
+            f"expected {model_name} ({dimension}d)"
+        )
+    if catalog_hash is not None and manifest.get('catalog_hash') != catalog_hash:
+        raise StaleBundleError("Bundle catalog hash does not match the current product catalog")
+    if index_type is not None and manifest.get('index_type') != index_type:
+        raise StaleBundleError(
+            f"Bundle holds a '{manifest.get('index_type')}' index, expected '{index_type}'"
+        )
+    if index_params is not None:
+        built = manifest.get('index_params') or {}
+        changed = {name: value for name, value in index_params.items() if built.get(name) != value}
+        if changed:
+            built_with = {name: built.get(name) for name in changed}
+            raise StaleBundleError(f"Bundle index was built with {built_with}, expected {changed}")
+
+
+# IO_FLAG_MMAP only maps IVF inverted lists; flat and HNSW vectors are mapped by IO_FLAG_MMAP_IFC, which
+# older FAISS releases lack (they read those indexes fully into memory)
+MMAP_FLAGS = faiss.IO_FLAG_MMAP | getattr(faiss, 'IO_FLAG_MMAP_IFC', 0) | faiss.IO_FLAG_READ_ONLY
+
+
+def read_index_mmap(path: str):
+    try:
+        return faiss.read_index(path, MMAP_FLAGS)
+    except RuntimeError:
+        return faiss.read_index(path)
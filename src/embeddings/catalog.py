@@ -0,0 +1,150 @@
+import argparse
+import array
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator
+
+import numpy as np
+
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(root_dir))
+
+JSONL_SUFFIXES = ('.jsonl', '.ndjson')
+READ_BLOCK = 1 << 20
+
+
+def is_jsonl(path: str) -> bool:
+    """JSON Lines by extension, otherwise by whether the file opens a JSON array"""
+    if path.endswith(JSONL_SUFFIXES):
+        return True
+    with open(path, 'r', encoding='utf-8') as f:
+        for block in iter(lambda: f.read(4096), ''):
+            stripped = block.lstrip()
+            if stripped:
+                return not stripped.startswith('[')
+    return True
+
+
+def _iter_jsonl(path: str) -> Iterator[Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"{path}:{line_number}: {e}") from None
+
+
+def _iter_json_array(path: str) -> Iterator[Dict]:
+    # Decodes one element at a time from a sliding buffer instead of json.load-ing the whole array
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(READ_BLOCK).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f"{path} is neither JSON Lines nor a JSON array")
+        pos, eof = 1, False
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if eof:
+                    raise ValueError(f"{path}: truncated or malformed JSON array") from None
+                block = f.read(READ_BLOCK)
+                eof = not block
+                buffer = buffer[pos:] + block
+                pos = 0
+                continue
+            yield item
+            pos = end
+
+
+def iter_products(path: str) -> Iterator[Dict]:
+    """Products from a JSON Lines or JSON array catalog, one at a time"""
+    return _iter_jsonl(path) if is_jsonl(path) else _iter_json_array(path)
+
+
+def write_jsonl(products: Iterable[Dict], path: str) -> int:
+    count = 0
+    staging = path + '.tmp'
+    with open(staging, 'w', encoding='utf-8') as f:
+        for product in products:
+            f.write(json.dumps(product, ensure_ascii=False))
+            f.write('\n')
+            count += 1
+    os.replace(staging, path)
+    return count
+
+
+def write_json_array(products: Iterable[Dict], path: str) -> int:
+    """The same bytes as json.dump(list(products), f, indent=2), written one product at a time"""
+    count = 0
+    staging = path + '.tmp'
+    with open(staging, 'w', encoding='utf-8') as f:
+        for product in products:
+            text = json.dumps(product, indent=2, ensure_ascii=False)
+            f.write(',\n' if count else '[\n')
+            f.write('\n'.join('  ' + line for line in text.split('\n')))
+            count += 1
+        f.write('\n]' if count else '[]')
+    os.replace(staging, path)
+    return count
+
+
+class CatalogTexts:
+    """Random access to product texts of a JSONL catalog through per-line byte offsets.
+
+    Only the offsets stay in memory (8 bytes per product); each lookup re-reads and parses one line,
+    which is how the embedding build fetches texts for a chunk without holding the catalog.
+    """
+
+    def __init__(self, path: str, text_fn: Callable[[Dict], str]):
+        if not is_jsonl(path):
+            raise ValueError(f"{path} is not JSON Lines; convert it with src/embeddings/catalog.py first")
+        self.path = path
+        self.text_fn = text_fn
+        offsets = array.array('q')
+        with open(path, 'rb') as f:
+            offset = 0
+            for line in f:
+                if line.strip():
+                    offsets.append(offset)
+                offset += len(line)
+        self.offsets = np.frombuffer(offsets, dtype='int64')
+        self._file = None
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def product(self, i: int) -> Dict:
+        if self._file is None:
+            self._file = open(self.path, 'rb')
+        self._file.seek(int(self.offsets[i]))
+        return json.loads(self._file.readline())
+
+    def __getitem__(self, i: int) -> str:
+        return self.text_fn(self.product(i))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a JSON array catalog to JSON Lines, streaming")
+    parser.add_argument('source', help="e.g. src/data/shl_products.json")
+    parser.add_argument('output', help="e.g. src/data/shl_products.jsonl")
+    args = parser.parse_args()
+
+    count = write_jsonl(iter_products(args.source), args.output)
+    print(f"Wrote {count} products to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
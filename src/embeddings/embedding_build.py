@@ -0,0 +1,197 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.embeddings.backends import load_encoder
+
+ENCODE_BATCH_SIZE = 32  # SentenceTransformer.encode default, which the single-shot path uses
+DEFAULT_CHUNK_SIZE = 4096
+VECTORS_FILE = 'embeddings.npy'
+PROGRESS_FILE = 'progress.json'
+
+_worker_encoder = None
+
+
+def encode_order(lengths: Sequence[int]) -> np.ndarray:
+    """Text positions in the order SentenceTransformer.encode batches them (longest first)"""
+    return np.argsort([-length for length in lengths])
+
+
+def plan_chunks(order: np.ndarray, chunk_size: int, batch_size: int = ENCODE_BATCH_SIZE) -> List[List[np.ndarray]]:
+    """Group the single-shot encode batches into chunks of whole batches.
+
+    Every text is then padded alongside exactly the same neighbours as in one big encode call,
+    which is what keeps chunked vectors bit-identical to the single-shot ones.
+    """
+    per_chunk = max(1, chunk_size // batch_size)
+    batches = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+    return [batches[i:i + per_chunk] for i in range(0, len(batches), per_chunk)]
+
+
+def encode_batches(encoder, batches: List[List[str]]) -> np.ndarray:
+    return np.vstack([
+        np.asarray(encoder.encode(texts, batch_size=len(texts), normalize_embeddings=True), dtype='float32')
+        for texts in batches
+    ])
+
+
+def _init_worker(encoder_spec: Tuple[str, str, Optional[str]], workers: int):
+    global _worker_encoder
+    backend, model_name, onnx_dir = encoder_spec
+    if backend == 'torch':
+        import torch
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+    _worker_encoder = load_encoder(backend, model_name, onnx_dir)
+
+
+def _encode_chunk(batches: List[List[str]]) -> np.ndarray:
+    return encode_batches(_worker_encoder, batches)
+
+
+class BuildCheckpoint:
+    """On-disk vectors plus the set of finished chunks; a build with the same fingerprint resumes from it"""
+
+    def __init__(self, path: str, shape: Tuple[int, int], fingerprint: str):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.fingerprint = fingerprint
+        vectors_path = os.path.join(path, VECTORS_FILE)
+        progress = self._read()
+        if progress.get('fingerprint') == fingerprint and os.path.exists(vectors_path):
+            self.vectors = np.load(vectors_path, mmap_mode='r+')
+            self.done = set(progress['done'])
+        else:
+            self.vectors = np.lib.format.open_memmap(vectors_path, mode='w+', dtype='float32', shape=shape)
+            self.done = set()
+            self._write()
+
+    def _read(self) -> Dict:
+        try:
+            with open(os.path.join(self.path, PROGRESS_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self):
+        staging = os.path.join(self.path, PROGRESS_FILE + '.tmp')
+        with open(staging, 'w', encoding='utf-8') as f:
+            json.dump({'fingerprint': self.fingerprint, 'done': sorted(self.done)}, f)
+        os.replace(staging, os.path.join(self.path, PROGRESS_FILE))
+
+    def commit(self, chunk_id: int):
+        # Vectors reach disk before the chunk is marked done, so a crash in between only redoes the chunk
+        self.vectors.flush()
+        self.done.add(chunk_id)
+        self._write()
+
+
+class _Progress:
+    def __init__(self, total: int, chunks: int, already_done: int, report: Optional[Callable[[Dict], None]]):
+        self.total = total
+        self.chunks = chunks
+        self.texts_done = already_done
+        self.resumed = already_done
+        self.report = report
+        self.start = time.perf_counter()
+
+    def update(self, texts: int, chunks_done: int):
+        self.texts_done += texts
+        elapsed = time.perf_counter() - self.start
+        rate = (self.texts_done - self.resumed) / elapsed if elapsed > 0 else 0.0
+        if self.report:
+            self.report({
+                'chunks_done': chunks_done,
+                'chunks': self.chunks,
+                'texts_done': self.texts_done,
+                'texts': self.total,
+                'texts_per_s': rate,
+                'eta_s': (self.total - self.texts_done) / rate if rate else None,
+            })
+
+
+def print_progress(status: Dict):
+    eta = f"{status['eta_s']:.0f}s" if status['eta_s'] is not None else '?'
+    print(f"chunk {status['chunks_done']}/{status['chunks']}: {status['texts_done']}/{status['texts']} texts, "
+          f"{status['texts_per_s']:.1f} texts/s, eta {eta}", flush=True)
+
+
+def build_embeddings(num_texts: int, text_at: Callable[[int], str], encoder, dimension: int, encoder_key: str,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = 1,
+                     encoder_spec: Optional[Tuple[str, str, Optional[str]]] = None,
+                     checkpoint_dir: Optional[str] = None,
+                     on_chunk: Optional[Callable[[np.ndarray, np.ndarray], None]] = None,
+                     report: Optional[Callable[[Dict], None]] = None) -> np.ndarray:
+    """Normalized float32 embeddings [num_texts, dimension] encoded chunk by chunk.
+
+    Texts are fetched through text_at only when their chunk is submitted. With workers > 1 chunks
+    are encoded by a pool of processes that load their own encoder from encoder_spec
+    (backend, model_name, onnx_dir). on_chunk(positions, vectors) runs as each chunk finishes,
+    in completion order. encoder_key (backend and model) is part of the checkpoint fingerprint, so
+    a checkpoint is only resumed by the same encoder over the same texts and chunking.
+    """
+    digest = hashlib.sha256(f'{encoder_key}:{dimension}:{num_texts}:{chunk_size}:{ENCODE_BATCH_SIZE}'.encode('utf-8'))
+    lengths = []
+    for i in range(num_texts):
+        text = text_at(i)
+        lengths.append(len(text))
+        digest.update(hashlib.sha256(text.encode('utf-8')).digest())
+    chunks = plan_chunks(encode_order(lengths), chunk_size)
+    chunk_positions = [np.concatenate(batches) for batches in chunks]
+
+    if checkpoint_dir:
+        checkpoint = BuildCheckpoint(checkpoint_dir, (num_texts, dimension), digest.hexdigest())
+        vectors, done = checkpoint.vectors, set(checkpoint.done)
+    else:
+        checkpoint = None
+        vectors, done = np.empty((num_texts, dimension), dtype='float32'), set()
+
+    if on_chunk:
+        for chunk_id in sorted(done):
+            on_chunk(chunk_positions[chunk_id], np.asarray(vectors[chunk_positions[chunk_id]]))
+    pending = [chunk_id for chunk_id in range(len(chunks)) if chunk_id not in done]
+    progress = _Progress(num_texts, len(chunks), sum(len(chunk_positions[c]) for c in done), report)
+
+    def chunk_texts(chunk_id: int) -> List[List[str]]:
+        return [[text_at(int(pos)) for pos in batch] for batch in chunks[chunk_id]]
+
+    def finish(chunk_id: int, chunk_vectors: np.ndarray):
+        positions = chunk_positions[chunk_id]
+        vectors[positions] = chunk_vectors
+        if on_chunk:
+            on_chunk(positions, chunk_vectors)
+        done.add(chunk_id)
+        if checkpoint:
+            checkpoint.commit(chunk_id)
+        progress.update(len(positions), len(done))
+
+    if workers <= 1:
+        for chunk_id in pending:
+            finish(chunk_id, encode_batches(encoder, chunk_texts(chunk_id)))
+        return vectors
+
+    if encoder_spec is None:
+        raise ValueError("encoder_spec is required to encode with more than one worker")
+    queue = iter(pending)
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                             initargs=(encoder_spec, workers)) as pool:
+        # Two chunks in flight per worker keeps everyone busy without materialising every text up front
+        running = {}
+        for chunk_id in queue:
+            running[pool.submit(_encode_chunk, chunk_texts(chunk_id))] = chunk_id
+            if len(running) >= 2 * workers:
+                break
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                finish(running.pop(future), future.result())
+                chunk_id = next(queue, None)
+                if chunk_id is not None:
+                    running[pool.submit(_encode_chunk, chunk_texts(chunk_id))] = chunk_id
+    return vectors
@@ -0,0 +1,241 @@
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(root_dir))
+
+from src.embeddings.backends import BACKENDS, DEFAULT_MODEL, DEFAULT_RERANKER
+from src.embeddings.bundle import read_manifest
+from src.embeddings.evaluation import batch_metrics_from_mappings
+from src.embeddings.indexes import INDEX_TYPES
+from src.embeddings.product_embeddings import SEARCH_MODES, ProductEmbeddings
+
+METRIC_NAMES = ('recall', 'ap', 'ndcg', 'mrr', 'precision')
+
+_worker: Optional[Tuple[ProductEmbeddings, Dict]] = None
+
+
+def load_gold_set(path: str) -> List[Tuple[str, Dict[str, float]]]:
+    """(query, {url: relevance}) pairs from JSONL lines {"query": ..., "relevant": {url: score} or [url, ...]}"""
+    gold = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            relevant = record.get('relevant')
+            if not record.get('query') or relevant is None:
+                raise ValueError(f"{path}:{line_number}: expected 'query' and 'relevant' keys")
+            if isinstance(relevant, list):
+                relevant = {url: 1.0 for url in relevant}
+            gold.append((record['query'], {url: float(score) for url, score in relevant.items()}))
+    return gold
+
+
+def config_grid(index_types: List[str], modes: List[str], rerank: List[bool],
+                candidate_ks: List[int]) -> List[Dict]:
+    configs = []
+    for index_type, mode, use_rerank in itertools.product(index_types, modes, rerank):
+        # Candidate depth only matters when the candidates are reranked
+        for candidate_k in (candidate_ks if use_rerank else [None]):
+            configs.append({'index_type': index_type, 'mode': mode, 'rerank': use_rerank, 'candidate_k': candidate_k})
+    return configs
+
+
+def config_name(config: Dict) -> str:
+    rerank = f"rerank@{config['candidate_k']}" if config['rerank'] else 'no-rerank'
+    return f"{config['index_type']}/{config['mode']}/{rerank}"
+
+
+def cache_path(cache_dir: str, config: Dict, depth: int, identity: Dict) -> str:
+    key = json.dumps({'config': config, 'depth': depth, **identity}, sort_keys=True)
+    return os.path.join(cache_dir, hashlib.sha256(key.encode('utf-8')).hexdigest()[:24] + '.json')
+
+
+def load_cached(path: str) -> Dict:
+    if not os.path.exists(path):
+        return {'retrieved': {}, 'ms_per_query': {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_cached(path: str, entry: Dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    staging = path + '.tmp'
+    with open(staging, 'w', encoding='utf-8') as f:
+        json.dump(entry, f)
+    os.replace(staging, path)
+
+
+def _init_worker(options: Dict):
+    global _worker
+    embedder = ProductEmbeddings(options['model'], options['reranker'], cache_size=0,
+                                 index_type=options['bundle_index_type'], nprobe=options['nprobe'],
+                                 ef_search=options['ef_search'], backend=options['backend'],
+                                 onnx_dir=options['onnx_dir'], **options['index_params'])
+    embedder.load_bundle(options['bundle'])
+    embedder.warm_up()
+    _worker = (embedder, {options['bundle_index_type']: embedder.index})
+
+
+def _use_index(embedder: ProductEmbeddings, indexes: Dict, index_type: str):
+    if index_type not in indexes:
+        embedder.index_type = index_type
+        embedder._rebuild_index(embedder.embeddings, embedder.position_ids)
+        indexes[index_type] = embedder.index
+    embedder.index = indexes[index_type]
+
+
+def _run_batch(config: Dict, queries: List[str], k: int) -> Tuple[List[List[str]], float]:
+    embedder, indexes = _worker
+    _use_index(embedder, indexes, config['index_type'])
+    start = time.perf_counter()
+    batch = embedder.search_batch(queries, k=k, rerank=config['rerank'], candidate_k=config['candidate_k'],
+                                  mode=config['mode'])
+    elapsed = time.perf_counter() - start
+    return [[str(r.get('url', '')) for r in results] for results in batch], elapsed
+
+
+def run_searches(tasks: List[Tuple[int, Dict, List[str]]], depth: int, workers: int, options: Dict):
+    """Yield (config position, queries, retrieved lists, seconds) for every batch, in completion order"""
+    if workers <= 1:
+        _init_worker(options)
+        for position, config, queries in tasks:
+            yield (position, queries) + _run_batch(config, queries, depth)
+        return
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(options,)) as pool:
+        futures = {pool.submit(_run_batch, config, queries, depth): (position, queries)
+                   for position, config, queries in tasks}
+        for future in as_completed(futures):
+            yield futures[future] + future.result()
+
+
+def summarize(config: Dict, entry: Dict, gold: List[Tuple[str, Dict[str, float]]], k: int, cached: int) -> Dict:
+    queries = [query for query, _ in gold]
+    metrics = batch_metrics_from_mappings([relevant for _, relevant in gold],
+                                          [entry['retrieved'][query] for query in queries], k)
+    latencies = np.array([entry['ms_per_query'][query] for query in queries])
+    row = {'name': config_name(config), **config}
+    row.update({f'{name}@{k}': round(float(metrics[name].mean()), 4) for name in METRIC_NAMES})
+    row.update({
+        'ms_per_query': round(float(latencies.mean()), 3),
+        'queries_per_s': round(1000 / latencies.mean(), 1) if latencies.mean() > 0 else None,
+        'queries': len(queries),
+        'cached_queries': cached,
+    })
+    return row
+
+
+def format_table(rows: List[Dict], k: int) -> str:
+    columns = [f'{name}@{k}' for name in METRIC_NAMES] + ['ms_per_query', 'queries_per_s']
+    width = max(len(row['name']) for row in rows)
+    lines = [f"{'config':<{width}} " + ' '.join(f'{c:>13}' for c in columns)]
+    for row in rows:
+        lines.append(f"{row['name']:<{width}} " + ' '.join(f'{row[c]:>13}' for c in columns))
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Evaluate retrieval configurations on a JSONL gold set and compare quality against latency"
+    )
+    parser.add_argument('gold', help="JSONL lines {\"query\": ..., \"relevant\": {url: score} or [url, ...]}")
+    parser.add_argument('--bundle', default=os.path.join('src', 'embeddings', 'products.bundle'))
+    parser.add_argument('--k', type=int, default=10, help="Metric cutoff")
+    parser.add_argument('--depth', type=int, default=10,
+                        help="Results retrieved and cached per query; any --k up to this reuses the cache")
+    parser.add_argument('--index-types', nargs='+', default=['flat'], choices=INDEX_TYPES)
+    parser.add_argument('--modes', nargs='+', default=['dense'], choices=SEARCH_MODES)
+    parser.add_argument('--rerank', nargs='+', default=['on', 'off'], choices=['on', 'off'])
+    parser.add_argument('--candidate-k', type=int, nargs='+', default=[20, 50])
+    parser.add_argument('--nprobe', type=int)
+    parser.add_argument('--ef-search', type=int)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument('--backend', default='torch', choices=BACKENDS)
+    parser.add_argument('--onnx-dir')
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--reranker', default=DEFAULT_RERANKER)
+    parser.add_argument('--cache-dir', default=os.path.join('.cache', 'evaluation'),
+                        help="Retrieved lists per configuration; only queries missing from it are searched")
+    parser.add_argument('--no-cache', action='store_true', help="Search every query again")
+    parser.add_argument('--output', help="Write the report as JSON to this path")
+    args = parser.parse_args()
+    if args.k > args.depth:
+        parser.error("--k cannot exceed --depth")
+
+    gold = load_gold_set(args.gold)
+    manifest = read_manifest(args.bundle)
+    options = {
+        'bundle': args.bundle, 'bundle_index_type': manifest['index_type'],
+        'index_params': manifest.get('index_params') or {}, 'backend': args.backend,
+        'onnx_dir': args.onnx_dir, 'model': args.model, 'reranker': args.reranker,
+        'nprobe': args.nprobe, 'ef_search': args.ef_search,
+    }
+    # Anything that can change a ranked list belongs in the cache key; the gold set does not
+    identity = {
+        'catalog_hash': manifest.get('catalog_hash'), 'model': manifest['model_name'], 'backend': args.backend,
+        'reranker': args.reranker, 'index_params': manifest.get('index_params'),
+        'nprobe': args.nprobe, 'ef_search': args.ef_search,
+    }
+    configs = config_grid(args.index_types, args.modes, [r == 'on' for r in args.rerank], args.candidate_k)
+
+    paths, entries, cached, tasks = [], [], [], []
+    queries = list(dict.fromkeys(query for query, _ in gold))
+    for position, config in enumerate(configs):
+        path = cache_path(args.cache_dir, config, args.depth, identity)
+        entry = {'retrieved': {}, 'ms_per_query': {}} if args.no_cache else load_cached(path)
+        missing = [query for query in queries if query not in entry['retrieved']]
+        paths.append(path)
+        entries.append(entry)
+        cached.append(len(queries) - len(missing))
+        tasks.extend((position, config, missing[i:i + args.batch_size])
+                     for i in range(0, len(missing), args.batch_size))
+
+    print(f"{len(gold)} queries x {len(configs)} configurations: {len(tasks)} batches to search, "
+          f"{sum(cached)} query results cached")
+    start = time.perf_counter()
+    remaining = [sum(1 for position, _, _ in tasks if position == p) for p in range(len(configs))]
+    for position, batch_queries, retrieved, seconds in run_searches(tasks, args.depth, args.workers, options):
+        entry = entries[position]
+        for query, urls in zip(batch_queries, retrieved):
+            entry['retrieved'][query] = urls
+            entry['ms_per_query'][query] = seconds * 1000 / len(batch_queries)
+        remaining[position] -= 1
+        if remaining[position] == 0:
+            save_cached(paths[position], entry)
+    search_s = time.perf_counter() - start
+
+    rows = [summarize(config, entry, gold, args.k, hits) for config, entry, hits in zip(configs, entries, cached)]
+    print(format_table(rows, args.k))
+    print(f"Searched in {search_s:.1f}s with {args.workers} worker(s)")
+
+    if args.output:
+        report = {
+            'gold': args.gold,
+            'queries': len(gold),
+            'k': args.k,
+            'depth': args.depth,
+            'bundle': {'path': args.bundle, **identity},
+            'workers': args.workers,
+            'search_seconds': round(search_s, 3),
+            'configs': rows,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,94 @@
-from typing import List, Set, Dict
+from typing import List, Dict, Tuple
 
+import numpy as np
+
+
+def _pack_rows(values: List[float], counts: np.ndarray) -> np.ndarray:
+    """Left-aligned, zero-padded [len(counts), max(counts)] matrix from row-major values"""
+    packed = np.zeros((len(counts), int(counts.max()) if len(counts) else 0), dtype='float64')
+    rows = np.repeat(np.arange(len(counts)), counts)
+    slots = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+    packed[rows, slots] = values
+    return packed
+
+
+def gains_from_mappings(relevance_mappings: List[Dict[str, float]], retrieved_lists: List[List[str]],
+                        k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(gains [Q, k], relevance [Q, R]) from per-query {url: score} dicts and ranked url lists"""
+    gains = np.array([
+        [relevant_scores.get(url, 0) for url in retrieved[:k]] + [0] * (k - min(k, len(retrieved)))
+        for relevant_scores, retrieved in zip(relevance_mappings, retrieved_lists)
+    ], dtype='float64').reshape(len(relevance_mappings), k)
+    counts = np.array([len(r) for r in relevance_mappings], dtype='int64')
+    values = [score for relevant_scores in relevance_mappings for score in relevant_scores.values()]
+    return gains, _pack_rows(values, counts)
+
+
+def gains_from_ids(relevant_ids: np.ndarray, relevant_scores: np.ndarray, ranked: np.ndarray,
+                   k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(gains [Q, k], relevance [Q, R]) from judged item ids and scores [Q, R] and ranked item ids [Q, >=k]; -1 pads both"""
+    relevant_ids = np.asarray(relevant_ids)
+    relevance = np.where(relevant_ids >= 0, np.asarray(relevant_scores, dtype='float64'), 0.0)
+    ranked = np.asarray(ranked)[:, :k]
+    gains = np.zeros(ranked.shape, dtype='float64')
+    for j in range(relevant_ids.shape[1]):
+        column = relevant_ids[:, j:j + 1]
+        gains += np.where((ranked == column) & (column >= 0), relevance[:, j:j + 1], 0.0)
+    if gains.shape[1] < k:
+        gains = np.pad(gains, ((0, 0), (0, k - gains.shape[1])))
+    return gains, relevance
+
+
+def batch_metrics(gains: np.ndarray, relevance: np.ndarray, k: int) -> Dict[str, np.ndarray]:
+    """Per-query graded recall, AP, nDCG, MRR and precision at k for a whole batch.
+
+    Columns are accumulated left to right, in the order the per-query loops used, so recall and
+    AP match the original scalar functions bit for bit.
+    """
+    n = gains.shape[0]
+    gains = np.asfortranarray(gains)
+    relevance = np.asfortranarray(relevance)
+    total_relevance = np.zeros(n)
+    for column in relevance.T:
+        total_relevance += column
+    total_relevant = np.count_nonzero(relevance > 0, axis=1)
+    ideal = -np.sort(-relevance, axis=1)[:, :k]
+
+    retrieved_relevance = np.zeros(n)
+    sum_precisions = np.zeros(n)
+    dcg = np.zeros(n)
+    idcg = np.zeros(n)
+    hits = np.zeros(n)
+    first_hit = np.zeros(n)
+    for i in range(k):
+        gain = gains[:, i]
+        relevant = gain > 0
+        retrieved_relevance += gain
+        hits += relevant
+        sum_precisions += np.where(relevant, hits / (i + 1) * gain, 0.0)
+        discount = np.log2(i + 2)
+        dcg += gain / discount
+        if i < ideal.shape[1]:
+            idcg += ideal[:, i] / discount
+        first_hit = np.where((first_hit == 0) & relevant, i + 1, first_hit)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'recall': np.where(total_relevance == 0, 0.0, retrieved_relevance / total_relevance),
+            'ap': np.where(total_relevant == 0, 0.0, sum_precisions / np.minimum(total_relevant, k)),
+            'ndcg': np.where(idcg > 0, dcg / idcg, 0.0),
+            'mrr': np.where(first_hit > 0, 1.0 / first_hit, 0.0),
+            'precision': hits / k if k else np.zeros(n),
+        }
+
+
+def batch_metrics_from_mappings(relevance_mappings: List[Dict[str, float]], retrieved_lists: List[List[str]],
+                                k: int) -> Dict[str, np.ndarray]:
+    gains, relevance = gains_from_mappings(relevance_mappings, retrieved_lists, k)
+    return batch_metrics(gains, relevance, k)
+
+
+# Single queries stay plain loops: building batch matrices costs far more than scoring one ranked list
 def graded_recall_at_k(relevant_scores: Dict[str, float], retrieved: List[str], k: int) -> float:
     """Calculate recall where items contribute proportionally to their relevance score"""
     top_k = retrieved[:k]
@@ -14,29 +103,29 @@ def average_precision_at_k(relevant_scores: Dict[str, float], retrieved: List[st
     hits = 0
     sum_precisions = 0.0
     total_relevant = sum(1 for score in relevant_scores.values() if score > 0)
-    
+
     if total_relevant == 0:
         return 0.0
-    
+
     for i, item in enumerate(retrieved[:k], 1):
         if item in relevant_scores and relevant_scores[item] > 0:
             hits += 1
             precision = hits / i
-            sum_precisions += precision * relevant_scores[item] 
-            
+            sum_precisions += precision * relevant_scores[item]
+
     return sum_precisions / min(total_relevant, k)
 
 def mean_metrics_at_k(relevance_mappings: List[Dict[str, float]], retrieved_lists: List[List[str]], k: int) -> dict:
     """Calculate mean metrics across multiple queries"""
-    recalls = []
-    aps = []
-    
-    for relevant_scores, retrieved in zip(relevance_mappings, retrieved_lists):
-        recalls.append(graded_recall_at_k(relevant_scores, retrieved, k))
-        aps.append(average_precision_at_k(relevant_scores, retrieved, k))
-    
     n_queries = len(relevance_mappings)
+    if n_queries == 0:
+        return {'mean_recall@k': 0.0, 'map@k': 0.0, 'ndcg@k': 0.0, 'mrr@k': 0.0, 'precision@k': 0.0}
+
+    metrics = batch_metrics_from_mappings(relevance_mappings, retrieved_lists, k)
     return {
-        'mean_recall@k': sum(recalls) / n_queries if n_queries > 0 else 0.0,
-        'map@k': sum(aps) / n_queries if n_queries > 0 else 0.0
-    }
\ No newline at end of file
+        'mean_recall@k': sum(metrics['recall'].tolist()) / n_queries,
+        'map@k': sum(metrics['ap'].tolist()) / n_queries,
+        'ndcg@k': float(metrics['ndcg'].mean()),
+        'mrr@k': float(metrics['mrr'].mean()),
+        'precision@k': float(metrics['precision'].mean()),
+    }
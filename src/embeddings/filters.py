@@ -0,0 +1,120 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+LIST_FIELDS = ('test_types', 'job_level', 'languages')
+
+
+def split_values(value) -> List[str]:
+    if isinstance(value, (list, tuple)):
+        items = value
+    else:
+        items = str(value or '').split(',')
+    return [str(item).strip().lower() for item in items if str(item).strip()]
+
+
+def parse_duration(value) -> float:
+    match = re.search(r'\d+', str(value or ''))
+    return float(match.group()) if match else np.nan
+
+
+@dataclass(frozen=True)
+class SearchFilters:
+    test_types: Tuple[str, ...] = ()
+    job_levels: Tuple[str, ...] = ()
+    languages: Tuple[str, ...] = ()
+    remote_testing: Optional[bool] = None
+    min_duration: Optional[float] = None
+    max_duration: Optional[float] = None
+
+    @classmethod
+    def create(cls, test_types: Iterable[str] = (), job_levels: Iterable[str] = (), languages: Iterable[str] = (),
+               remote_testing: Optional[bool] = None, min_duration: Optional[float] = None,
+               max_duration: Optional[float] = None) -> Optional['SearchFilters']:
+        filters = cls(
+            test_types=tuple(sorted(set(split_values(list(test_types or []))))),
+            job_levels=tuple(sorted(set(split_values(list(job_levels or []))))),
+            languages=tuple(sorted(set(split_values(list(languages or []))))),
+            remote_testing=remote_testing,
+            min_duration=min_duration,
+            max_duration=max_duration,
+        )
+        return None if filters.is_empty() else filters
+
+    def is_empty(self) -> bool:
+        return not (self.test_types or self.job_levels or self.languages or self.remote_testing is not None
+                    or self.min_duration is not None or self.max_duration is not None)
+
+
+class MetadataIndex:
+    """Packed per-value bitmaps and a sorted duration array over the product store"""
+
+    def __init__(self, products):
+        self.size = len(products)
+        self.bitmaps: Dict[str, Dict[str, np.ndarray]] = {}
+        for field in LIST_FIELDS + ('remote_testing',):
+            codes, vocab = self._interned(products, field)
+            members: Dict[str, List[int]] = {}
+            for code, raw in enumerate(vocab):
+                for value in split_values(raw if raw is not None else ''):
+                    members.setdefault(value, []).append(code)
+            self.bitmaps[field] = {value: np.packbits(np.isin(codes, code_list))
+                                   for value, code_list in members.items()}
+
+        if hasattr(products, 'minutes'):
+            durations = np.asarray(products.minutes, dtype='float64')
+        else:
+            durations = np.array([parse_duration(p.get('completion_time')) for p in products], dtype='float64')
+        timed = np.flatnonzero(~np.isnan(durations))
+        order = np.argsort(durations[timed], kind='stable')
+        self.duration_positions = timed[order]
+        self.duration_sorted = durations[timed][order]
+
+    @staticmethod
+    def _interned(products, field: str) -> Tuple[np.ndarray, List]:
+        """(per-product codes, distinct values) of a field, straight from a ProductStore when possible"""
+        if hasattr(products, 'enum'):
+            return products.enum(field)
+        vocab, lookup, codes = [], {}, []
+        for product in products:
+            value = product.get(field, '')
+            key = repr(value)
+            if key not in lookup:
+                lookup[key] = len(vocab)
+                vocab.append(value)
+            codes.append(lookup[key])
+        return np.array(codes, dtype='int64'), vocab
+
+    def _pack(self, positions) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        mask[positions] = True
+        return np.packbits(mask)
+
+    def _any_of(self, field: str, values: Tuple[str, ...]) -> np.ndarray:
+        bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        for value in values:
+            bitmap = self.bitmaps[field].get(value)
+            if bitmap is not None:
+                bits |= bitmap
+        return bits
+
+    def select(self, filters: SearchFilters) -> np.ndarray:
+        """Positions of products matching every filter"""
+        bits = np.full((self.size + 7) // 8, 0xFF, dtype=np.uint8)
+        for field, values in (('test_types', filters.test_types), ('job_level', filters.job_levels),
+                              ('languages', filters.languages)):
+            if values:
+                bits &= self._any_of(field, values)
+        if filters.remote_testing is not None:
+            bits &= self._any_of('remote_testing', ('yes',) if filters.remote_testing else ('no',))
+
+        if filters.min_duration is not None or filters.max_duration is not None:
+            low = np.searchsorted(self.duration_sorted, filters.min_duration, 'left') \
+                if filters.min_duration is not None else 0
+            high = np.searchsorted(self.duration_sorted, filters.max_duration, 'right') \
+                if filters.max_duration is not None else len(self.duration_sorted)
+            bits &= self._pack(self.duration_positions[low:high])
+
+        return np.flatnonzero(np.unpackbits(bits, count=self.size))
@@ -0,0 +1,108 @@
+import math
+from typing import Optional
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ('flat', 'ivf_flat', 'hnsw', 'ivf_pq')
+
+# Fewer vectors than this cannot train the index well, so a simpler type is used instead
+MIN_TRAINING_VECTORS = {'ivf_flat': 39 * 4, 'ivf_pq': 39 * 256}
+FALLBACK_TYPES = {'ivf_flat': 'flat', 'ivf_pq': 'ivf_flat'}
+# Build parameters each index type depends on; build_index ignores the others
+INDEX_PARAMS = {'flat': (), 'ivf_flat': ('nlist',), 'hnsw': ('hnsw_m', 'ef_construction'), 'ivf_pq': ('nlist', 'pq_m')}
+
+
+def resolve_index_type(index_type: str, num_vectors: int) -> str:
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}', expected one of {', '.join(INDEX_TYPES)}")
+    while index_type in MIN_TRAINING_VECTORS and num_vectors < MIN_TRAINING_VECTORS[index_type]:
+        index_type = FALLBACK_TYPES[index_type]
+    return index_type
+
+
+def default_nlist(num_vectors: int) -> int:
+    return max(1, min(int(4 * math.sqrt(max(num_vectors, 1))), num_vectors // 39))
+
+
+def default_pq_m(dimension: int) -> int:
+    for m in (64, 48, 32, 24, 16, 12, 8, 4, 2, 1):
+        if dimension % m == 0 and dimension // m >= 4:
+            return m
+    return 1
+
+
+def build_index(index_type: str, dimension: int, num_vectors: int, nlist: Optional[int] = None,
+                hnsw_m: int = 32, ef_construction: int = 128, pq_m: Optional[int] = None):
+    """Create an empty, id-addressable inner-product index of the requested type"""
+    index_type = resolve_index_type(index_type, num_vectors)
+    if index_type == 'flat':
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+    if index_type == 'hnsw':
+        hnsw = faiss.IndexHNSWFlat(dimension, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        hnsw.hnsw.efConstruction = ef_construction
+        return faiss.IndexIDMap2(hnsw)
+
+    nlist = nlist or default_nlist(num_vectors)
+    quantizer = faiss.IndexFlatIP(dimension)
+    if index_type == 'ivf_flat':
+        return faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+    return faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m or default_pq_m(dimension), 8,
+                            faiss.METRIC_INNER_PRODUCT)
+
+
+def index_kind(index) -> str:
+    base = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else faiss.downcast_index(index)
+    if isinstance(base, faiss.IndexHNSW):
+        return 'hnsw'
+    if isinstance(base, faiss.IndexIVFPQ):
+        return 'ivf_pq'
+    if isinstance(base, faiss.IndexIVF):
+        return 'ivf_flat'
+    return 'flat'
+
+
+def set_search_params(index, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    if nprobe is not None:
+        try:
+            faiss.extract_index_ivf(index).nprobe = nprobe
+        except RuntimeError:
+            pass
+    if ef_search is not None:
+        base = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+        if isinstance(base, faiss.IndexHNSW):
+            base.hnsw.efSearch = ef_search
+
+
+def add_vectors(index, vectors: np.ndarray, ids: np.ndarray):
+    if not index.is_trained:
+        index.train(vectors)
+    index.add_with_ids(vectors, ids)
+
+
+def replace_vectors(index, vectors: np.ndarray, ids: np.ndarray) -> bool:
+    """Swap the vectors stored under ids; returns False when the index cannot remove ids in place"""
+    try:
+        index.remove_ids(ids)
+    except RuntimeError:
+        return False
+    add_vectors(index, vectors, ids)
+    return True
+
+
+def remove_vectors(index, ids: np.ndarray) -> bool:
+    try:
+        index.remove_ids(ids)
+    except RuntimeError:
+        return False
+    return True
+
+
+def search_parameters(index, selector):
+    """SearchParameters restricting a search to selector ids while keeping the index's nprobe/efSearch"""
+    base = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else faiss.downcast_index(index)
+    if isinstance(base, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=base.nprobe)
+    if isinstance(base, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=base.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
@@ -0,0 +1,77 @@
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+[#+]*")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """In-process BM25 over product texts with CSR posting lists (term offsets into doc/tf arrays)"""
+
+    def __init__(self, texts: List[str], k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.size = len(texts)
+        self.vocabulary: Dict[str, int] = {}
+
+        term_ids, doc_ids, tfs = [], [], []
+        doc_lengths = np.zeros(self.size, dtype='float32')
+        for doc, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_lengths[doc] = sum(counts.values())
+            for term, tf in counts.items():
+                term_ids.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                doc_ids.append(doc)
+                tfs.append(tf)
+
+        term_ids = np.asarray(term_ids, dtype='int64')
+        order = np.argsort(term_ids, kind='stable')
+        self.doc_ids = np.asarray(doc_ids, dtype='int32')[order]
+        self.tfs = np.asarray(tfs, dtype='float32')[order]
+        self.offsets = np.zeros(len(self.vocabulary) + 1, dtype='int64')
+        np.cumsum(np.bincount(term_ids, minlength=len(self.vocabulary)), out=self.offsets[1:])
+
+        doc_freq = np.diff(self.offsets).astype('float32')
+        self.idf = np.log1p((self.size - doc_freq + 0.5) / (doc_freq + 0.5)).astype('float32')
+        avgdl = float(doc_lengths.mean()) if self.size else 0.0
+        self.length_norm = (k1 * (1 - b + b * doc_lengths / avgdl)).astype('float32') if avgdl else \
+            np.full(self.size, k1, dtype='float32')
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(self.size, dtype='float32')
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, stop = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.doc_ids[start:stop]
+            tf = self.tfs[start:stop]
+            scores[docs] += self.idf[term_id] * tf * (self.k1 + 1) / (tf + self.length_norm[docs])
+        return scores
+
+    def search(self, query: str, k: int, allowed: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (positions, scores) with a positive BM25 score, optionally restricted to allowed positions"""
+        scores = self.scores(query)
+        if allowed is not None:
+            mask = np.zeros(self.size, dtype=bool)
+            mask[allowed] = True
+            scores[~mask] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return candidates, scores[candidates]
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = 60) -> List[Tuple[int, float]]:
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda x: x[1], reverse=True)
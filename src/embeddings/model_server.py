@@ -0,0 +1,344 @@
+import argparse
+import hashlib
+import os
+import queue
+import stat
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(root_dir))
+
+from src.embeddings.reranking import PretokenizedReranker
+
+AUTHKEY_ENV = "MODEL_SERVER_AUTHKEY"
+MIN_AUTHKEY_LENGTH = 16
+MAX_CORPORA = 4
+
+
+def default_socket_path() -> str:
+    return os.path.join(tempfile.gettempdir(), f'shl-model-server-{os.getuid()}', 'model.sock')
+
+
+def authkey_from_env() -> bytes:
+    """The shared secret; connections exchange pickles, so whoever holds it can run code in the server"""
+    key = os.getenv(AUTHKEY_ENV, '')
+    if len(key) < MIN_AUTHKEY_LENGTH:
+        raise RuntimeError(f"Set {AUTHKEY_ENV} to a secret of at least {MIN_AUTHKEY_LENGTH} characters, "
+                           f"the same for the model server and every worker")
+    return key.encode()
+
+
+def parse_address(address: str):
+    """'host:port' for TCP, anything else is a Unix socket path"""
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit() and '/' not in address:
+        return host or '127.0.0.1', int(port)
+    return address
+
+
+def private_socket_dir(path: str) -> str:
+    """Create the socket's directory owner-only, or refuse one that other users can enter"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.stat(directory)
+    if info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) & 0o077:
+        raise PermissionError(f"{directory} must be owned by this user and closed to others (chmod 700) "
+                              f"to hold the model server socket")
+    return directory
+
+
+def corpus_key(texts: Sequence[str]) -> str:
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(text.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class ModelClient:
+    """Connection to a model server; one connection per calling thread"""
+
+    def __init__(self, address: str, authkey: Optional[bytes] = None, connect_timeout: float = 120.0):
+        self.address = parse_address(address)
+        self.authkey = authkey or authkey_from_env()
+        self.connect_timeout = connect_timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            deadline = time.monotonic() + self.connect_timeout
+            while True:
+                try:
+                    conn = Client(self.address, authkey=self.authkey)
+                    break
+                except (FileNotFoundError, ConnectionRefusedError):
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.2)
+            self._local.conn = conn
+        return conn
+
+    def call(self, op: str, *args):
+        conn = self._connection()
+        try:
+            conn.send((op,) + args)
+            status, value = conn.recv()
+        except (EOFError, OSError):
+            self._local.conn = None
+            raise
+        if status == 'error':
+            raise RuntimeError(f"Model server error: {value}")
+        return status, value
+
+
+class RemoteEncoder:
+    """SentenceTransformer-compatible encode() served by the model server"""
+
+    def __init__(self, client: ModelClient):
+        self.client = client
+        _, info = client.call('info')
+        self.model_name = info['model_name']
+        self.dimension = info['dimension']
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, sentences, normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        _, vectors = self.client.call('encode', [sentences] if single else list(sentences), normalize_embeddings)
+        return vectors[0] if single else vectors
+
+
+class RemoteReranker:
+    """PretokenizedReranker-compatible (query, position) scoring against a corpus registered on the server"""
+
+    def __init__(self, client: ModelClient):
+        self.client = client
+        self.texts: List[str] = []
+        self.key = corpus_key([])
+
+    def set_corpus(self, texts: List[str]):
+        self.texts = list(texts)
+        self.key = corpus_key(self.texts)
+
+    def predict(self, pairs: Sequence[Tuple[str, int]]) -> np.ndarray:
+        if not pairs:
+            return np.zeros(0, dtype='float32')
+        pairs = [(q, int(i)) for q, i in pairs]
+        status, scores = self.client.call('rerank', self.key, pairs)
+        if status == 'unknown_corpus':
+            self.client.call('corpus', self.key, self.texts)
+            status, scores = self.client.call('rerank', self.key, pairs)
+        return scores
+
+
+def connect(address: str, authkey: Optional[bytes] = None) -> Tuple[RemoteEncoder, RemoteReranker]:
+    client = ModelClient(address, authkey)
+    return RemoteEncoder(client), RemoteReranker(client)
+
+
+class _Request:
+    __slots__ = ('op', 'args', 'reply', 'done')
+
+    def __init__(self, op: str, args: tuple):
+        self.op = op
+        self.args = args
+        self.reply = None
+        self.done = threading.Event()
+
+
+class ModelServer:
+    """Runs the encoder and reranker for every API worker, batching requests across connections"""
+
+    def __init__(self, model_name: str, encoder, cross_encoder, max_batch_size: int = 64, max_wait_ms: float = 2.0):
+        self.model_name = model_name
+        self.encoder = encoder
+        self.cross_encoder = cross_encoder
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.corpora: 'OrderedDict[str, PretokenizedReranker]' = OrderedDict()
+        self._corpora_lock = threading.Lock()
+        self._requests: 'queue.Queue[_Request]' = queue.Queue()
+        self.stats = {'requests': 0, 'batches': 0}
+
+    def add_corpus(self, key: str, texts: List[str]):
+        reranker = PretokenizedReranker(self.cross_encoder)
+        reranker.set_corpus(texts)
+        with self._corpora_lock:
+            self.corpora[key] = reranker
+            self.corpora.move_to_end(key)
+            while len(self.corpora) > MAX_CORPORA:
+                self.corpora.popitem(last=False)
+
+    def _corpus(self, key: str) -> Optional[PretokenizedReranker]:
+        with self._corpora_lock:
+            reranker = self.corpora.get(key)
+            if reranker is not None:
+                self.corpora.move_to_end(key)
+            return reranker
+
+    def serve_forever(self, address: str, authkey: Optional[bytes] = None, allow_tcp: bool = False):
+        authkey = authkey or authkey_from_env()
+        address = parse_address(address)
+        if isinstance(address, tuple) and not allow_tcp:
+            raise ValueError("Serving over TCP exposes the server beyond this machine's users; "
+                             "pass --allow-tcp to do it anyway")
+        umask = None
+        if isinstance(address, str):
+            private_socket_dir(address)
+            if os.path.exists(address):
+                os.unlink(address)
+            # The socket file is created owner-only (0600) rather than chmod-ed after it starts accepting
+            umask = os.umask(0o177)
+        try:
+            listener = Listener(address, authkey=authkey)
+        finally:
+            if umask is not None:
+                os.umask(umask)
+        threading.Thread(target=self._inference_loop, name='inference', daemon=True).start()
+        with listener:
+            print(f"Model server listening on {listener.address}", flush=True)
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    print(f"Rejected connection: {e}", flush=True)
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        with conn:
+            while True:
+                try:
+                    op, *args = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if op == 'info':
+                        reply = ('ok', {'model_name': self.model_name,
+                                        'dimension': self.encoder.get_sentence_embedding_dimension(),
+                                        **self.stats})
+                    elif op == 'corpus':
+                        self.add_corpus(*args)
+                        reply = ('ok', None)
+                    elif op in ('encode', 'rerank'):
+                        request = _Request(op, tuple(args))
+                        self._requests.put(request)
+                        request.done.wait()
+                        reply = request.reply
+                    else:
+                        reply = ('error', f"Unknown operation '{op}'")
+                except Exception as e:
+                    reply = ('error', f"{type(e).__name__}: {e}")
+                conn.send(reply)
+
+    def _inference_loop(self):
+        while True:
+            batch = [self._requests.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._requests.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            self.stats['requests'] += len(batch)
+            self.stats['batches'] += 1
+            groups: Dict[tuple, List[_Request]] = {}
+            for request in batch:
+                groups.setdefault((request.op, request.args[0] if request.op == 'rerank' else request.args[1]),
+                                  []).append(request)
+            for (op, key), requests in groups.items():
+                try:
+                    if op == 'encode':
+                        self._encode(requests, key)
+                    else:
+                        self._rerank(requests, key)
+                except Exception as e:
+                    for request in requests:
+                        request.reply = ('error', f"{type(e).__name__}: {e}")
+                for request in requests:
+                    request.done.set()
+
+    def _encode(self, requests: List[_Request], normalize: bool):
+        texts = [text for request in requests for text in request.args[0]]
+        vectors = np.asarray(self.encoder.encode(texts, normalize_embeddings=normalize), dtype='float32')
+        start = 0
+        for request in requests:
+            stop = start + len(request.args[0])
+            request.reply = ('ok', vectors[start:stop])
+            start = stop
+
+    def _rerank(self, requests: List[_Request], key: str):
+        reranker = self._corpus(key)
+        if reranker is None:
+            for request in requests:
+                request.reply = ('unknown_corpus', None)
+            return
+        scores = reranker.predict([pair for request in requests for pair in request.args[1]])
+        start = 0
+        for request in requests:
+            stop = start + len(request.args[1])
+            request.reply = ('ok', scores[start:stop])
+            start = stop
+
+
+def main():
+    from src.embeddings.backends import BACKENDS
+    from src.embeddings.bundle import StaleBundleError
+    from src.embeddings.product_embeddings import ProductEmbeddings
+
+    parser = argparse.ArgumentParser(description="Serve the encoder and reranker to API workers over a local socket")
+    parser.add_argument('--socket', default=os.getenv("MODEL_SERVER") or default_socket_path(),
+                        help="Unix socket path (its directory must be private to this user) or host:port")
+    parser.add_argument('--allow-tcp', action='store_true',
+                        help="Allow a host:port address; anyone who can reach it and has the key can run code here")
+    parser.add_argument('--model', default='multi-qa-mpnet-base-dot-v1')
+    parser.add_argument('--reranker', default='cross-encoder/ms-marco-MiniLM-L-6-v2')
+    parser.add_argument('--backend', default=os.getenv("INFERENCE_BACKEND", "torch"), choices=BACKENDS)
+    parser.add_argument('--onnx-dir', default=os.getenv("ONNX_DIR") or None)
+    parser.add_argument('--bundle', default=str(root_dir / 'src' / 'embeddings' / 'products.bundle'))
+    parser.add_argument('--catalog', default=str(root_dir / 'src' / 'data' / 'shl_products.json'))
+    parser.add_argument('--index-type', default=os.getenv("INDEX_TYPE", "flat"))
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    args = parser.parse_args()
+    # Fail before loading any model
+    authkey = authkey_from_env()
+    if not isinstance(parse_address(args.socket), tuple):
+        private_socket_dir(args.socket)
+    elif not args.allow_tcp:
+        parser.error(f"{args.socket} is a TCP address; pass --allow-tcp to serve on it")
+
+    # Build the shared bundle once, before any worker connects and maps it
+    embedder = ProductEmbeddings(args.model, args.reranker, index_type=args.index_type,
+                                 backend=args.backend, onnx_dir=args.onnx_dir)
+    try:
+        embedder.load_bundle(args.bundle, catalog_path=args.catalog)
+    except (FileNotFoundError, StaleBundleError):
+        embedder.load_products(args.catalog)
+        embedder.generate_embeddings()
+        embedder.save_bundle(args.bundle)
+    embedder.warm_up()
+
+    server = ModelServer(embedder.model_name, embedder.model, embedder.reranker,
+                         max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    server.corpora[corpus_key(embedder.product_texts)] = embedder.rerank_corpus
+    server.serve_forever(args.socket, authkey, allow_tcp=args.allow_tcp)
+
+
+if __name__ == "__main__":
+    main()
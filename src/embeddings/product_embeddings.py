@@ -1,25 +1,164 @@
+import hashlib
 import json
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer, CrossEncoder
-from typing import List, Dict, Set
+from typing import List, Dict, Set, Optional, Tuple
 import os
+import shutil
+import time
 from src.embeddings.evaluation import mean_metrics_at_k
+from src.embeddings.cache import LRUCache, normalize_query
+from src.embeddings.semantic_cache import SemanticCache
+from src.embeddings.reranking import PretokenizedReranker
+from src.embeddings.backends import load_models
+from src.embeddings.embedding_build import DEFAULT_CHUNK_SIZE, build_embeddings
+from src.embeddings.catalog import iter_products
+from src.embeddings.product_store import ProductStore
+from src.embeddings.model_server import connect
+from src.utils.instrumentation import stage
+from src.embeddings.filters import MetadataIndex, SearchFilters
+from src.embeddings.lexical import BM25Index, reciprocal_rank_fusion
+from src.embeddings.indexes import (
+    INDEX_PARAMS, add_vectors, build_index, index_kind, remove_vectors, replace_vectors, search_parameters,
+    set_search_params
+)
+from src.embeddings.bundle import (
+    EMBEDDINGS_FILE, INDEX_FILE, PRODUCTS_FILE,
+    check_manifest, file_sha256, read_index_mmap, read_manifest, write_manifest
+)
+
+def product_id(product: Dict) -> int:
+    key = product.get('url') or product.get('title', '')
+    digest = hashlib.sha256(key.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') & 0x7FFFFFFFFFFFFFFF
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+SEARCH_MODES = ('dense', 'lexical', 'hybrid')
+
 
 class ProductEmbeddings:
-    def __init__(self, model_name: str = 'multi-qa-mpnet-base-dot-v1', reranker_name: str = 'cross-encoder/ms-marco-MiniLM-L-6-v2'):
-        self.model = SentenceTransformer(model_name)
-        self.reranker = CrossEncoder(reranker_name)
+    def __init__(self, model_name: str = 'multi-qa-mpnet-base-dot-v1', reranker_name: str = 'cross-encoder/ms-marco-MiniLM-L-6-v2',
+                 cache_size: int = 1024, cache_ttl: Optional[float] = 3600, adaptive_margin: float = 0.05,
+                 index_type: str = 'flat', nlist: Optional[int] = None, nprobe: Optional[int] = None,
+                 hnsw_m: int = 32, ef_construction: int = 128, ef_search: Optional[int] = None,
+                 pq_m: Optional[int] = None, backend: str = 'torch', onnx_dir: Optional[str] = None,
+                 model_server: Optional[str] = None, semantic_cache_size: int = 0,
+                 semantic_threshold: float = 0.92):
+        self.model_name = model_name
+        self.reranker_name = reranker_name
+        self.backend = backend
+        self.onnx_dir = onnx_dir
+        self.model_server = model_server
+        self.index_type = index_type
+        self.index_params = {'nlist': nlist, 'hnsw_m': hnsw_m, 'ef_construction': ef_construction, 'pq_m': pq_m}
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        if model_server:
+            # Inference runs in a shared model server process; only the index and products live here
+            self.model, self.rerank_corpus = connect(model_server)
+            self.reranker = None
+            self.model_name = self.model.model_name
+        else:
+            self.model, self.reranker = load_models(backend, model_name, reranker_name, onnx_dir)
+            self.rerank_corpus = PretokenizedReranker(self.reranker)
+            if backend == 'stub':
+                self.model_name = self.model.model_name
         self.dimension = self.model.get_sentence_embedding_dimension()
-        self.index = faiss.IndexFlatIP(self.dimension)  
-        self.products: List[Dict] = []
+        self.index = self._new_index()
+        self.products = ProductStore.from_products([])
+        self.product_texts: List[str] = []
+        self.text_hashes: List[str] = []
+        self.id_to_pos: Dict[int, int] = {}
+        self.position_ids = np.zeros(0, dtype='int64')
+        self.metadata = MetadataIndex([])
+        self.lexical = BM25Index([])
         self.embeddings = None
+        self._index_mmapped = False
+        self._bundle_path: Optional[str] = None
+        self.catalog_hash: Optional[str] = None
+        self.index_version = 0
+        self._corpus_version: Optional[str] = None
+        self.query_cache = LRUCache(maxsize=cache_size, ttl=cache_ttl)
+        self.result_cache = LRUCache(maxsize=cache_size, ttl=cache_ttl)
+        self.semantic_cache = SemanticCache(self.dimension, maxsize=semantic_cache_size, threshold=semantic_threshold)
+        self.adaptive_margin = adaptive_margin
+        self.rerank_ms_per_pair: Optional[float] = None
+
+    def _corpus_changed(self):
+        self.index_version += 1
+        self._corpus_version = None
+        self.result_cache.clear()
+        self.semantic_cache.clear()
+
+    @property
+    def corpus_version(self) -> str:
+        """Content hash of the products, models and index settings; equal across workers serving one bundle"""
+        if self._corpus_version is None:
+            settings = [self.model_name, self.reranker_name, self.backend, self.index_type, self.index_params,
+                        self.nprobe, self.ef_search, self.adaptive_margin]
+            digest = hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf-8'))
+            digest.update(self.products.digest().encode('utf-8'))
+            digest.update(self.position_ids.tobytes())
+            self._corpus_version = digest.hexdigest()[:16]
+        return self._corpus_version
+
+    def cache_stats(self) -> Dict[str, Dict]:
+        return {
+            'index_version': self.index_version,
+            'corpus_version': self.corpus_version,
+            'query_embeddings': self.query_cache.stats(),
+            'results': self.result_cache.stats(),
+            'semantic': self.semantic_cache.stats(),
+        }
 
     def load_products(self, json_path: str):
-        with open(json_path, 'r', encoding='utf-8') as f:
-            self.products = json.load(f)
+        # Streamed straight into the columnar store; ids and texts are then read back from it one product at a time
+        self._set_products(ProductStore.from_products(iter_products(json_path)))
+        self.catalog_hash = file_sha256(json_path)
+
+    def _set_products(self, products, texts: Optional[List[str]] = None):
+        """Adopt a ProductStore or a list of product dicts (packed into a store)"""
+        ids, built_texts = [], []
+        for product in products:
+            ids.append(product_id(product))
+            if texts is None:
+                built_texts.append(self.create_product_text(product))
+        self.products = products if isinstance(products, ProductStore) else ProductStore.from_products(products)
+        self.product_texts = texts if texts is not None else built_texts
+        self.text_hashes = [text_hash(t) for t in self.product_texts]
+        self.position_ids = np.array(ids, dtype='int64')
+        self.id_to_pos = {int(uid): pos for pos, uid in enumerate(self.position_ids)}
+        self.metadata = MetadataIndex(self.products)
+        self.lexical = BM25Index(self.product_texts)
+        self.rerank_corpus.set_corpus(self.product_texts)
+        self._corpus_changed()
+
+    def _new_index(self, num_vectors: int = 0):
+        index = build_index(self.index_type, self.dimension, num_vectors, **self.index_params)
+        set_search_params(index, self.nprobe, self.ef_search)
+        return index
+
+    def _rebuild_index(self, embeddings: np.ndarray, ids: np.ndarray):
+        self.index = self._new_index(len(ids))
+        if len(ids):
+            add_vectors(self.index, np.ascontiguousarray(embeddings, dtype='float32'), ids)
+        self._index_mmapped = False
 
-    def create_product_text(self, product: Dict) -> str:
+    def _writable_index(self):
+        if self._index_mmapped:
+            # A mapped index is read-only and cannot be copied with serialize_index (mapped IVF lists are
+            # written as a reference to the file), so the bundle's index file is read again, in full
+            self.index = faiss.read_index(os.path.join(self._bundle_path, INDEX_FILE))
+            set_search_params(self.index, self.nprobe, self.ef_search)
+            self._index_mmapped = False
+        return self.index
+
+    @staticmethod
+    def create_product_text(product: Dict) -> str:
         fields = [
             product.get('title', ''),
             product.get('description', ''),
@@ -32,45 +171,346 @@ class ProductEmbeddings:
         ]
         return ' '.join([str(field) for field in fields if field])
 
-    def generate_embeddings(self):
-        texts = [self.create_product_text(p) for p in self.products]
-        self.embeddings = self.model.encode(texts, normalize_embeddings=True)
-        self.index.add(self.embeddings.astype('float32'))
+    def generate_embeddings(self, chunk_size: Optional[int] = None, workers: int = 1,
+                            checkpoint_dir: Optional[str] = None, report=None):
+        if chunk_size is None and workers <= 1 and checkpoint_dir is None:
+            self.embeddings = self.model.encode(self.product_texts, normalize_embeddings=True).astype('float32')
+            self._rebuild_index(self.embeddings, self.position_ids)
+            self._corpus_changed()
+            return self.embeddings
+        if workers > 1 and self.model_server:
+            raise ValueError("Encoder workers need a local model; the model server already batches encoding")
+
+        self.index = self._new_index(len(self.products))
+        self._index_mmapped = False
+        # IVF/PQ indexes train on the whole catalog, as in the single-shot path, so they are filled at the end
+        incremental = self.index.is_trained
+
+        def add_chunk(positions: np.ndarray, vectors: np.ndarray):
+            if incremental:
+                add_vectors(self.index, np.ascontiguousarray(vectors, dtype='float32'), self.position_ids[positions])
+
+        self.embeddings = build_embeddings(
+            len(self.product_texts), self.product_texts.__getitem__, self.model, self.dimension,
+            f'{self.backend}:{self.model_name}',
+            chunk_size=chunk_size or DEFAULT_CHUNK_SIZE, workers=workers,
+            encoder_spec=(self.backend, self.model_name, self.onnx_dir), checkpoint_dir=checkpoint_dir,
+            on_chunk=add_chunk, report=report,
+        )
+        if not incremental:
+            self._rebuild_index(self.embeddings, self.position_ids)
+        self._corpus_changed()
         return self.embeddings
 
-    def save_index(self, path: str):
-        faiss.write_index(self.index, path)
+    def upsert_products(self, products: List[Dict]) -> Dict[str, int]:
+        incoming = {product_id(p): p for p in products}
+        products_out = list(self.products)
+        texts = list(self.product_texts)
+        to_encode: List[Tuple[int, int]] = []
+        stats = {'added': 0, 'updated': 0, 'unchanged': 0}
+
+        for uid, product in incoming.items():
+            text = self.create_product_text(product)
+            pos = self.id_to_pos.get(uid)
+            if pos is None:
+                pos = len(products_out)
+                products_out.append(product)
+                texts.append(text)
+                to_encode.append((uid, pos))
+                stats['added'] += 1
+            else:
+                products_out[pos] = product
+                if text_hash(text) != self.text_hashes[pos]:
+                    texts[pos] = text
+                    to_encode.append((uid, pos))
+                    stats['updated'] += 1
+                else:
+                    stats['unchanged'] += 1
+
+        embeddings = np.zeros((len(products_out), self.dimension), dtype='float32')
+        if self.embeddings is not None:
+            embeddings[:len(self.embeddings)] = self.embeddings
+        if to_encode:
+            vectors = self.model.encode([texts[pos] for _, pos in to_encode], normalize_embeddings=True)
+            vectors = np.asarray(vectors, dtype='float32')
+            embeddings[[pos for _, pos in to_encode]] = vectors
+
+            ids = np.array([uid for uid, _ in to_encode], dtype='int64')
+            if not replace_vectors(self._writable_index(), vectors, ids):
+                self._rebuild_index(embeddings, np.array([product_id(p) for p in products_out], dtype='int64'))
+
+        self.embeddings = embeddings
+        self._set_products(products_out, texts)
+        stats['reencoded'] = len(to_encode)
+        return stats
+
+    def remove_products(self, urls: List[str]) -> Dict[str, int]:
+        ids = {product_id({'url': url}) for url in urls}
+        positions = sorted(self.id_to_pos[uid] for uid in ids if uid in self.id_to_pos)
+        if positions:
+            drop = set(positions)
+            keep = [pos for pos in range(len(self.products)) if pos not in drop]
+            products = [self.products[pos] for pos in keep]
+            self.embeddings = np.asarray(self.embeddings, dtype='float32')[keep]
+            removed_ids = self.position_ids[positions]
+            if not remove_vectors(self._writable_index(), removed_ids):
+                self._rebuild_index(self.embeddings, self.position_ids[keep])
+            self._set_products(products, [self.product_texts[pos] for pos in keep])
+        return {'removed': len(positions), 'missing': len(ids) - len(positions)}
+
+    def save_bundle(self, path: str):
+        path = os.path.abspath(path)
+        staging = path + '.tmp'
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+        faiss.write_index(self._writable_index(), os.path.join(staging, INDEX_FILE))
+        np.save(os.path.join(staging, EMBEDDINGS_FILE), np.asarray(self.embeddings, dtype='float32'))
+        self.products.save(os.path.join(staging, PRODUCTS_FILE))
+        write_manifest(staging, self.model_name, self.dimension, self.catalog_hash, len(self.products),
+                       self.index_type, index_kind(self.index), self.index_params)
+
+        previous = path + '.old'
+        shutil.rmtree(previous, ignore_errors=True)
+        if os.path.exists(path):
+            os.rename(path, previous)
+        os.rename(staging, path)
+        shutil.rmtree(previous, ignore_errors=True)
 
-    def load_index(self, path: str):
-        self.index = faiss.read_index(path)
+    def load_bundle(self, path: str, catalog_path: Optional[str] = None):
+        manifest = read_manifest(path)
+        catalog_hash = file_sha256(catalog_path) if catalog_path else None
+        check_manifest(manifest, self.model_name, self.dimension, catalog_hash, self.index_type,
+                       {name: self.index_params[name] for name in INDEX_PARAMS.get(self.index_type, ())})
 
-    def search(self, query: str, k: int = 5, rerank: bool = True) -> List[Dict]:
-        query_embedding = self.model.encode([query], normalize_embeddings=True)
-        scores, indices = self.index.search(query_embedding.astype('float32'), k)
+        index = read_index_mmap(os.path.join(path, INDEX_FILE))
+        set_search_params(index, self.nprobe, self.ef_search)
+        embeddings = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode='r')
+        products = ProductStore.open(os.path.join(path, PRODUCTS_FILE))
 
-        results = []
-        for idx, score in zip(indices[0], scores[0]):
-            if idx < len(self.products):
-                result = self.products[idx].copy()
-                result['similarity_score'] = float(score)  
-                results.append(result)
+        self.index = index
+        self._index_mmapped = True
+        self._bundle_path = path
+        self.embeddings = embeddings
+        self.catalog_hash = manifest.get('catalog_hash')
+        self._set_products(products)
+        return manifest
+
+    def warm_up(self, query: str = 'warm up'):
+        embedding = np.asarray(self.model.encode([query], normalize_embeddings=True), dtype='float32')
+        if self.index.ntotal:
+            self.index.search(embedding, 1)
+        if self.products:
+            self.rerank_corpus.predict([(query, 0)])
+        self.lexical.search(query, 1)
+
+    def search(self, query: str, k: int = 5, rerank: bool = True, candidate_k: Optional[int] = None,
+               adaptive: bool = False, rerank_budget_ms: Optional[float] = None,
+               filters: Optional[SearchFilters] = None, mode: str = 'dense') -> List[Dict]:
+        return self.search_batch([query], k=k, rerank=rerank, candidate_k=candidate_k, adaptive=adaptive,
+                                 rerank_budget_ms=rerank_budget_ms, filters=filters, mode=mode)[0]
+
+    def search_batch(self, queries: List[str], k: int = 5, rerank: bool = True, candidate_k: Optional[int] = None,
+                     adaptive: bool = False, rerank_budget_ms: Optional[float] = None,
+                     filters: Optional[SearchFilters] = None, mode: str = 'dense') -> List[List[Dict]]:
+        batch = self.search_batch_with_info(queries, k=k, rerank=rerank, candidate_k=candidate_k, adaptive=adaptive,
+                                            rerank_budget_ms=rerank_budget_ms, filters=filters, mode=mode)
+        return [results for results, _ in batch]
+
+    def search_batch_with_info(self, queries: List[str], k: int = 5, rerank: bool = True,
+                               candidate_k: Optional[int] = None, adaptive: bool = False,
+                               rerank_budget_ms: Optional[float] = None,
+                               filters: Optional[SearchFilters] = None,
+                               mode: str = 'dense', semantic_cache: bool = True) -> List[Tuple[List[Dict], Dict]]:
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}', expected one of {', '.join(SEARCH_MODES)}")
+        if not queries:
+            return []
+
+        depth = max(k, candidate_k or k) if rerank else k
+        options = (k, rerank, depth, adaptive, rerank_budget_ms, filters, mode)
+        keys = [(normalize_query(q), options, self.index_version) for q in queries]
+        batch = [self.result_cache.get(key) for key in keys]
+        missing = [i for i, entry in enumerate(batch) if entry is None]
+
+        query_embeddings = None
+        # Lexical search never encodes queries, so it does not pay an encode just to consult the cache
+        if missing and semantic_cache and self.semantic_cache.enabled and mode != 'lexical':
+            query_embeddings = self._encode_queries([queries[i] for i in missing])
+            matches = self.semantic_cache.lookup(options, query_embeddings)
+            for i, match in zip(missing, matches):
+                if match is not None:
+                    (results, info), matched_query, similarity = match
+                    batch[i] = (results, {**info, 'semantic_match': {'query': matched_query,
+                                                                     'similarity': similarity}})
+            unmatched = [j for j, match in enumerate(matches) if match is None]
+            query_embeddings = query_embeddings[unmatched]
+            missing = [missing[j] for j in unmatched]
+
+        if missing:
+            miss_queries = [queries[i] for i in missing]
+            candidates = self._retrieve(miss_queries, depth, filters, mode, query_embeddings)
+
+            fresh, fresh_ids = [], []
+            for hits in candidates:
+                results = []
+                for pos, scores in hits:
+                    results.append(self.products.view(pos, scores))
+                fresh.append(results)
+                fresh_ids.append([pos for pos, _ in hits])
+
+            if rerank:
+                infos = self._rerank_batch(miss_queries, fresh, fresh_ids, k, adaptive, rerank_budget_ms, mode)
+            else:
+                infos = [{'path': 'none', 'candidates': len(r), 'reranked': 0} for r in fresh]
+
+            for j, (i, results, info) in enumerate(zip(missing, fresh, infos)):
+                entry = (results[:k], info)
+                self.result_cache.set(keys[i], entry)
+                if query_embeddings is not None:
+                    self.semantic_cache.add(options, query_embeddings[j], queries[i], entry)
+                batch[i] = entry
+
+        return [([r.copy() for r in results], dict(info)) for results, info in batch]
+
+    def _retrieve(self, queries: List[str], depth: int, filters: Optional[SearchFilters], mode: str,
+                  query_embeddings: Optional[np.ndarray] = None) -> List[List[Tuple[int, Dict[str, float]]]]:
+        allowed = None
+        if filters is not None and not filters.is_empty():
+            with stage('filter'):
+                allowed = self.metadata.select(filters)
+
+        if mode == 'lexical':
+            hits = []
+            for query in queries:
+                with stage('lexical'):
+                    positions, scores = self.lexical.search(query, depth, allowed)
+                hits.append([(int(pos), {'similarity_score': float(score), 'lexical_score': float(score)})
+                             for pos, score in zip(positions, scores)])
+            return hits
+
+        if query_embeddings is None:
+            query_embeddings = self._encode_queries(queries)
+        with stage('faiss'):
+            scores, indices = self._dense_search(query_embeddings, depth, filters, allowed)
+        dense = []
+        for row_indices, row_scores in zip(indices, scores):
+            row = []
+            for uid, score in zip(row_indices, row_scores):
+                pos = self.id_to_pos.get(int(uid))
+                if pos is not None:
+                    row.append((pos, {'similarity_score': float(score)}))
+            dense.append(row)
+        if mode == 'dense':
+            return dense
+
+        hits = []
+        for query, query_embedding, dense_row in zip(queries, query_embeddings, dense):
+            with stage('lexical'):
+                positions, lexical_scores = self.lexical.search(query, depth, allowed)
+            lexical = dict(zip(positions.tolist(), lexical_scores.tolist()))
+            dense_scores = {pos: scores['similarity_score'] for pos, scores in dense_row}
+            fused = reciprocal_rank_fusion([[pos for pos, _ in dense_row], positions.tolist()])[:depth]
+            row = []
+            for pos, fusion_score in fused:
+                similarity = dense_scores.get(pos)
+                if similarity is None:
+                    similarity = float(np.dot(self.embeddings[pos], query_embedding))
+                row.append((pos, {
+                    'similarity_score': similarity,
+                    'lexical_score': lexical.get(pos, 0.0),
+                    'fusion_score': fusion_score,
+                }))
+            hits.append(row)
+        return hits
+
+    def _dense_search(self, query_embeddings: np.ndarray, depth: int, filters: Optional[SearchFilters] = None,
+                      positions: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        if filters is None or filters.is_empty():
+            return self.index.search(query_embeddings, depth)
+
+        if positions is None:
+            positions = self.metadata.select(filters)
+        if len(positions) == 0:
+            empty = np.full((len(query_embeddings), depth), -1, dtype='int64')
+            return np.zeros(empty.shape, dtype='float32'), empty
+        selector = faiss.IDSelectorBatch(self.position_ids[positions])
+        return self.index.search(query_embeddings, depth, params=search_parameters(self.index, selector))
+
+    def _encode_queries(self, queries: List[str]) -> np.ndarray:
+        keys = [normalize_query(q) for q in queries]
+        cached = [self.query_cache.get(key) for key in keys]
+        missing = [i for i, emb in enumerate(cached) if emb is None]
+
+        if missing:
+            with stage('encode'):
+                encoded = self.model.encode([queries[i] for i in missing], normalize_embeddings=True)
+            for i, emb in zip(missing, encoded):
+                emb = np.asarray(emb, dtype='float32')
+                self.query_cache.set(keys[i], emb)
+                cached[i] = emb
+
+        return np.vstack(cached).astype('float32')
+
+    def _rerank_pool(self, results: List[Dict], k: int, adaptive: bool, rerank_budget_ms: Optional[float],
+                     mode: str) -> Tuple[List[int], str]:
+        """(indices into results to rerank, path); candidates are picked by dense score, not by their order"""
+        # Hybrid rows come in fusion order, so the best dense scores need not be a prefix of the candidates
+        order = sorted(range(len(results)), key=lambda i: results[i]['similarity_score'], reverse=True)
+        pool, path = len(results), 'full'
+        # Lexical rows carry BM25 scores, on a scale the cosine margin means nothing on
+        if adaptive and mode != 'lexical' and len(results) > k:
+            # Only candidates whose dense score is within the margin of the k-th best can change the top-k
+            cutoff = results[order[k - 1]]['similarity_score'] - self.adaptive_margin
+            pool = sum(1 for r in results if r['similarity_score'] >= cutoff)
+            if pool <= k:
+                return [], 'skipped'
+            if pool < len(results):
+                path = 'shrunk'
+        if rerank_budget_ms is not None and self.rerank_ms_per_pair:
+            affordable = int(rerank_budget_ms / self.rerank_ms_per_pair)
+            if affordable < pool:
+                pool, path = max(affordable, 0), 'budget'
+        if pool == len(results):
+            return list(range(pool)), path
+        return sorted(order[:pool]), path
+
+    def _rerank_batch(self, queries: List[str], batch_results: List[List[Dict]], batch_ids: List[List[int]],
+                      k: int, adaptive: bool = False, rerank_budget_ms: Optional[float] = None,
+                      mode: str = 'dense') -> List[Dict]:
+        plans = [self._rerank_pool(results, k, adaptive, rerank_budget_ms, mode) for results in batch_results]
+        pairs = [
+            (query, ids[i])
+            for query, ids, (pool, _) in zip(queries, batch_ids, plans)
+            for i in pool
+        ]
 
-        if rerank:
-            pairs = [[query, self.create_product_text(r)] for r in results]
-            rerank_scores = self.reranker.predict(pairs)
-            for i, r in enumerate(results):
-                r['rerank_score'] = float(rerank_scores[i])
-            results.sort(key=lambda x: x['rerank_score'], reverse=True)
+        if pairs:
+            start = time.perf_counter()
+            with stage('rerank'):
+                rerank_scores = self.rerank_corpus.predict(pairs)
+            per_pair = (time.perf_counter() - start) * 1000 / len(pairs)
+            if self.rerank_ms_per_pair is None:
+                self.rerank_ms_per_pair = per_pair
+            else:
+                self.rerank_ms_per_pair = 0.8 * self.rerank_ms_per_pair + 0.2 * per_pair
 
-        return results
+        infos = []
+        offset = 0
+        for results, (pool, path) in zip(batch_results, plans):
+            for i in pool:
+                results[i]['rerank_score'] = float(rerank_scores[offset])
+                offset += 1
+            # Reranked candidates first, by rerank score; the rest keep their retrieval order
+            reranked = sorted((results[i] for i in pool), key=lambda x: x['rerank_score'], reverse=True)
+            chosen = set(pool)
+            results[:] = reranked + [r for i, r in enumerate(results) if i not in chosen]
+            infos.append({'path': path, 'candidates': len(results), 'reranked': len(pool)})
+        return infos
 
     def evaluate(self, queries: List[str], relevant_ids: List[Set[str]], k: int = 10) -> Dict[str, float]:
-        all_retrieved = []
         relevance_mappings = [{url: 1.0 for url in relevant_set} for relevant_set in relevant_ids]
-        for query in queries:
-            results = self.search(query, k=k)
-            retrieved_ids = [str(r.get('url', '')) for r in results]
-            all_retrieved.append(retrieved_ids)
+        all_retrieved = [[str(r.get('url', '')) for r in results] for results in self.search_batch(queries, k=k)]
         return mean_metrics_at_k(relevance_mappings, all_retrieved, k)
 
     def evaluate_example(self):
@@ -97,6 +537,8 @@ class ProductEmbeddings:
         print("\nEvaluation Metrics:")
         print(f"Mean Recall@5: {metrics['mean_recall@k']:.3f}")
         print(f"MAP@5: {metrics['map@k']:.3f}")
+        print(f"nDCG@5: {metrics['ndcg@k']:.3f}")
+        print(f"MRR@5: {metrics['mrr@k']:.3f}")
 
         print("\nSearch results for:", queries[0])
         results = self.search(queries[0], k=3)
@@ -115,9 +557,8 @@ def main():
     embedder.load_products(products_path)
     embedder.generate_embeddings()
 
-    index_path = os.path.join('src', 'embeddings', 'products.index')
-    os.makedirs(os.path.dirname(index_path), exist_ok=True)
-    embedder.save_index(index_path)
+    bundle_path = os.path.join('src', 'embeddings', 'products.bundle')
+    embedder.save_bundle(bundle_path)
 
     query = "entry level sales position"
     results = embedder.search(query, k=3)
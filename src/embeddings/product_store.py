@@ -0,0 +1,351 @@
+import array
+import hashlib
+import json
+import mmap
+import os
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.embeddings.filters import parse_duration
+
+STORE_MAGIC = b'SHLSTOR1'
+STORE_VERSION = 2
+# Version 1 stores kept pdf_links as JSON; they are still read
+READABLE_VERSIONS = (1, STORE_VERSION)
+ALIGNMENT = 64
+
+# Free text lives in one UTF-8 buffer; low-cardinality fields are interned and stored as codes
+STRING_FIELDS = ('url', 'title', 'description')
+ENUM_FIELDS = ('job_level', 'languages', 'completion_time', 'test_types', 'remote_testing')
+KEYS_FIELD = '_keys'
+PDF_LINKS_FIELD = 'pdf_links'
+EXTRA_FIELD = '_extra'
+BUFFER_FIELDS = STRING_FIELDS + (PDF_LINKS_FIELD, EXTRA_FIELD)
+CODE_FIELDS = ENUM_FIELDS + (KEYS_FIELD,)
+# pdf_links of {'name', 'url'} strings is plain text: links joined by LINK_SEPARATOR, name and url by
+# PAIR_SEPARATOR, so materializing a product splits strings instead of parsing JSON. Other shapes go to the extras
+LINK_KEYS = ('name', 'url')
+LINK_SEPARATOR = '\x1e'
+PAIR_SEPARATOR = '\x1f'
+
+
+def _intern(vocab: List, lookup: Dict[str, int], value) -> int:
+    key = json.dumps(value, sort_keys=True, ensure_ascii=False)
+    code = lookup.get(key)
+    if code is None:
+        code = lookup[key] = len(vocab)
+        # Decoded from the key so the vocabulary never aliases a caller's list
+        vocab.append(json.loads(key))
+    return code
+
+
+def _copy(value):
+    # Interned lists are shared between rows, so callers get their own copy
+    return list(value) if isinstance(value, list) else value
+
+
+def _encode_links(value) -> Optional[str]:
+    """pdf_links as separator-joined text; None if it is not a list of {'name', 'url'} strings"""
+    if not isinstance(value, list):
+        return None
+    links = []
+    for link in value:
+        if not isinstance(link, dict) or tuple(link) != LINK_KEYS:
+            return None
+        for text in link.values():
+            if not isinstance(text, str) or LINK_SEPARATOR in text or PAIR_SEPARATOR in text:
+                return None
+        links.append(link['name'] + PAIR_SEPARATOR + link['url'])
+    return LINK_SEPARATOR.join(links)
+
+
+def _decode_links(text: str) -> List[Dict[str, str]]:
+    if not text:
+        return []
+    return [{'name': name, 'url': url}
+            for name, _, url in (link.partition(PAIR_SEPARATOR) for link in text.split(LINK_SEPARATOR))]
+
+
+class ProductStore:
+    """Products as columns: string offsets into one UTF-8 buffer, interned enum codes and durations.
+
+    Built from dicts with from_products, written to a single file with save and memory-mapped
+    again with open, so every API worker shares the same pages. store[pos] materializes a dict;
+    view(pos) returns a ResultView that decodes fields only when they are read.
+    """
+
+    def __init__(self, size: int, offsets: np.ndarray, buffer: np.ndarray, codes: np.ndarray,
+                 minutes: np.ndarray, vocab: Dict[str, List], mapped: Optional[mmap.mmap] = None,
+                 version: int = STORE_VERSION):
+        self.size = size
+        self.offsets = offsets
+        self.buffer = buffer
+        self.codes = codes
+        self.minutes = minutes
+        self.vocab = vocab
+        self._mapped = mapped
+        self.version = version
+        self._decode_links = json.loads if version == 1 else _decode_links
+        self._buffer_column = {field: i for i, field in enumerate(BUFFER_FIELDS)}
+        self._code_column = {field: i for i, field in enumerate(CODE_FIELDS)}
+        self._layouts: Dict[int, List[Tuple[str, Optional[int], Optional[int]]]] = {}
+        # Plain memoryviews index to Python ints and bytes without numpy's per-scalar overhead
+        self._offset_view = memoryview(offsets)
+        self._buffer_view = memoryview(buffer)
+        self._code_view = memoryview(codes)
+
+    @classmethod
+    def from_products(cls, products: Iterable[Dict]) -> 'ProductStore':
+        vocab: Dict[str, List] = {field: [] for field in CODE_FIELDS}
+        lookups: Dict[str, Dict[str, int]] = {field: {} for field in CODE_FIELDS}
+        # Packed as they stream in, so building holds bytes and machine ints rather than Python objects per row
+        buffer = bytearray()
+        lengths = array.array('q')
+        codes = array.array('I')
+        minutes = array.array('f')
+
+        for product in products:
+            stored = set()
+            row_strings = []
+            for field in STRING_FIELDS:
+                value = product.get(field)
+                if isinstance(value, str):
+                    stored.add(field)
+                    row_strings.append(value)
+                else:
+                    row_strings.append('')
+            row_codes = []
+            for field in ENUM_FIELDS:
+                if field in product:
+                    stored.add(field)
+                row_codes.append(_intern(vocab[field], lookups[field], product.get(field)))
+            links = _encode_links(product[PDF_LINKS_FIELD]) if PDF_LINKS_FIELD in product else None
+            if links is not None:
+                stored.add(PDF_LINKS_FIELD)
+            row_strings.append(links or '')
+            extra = {key: value for key, value in product.items() if key not in stored}
+            row_strings.append(json.dumps(extra, ensure_ascii=False) if extra else '')
+            row_codes.append(_intern(vocab[KEYS_FIELD], lookups[KEYS_FIELD], list(product.keys())))
+
+            for text in row_strings:
+                encoded = text.encode('utf-8')
+                buffer += encoded
+                lengths.append(len(encoded))
+            codes.extend(row_codes)
+            minutes.append(parse_duration(product.get('completion_time')))
+
+        size = len(minutes)
+        offsets = np.zeros(len(lengths) + 1, dtype='int64')
+        np.cumsum(np.frombuffer(lengths, dtype='int64'), out=offsets[1:])
+        return cls(
+            size=size,
+            offsets=offsets,
+            buffer=np.frombuffer(buffer, dtype=np.uint8),
+            codes=np.frombuffer(codes, dtype='uint32').reshape(size, len(CODE_FIELDS)),
+            minutes=np.frombuffer(minutes, dtype='float32'),
+            vocab=vocab,
+        )
+
+    def save(self, path: str):
+        columns = {'offsets': self.offsets, 'buffer': self.buffer, 'codes': self.codes, 'minutes': self.minutes}
+        layout, position = {}, 0
+        for name, column in columns.items():
+            layout[name] = {'dtype': column.dtype.str, 'shape': list(column.shape), 'offset': position}
+            position += -(-column.nbytes // ALIGNMENT) * ALIGNMENT
+        header = json.dumps({'version': self.version, 'size': self.size, 'buffer_fields': BUFFER_FIELDS,
+                             'code_fields': CODE_FIELDS, 'vocab': self.vocab, 'arrays': layout},
+                            ensure_ascii=False).encode('utf-8')
+        data_start = -(-(len(STORE_MAGIC) + 8 + len(header)) // ALIGNMENT) * ALIGNMENT
+
+        with open(path, 'wb') as f:
+            f.write(STORE_MAGIC)
+            f.write(len(header).to_bytes(8, 'little'))
+            f.write(header)
+            for name, column in columns.items():
+                f.seek(data_start + layout[name]['offset'])
+                f.write(np.ascontiguousarray(column).tobytes())
+            f.truncate(data_start + position)
+
+    @classmethod
+    def open(cls, path: str) -> 'ProductStore':
+        with open(path, 'rb') as f:
+            if f.read(len(STORE_MAGIC)) != STORE_MAGIC:
+                raise ValueError(f"{path} is not a product store")
+            header_length = int.from_bytes(f.read(8), 'little')
+            header = json.loads(f.read(header_length).decode('utf-8'))
+            if header['version'] not in READABLE_VERSIONS or tuple(header['buffer_fields']) != BUFFER_FIELDS \
+                    or tuple(header['code_fields']) != CODE_FIELDS:
+                raise ValueError(f"{path} was written by an incompatible product store version")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(path) else None
+        data_start = -(-(len(STORE_MAGIC) + 8 + header_length) // ALIGNMENT) * ALIGNMENT
+
+        def column(name: str) -> np.ndarray:
+            spec = header['arrays'][name]
+            count = int(np.prod(spec['shape']))
+            if count == 0:
+                return np.zeros(spec['shape'], dtype=spec['dtype'])
+            return np.frombuffer(mapped, dtype=spec['dtype'], count=count,
+                                 offset=data_start + spec['offset']).reshape(spec['shape'])
+
+        return cls(header['size'], column('offsets'), column('buffer'), column('codes'), column('minutes'),
+                   header['vocab'], mapped, header['version'])
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[Dict]:
+        return (self[pos] for pos in range(self.size))
+
+    def __getitem__(self, pos: int) -> Dict:
+        if not -self.size <= pos < self.size:
+            raise IndexError(pos)
+        pos %= self.size
+        # One slice of the buffer and one row of codes per product, decoded in a single pass
+        width = len(BUFFER_FIELDS)
+        bounds = self._offset_view[pos * width:(pos + 1) * width + 1].tolist()
+        start = bounds[0]
+        raw = self._buffer_view[start:bounds[-1]].tobytes()
+        text = raw.decode('utf-8')
+        if len(text) == len(raw):
+            # ASCII, so byte offsets are character offsets and the row is decoded once
+            texts = [text[bounds[i] - start:bounds[i + 1] - start] for i in range(width)]
+        else:
+            texts = [raw[bounds[i] - start:bounds[i + 1] - start].decode('utf-8') for i in range(width)]
+        codes = self.codes[pos].tolist()
+        extra = json.loads(texts[-1]) if texts[-1] else {}
+
+        product = {}
+        for key, code_column, buffer_column in self._layout(codes[-1]):
+            if key in extra:
+                product[key] = extra[key]
+            elif code_column is not None:
+                product[key] = _copy(self.vocab[key][codes[code_column]])
+            elif key == PDF_LINKS_FIELD:
+                product[key] = self._decode_links(texts[buffer_column])
+            else:
+                product[key] = texts[buffer_column]
+        return product
+
+    def _layout(self, keys_code: int) -> List[Tuple[str, Optional[int], Optional[int]]]:
+        """(key, code column, buffer column) per key of a key order, resolved once per distinct order"""
+        layout = self._layouts.get(keys_code)
+        if layout is None:
+            layout = self._layouts[keys_code] = [(key, self._code_column.get(key), self._buffer_column.get(key))
+                                                 for key in self.vocab[KEYS_FIELD][keys_code]]
+        return layout
+
+    def _text(self, pos: int, field: str) -> str:
+        cell = pos * len(BUFFER_FIELDS) + self._buffer_column[field]
+        return str(self._buffer_view[self._offset_view[cell]:self._offset_view[cell + 1]], 'utf-8')
+
+    def _extra(self, pos: int) -> Dict:
+        text = self._text(pos, EXTRA_FIELD)
+        return json.loads(text) if text else {}
+
+    def keys(self, pos: int) -> List[str]:
+        return self.vocab[KEYS_FIELD][self._code_view[pos, len(CODE_FIELDS) - 1]]
+
+    def field(self, pos: int, key: str) -> Any:
+        """One field of one product, decoded on its own; KeyError if the product does not have it"""
+        if key in STRING_FIELDS or key == PDF_LINKS_FIELD:
+            text = self._text(pos, key)
+            # Only values the product has are written to the buffer, so non-empty text needs no key check
+            if text:
+                return self._decode_links(text) if key == PDF_LINKS_FIELD else text
+        if key not in self.keys(pos):
+            raise KeyError(key)
+        column = self._code_column.get(key)
+        if column is not None:
+            return _copy(self.vocab[key][self._code_view[pos, column]])
+        extra = self._extra(pos)
+        if key in extra:
+            return extra[key]
+        # Empty text that is not kept with the extras is an empty value
+        return [] if key == PDF_LINKS_FIELD else ''
+
+    def string(self, pos: int, key: str) -> Optional[str]:
+        """A string field read straight from the buffer; None if the product has no string value for it"""
+        text = self._text(pos, key)
+        if text:
+            return text
+        return text if key in self.keys(pos) and key not in self._extra(pos) else None
+
+    def enum(self, field: str) -> Tuple[np.ndarray, List]:
+        """(per-product codes, vocabulary) of an interned field"""
+        return self.codes[:, self._code_column[field]], self.vocab[field]
+
+    def view(self, pos: int, scores: Optional[Dict[str, float]] = None) -> 'ResultView':
+        return ResultView(self, pos, scores)
+
+    def digest(self) -> str:
+        """sha256 over the columns and vocabularies, i.e. over exactly what the store materializes"""
+        digest = hashlib.sha256(json.dumps(self.vocab, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        for column in (self.offsets, self.buffer, self.codes, self.minutes):
+            digest.update(np.ascontiguousarray(column).data)
+        return digest.hexdigest()
+
+    def nbytes(self) -> int:
+        return self.offsets.nbytes + self.buffer.nbytes + self.codes.nbytes + self.minutes.nbytes \
+            + len(json.dumps(self.vocab).encode('utf-8'))
+
+
+class ResultView(Mapping):
+    """Read-only product fields plus writable per-request scores; materialized by to_dict()"""
+
+    __slots__ = ('store', 'pos', 'scores')
+
+    def __init__(self, store: ProductStore, pos: int, scores: Optional[Dict[str, Any]] = None):
+        self.store = store
+        self.pos = pos
+        self.scores = scores if scores is not None else {}
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.scores:
+            return self.scores[key]
+        return self.store.field(self.pos, key)
+
+    def __setitem__(self, key: str, value: Any):
+        self.scores[key] = value
+
+    def __contains__(self, key) -> bool:
+        return key in self.scores or key in self.store.keys(self.pos)
+
+    def __iter__(self) -> Iterator[str]:
+        keys = self.store.keys(self.pos)
+        yield from keys
+        yield from (key for key in self.scores if key not in keys)
+
+    def __len__(self) -> int:
+        keys = self.store.keys(self.pos)
+        return len(keys) + sum(1 for key in self.scores if key not in keys)
+
+    def copy(self) -> 'ResultView':
+        return ResultView(self.store, self.pos, dict(self.scores))
+
+    def project(self, fields: Iterable[str]) -> Dict:
+        """Only the given fields (scores or product fields) that this result has, decoded one by one"""
+        keys = self.store.keys(self.pos)
+        projected = {}
+        for field in fields:
+            if field in self.scores:
+                projected[field] = self.scores[field]
+            elif field in keys:
+                projected[field] = self.store.field(self.pos, field)
+        return projected
+
+    def to_dict(self) -> Dict:
+        product = self.store[self.pos]
+        product.update(self.scores)
+        return product
+
+    def __repr__(self) -> str:
+        return f'ResultView({self.to_dict()!r})'
+
+
+def json_default(obj):
+    """json.dumps default= hook that materializes result views only when a response is encoded"""
+    if isinstance(obj, ResultView):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -0,0 +1,144 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+
+class PretokenizedReranker:
+    """Cross-encoder scoring over a product corpus whose tokenizations are cached per product"""
+
+    def __init__(self, cross_encoder, batch_size: int = 32):
+        self.cross_encoder = cross_encoder
+        self.batch_size = batch_size
+        self.tokenizer = getattr(cross_encoder, 'tokenizer', None)
+        self.model = getattr(cross_encoder, 'model', None)
+        self.texts: List[str] = []
+        self._token_ids: List[Optional[List[int]]] = []
+
+        if self.tokenizer is not None:
+            self.max_length = getattr(cross_encoder, 'max_length', None) or self.tokenizer.model_max_length
+            self.num_special = self.tokenizer.num_special_tokens_to_add(pair=True)
+            self.use_token_types = 'token_type_ids' in self.tokenizer.model_input_names
+            self._template = self._pair_template()
+
+    def _pair_template(self):
+        # Learn where the tokenizer puts special tokens around a (query, document) pair
+        probe = self.tokenizer('query', 'document')
+        first = self.tokenizer('query', add_special_tokens=False)['input_ids']
+        second = self.tokenizer('document', add_special_tokens=False)['input_ids']
+        ids = probe['input_ids']
+        types = probe.get('token_type_ids') or [0] * len(ids)
+
+        a = next(i for i in range(len(ids)) if ids[i:i + len(first)] == first)
+        b = next(i for i in range(a + len(first), len(ids)) if ids[i:i + len(second)] == second)
+        a_end, b_end = a + len(first), b + len(second)
+        return {
+            'prefix': (ids[:a], types[:a]),
+            'middle': (ids[a_end:b], types[a_end:b]),
+            'suffix': (ids[b_end:], types[b_end:]),
+            'first_type': types[a],
+            'second_type': types[b],
+        }
+
+    def _build_pair(self, query_ids: List[int], doc_ids: List[int]) -> Tuple[List[int], List[int]]:
+        t = self._template
+        input_ids = t['prefix'][0] + query_ids + t['middle'][0] + doc_ids + t['suffix'][0]
+        token_types = (t['prefix'][1] + [t['first_type']] * len(query_ids) + t['middle'][1]
+                       + [t['second_type']] * len(doc_ids) + t['suffix'][1])
+        return input_ids, token_types
+
+    def set_corpus(self, texts: List[str]):
+        self.texts = texts
+        self._token_ids = [None] * len(texts)
+
+    def product_token_ids(self, idx: int) -> List[int]:
+        ids = self._token_ids[idx]
+        if ids is None:
+            ids = self.tokenizer(self.texts[idx], add_special_tokens=False, verbose=False)['input_ids']
+            self._token_ids[idx] = ids
+        return ids
+
+    def _truncate(self, query_ids: List[int], doc_ids: List[int]) -> Tuple[List[int], List[int]]:
+        # Mirrors the loaded tokenizer's 'longest_first' strategy so scores match CrossEncoder.predict;
+        # fast (Rust) and slow (Python) tokenizers split an odd budget differently
+        if not self.max_length or len(query_ids) + len(doc_ids) + self.num_special <= self.max_length:
+            return query_ids, doc_ids
+        if getattr(self.tokenizer, 'is_fast', False):
+            query_keep, doc_keep = self._fast_lengths(len(query_ids), len(doc_ids))
+        else:
+            query_keep, doc_keep = self._slow_lengths(len(query_ids), len(doc_ids))
+        return query_ids[:query_keep], doc_ids[:doc_keep]
+
+    def _fast_lengths(self, n_query: int, n_doc: int) -> Tuple[int, int]:
+        """Kept lengths as the tokenizers library truncates a pair: both halves go to the shorter sequence first"""
+        budget = max(self.max_length - self.num_special, 0)
+        shorter, longer = min(n_query, n_doc), max(n_query, n_doc)
+        longer = longer if shorter > budget else max(shorter, budget - shorter)
+        if shorter + longer > budget:
+            shorter = budget // 2
+            longer = shorter + budget % 2
+        return (longer, shorter) if n_query > n_doc else (shorter, longer)
+
+    def _slow_lengths(self, n_query: int, n_doc: int) -> Tuple[int, int]:
+        """Kept lengths as PreTrainedTokenizer.truncate_sequences removes tokens from a pair"""
+        to_remove = n_query + n_doc + self.num_special - self.max_length
+        first_remove = min(abs(n_doc - n_query), to_remove)
+        second_remove = to_remove - first_remove
+        if n_query > n_doc:
+            query_remove = first_remove + second_remove // 2
+            doc_remove = second_remove - second_remove // 2
+        else:
+            query_remove = second_remove // 2
+            doc_remove = first_remove + second_remove - second_remove // 2
+        return n_query - query_remove, n_doc - doc_remove
+
+    def predict(self, pairs: Sequence[Tuple[str, int]]) -> np.ndarray:
+        if not pairs:
+            return np.zeros(0, dtype='float32')
+        if self.tokenizer is None or (self.model is None and not hasattr(self.cross_encoder, 'score_batch')):
+            return np.asarray(self.cross_encoder.predict([[q, self.texts[i]] for q, i in pairs]))
+
+        query_ids = {}
+        features = []
+        for query, idx in pairs:
+            if query not in query_ids:
+                query_ids[query] = self.tokenizer(query, add_special_tokens=False, verbose=False)['input_ids']
+            q_ids, d_ids = self._truncate(query_ids[query], self.product_token_ids(idx))
+            features.append(self._build_pair(q_ids, d_ids))
+
+        pad_id = self.tokenizer.pad_token_id or 0
+        order = np.argsort([-len(f[0]) for f in features], kind='stable')
+        scores = np.zeros(len(features), dtype='float32')
+
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            width = len(features[batch[0]][0])
+            input_ids = np.full((len(batch), width), pad_id, dtype='int64')
+            token_type_ids = np.zeros((len(batch), width), dtype='int64')
+            attention_mask = np.zeros((len(batch), width), dtype='int64')
+            for row, i in enumerate(batch):
+                ids, types = features[i]
+                input_ids[row, :len(ids)] = ids
+                token_type_ids[row, :len(types)] = types
+                attention_mask[row, :len(ids)] = 1
+
+            inputs = {'input_ids': input_ids, 'attention_mask': attention_mask}
+            if self.use_token_types:
+                inputs['token_type_ids'] = token_type_ids
+            scores[batch] = self._forward(inputs)
+
+        return scores
+
+    def _forward(self, inputs: Dict[str, np.ndarray]) -> np.ndarray:
+        if hasattr(self.cross_encoder, 'score_batch'):
+            return self.cross_encoder.score_batch(inputs)
+
+        import torch
+
+        activation = self.cross_encoder.default_activation_function
+        device = getattr(self.cross_encoder, '_target_device', None) or self.model.device
+        self.model.eval()
+        with torch.no_grad():
+            tensors = {name: torch.from_numpy(array).to(device) for name, array in inputs.items()}
+            logits = activation(self.model(**tensors, return_dict=True).logits)
+            if logits.shape[-1] == 1:
+                logits = logits[:, 0]
+            return logits.float().cpu().numpy()
@@ -0,0 +1,95 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+
+class SemanticCache:
+    """Recent queries by embedding, answering near-duplicate queries with an earlier query's entry.
+
+    Entries are grouped by search options (k, rerank, filters, mode, ...) and each group keeps its
+    normalized query embeddings in a small inner-product FAISS index, so a lookup is a cosine
+    nearest-neighbour search. Entries are evicted least recently used across all groups.
+    """
+
+    def __init__(self, dimension: int, maxsize: int = 1024, threshold: float = 0.92):
+        self.dimension = dimension
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self._similarity_sum = 0.0
+        self._next_id = 0
+        self._groups: Dict[Hashable, faiss.IndexIDMap2] = {}
+        # id -> (options, query, value), in least to most recently used order
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def lookup(self, options: Hashable, embeddings: np.ndarray) -> List[Optional[Tuple[Any, str, float]]]:
+        """(value, cached query, cosine similarity) of the closest entry above the threshold, per embedding"""
+        with self._lock:
+            index = self._groups.get(options)
+            if index is None or index.ntotal == 0:
+                self.misses += len(embeddings)
+                return [None] * len(embeddings)
+            scores, ids = index.search(np.ascontiguousarray(embeddings, dtype='float32'), 1)
+            matches = []
+            for score, entry_id in zip(scores[:, 0].tolist(), ids[:, 0].tolist()):
+                if entry_id < 0 or score < self.threshold:
+                    self.misses += 1
+                    matches.append(None)
+                    continue
+                self._entries.move_to_end(entry_id)
+                _, query, value = self._entries[entry_id]
+                self.hits += 1
+                self._similarity_sum += score
+                matches.append((value, query, score))
+            return matches
+
+    def add(self, options: Hashable, embedding: np.ndarray, query: str, value: Any):
+        if not self.enabled:
+            return
+        with self._lock:
+            index = self._groups.get(options)
+            if index is None:
+                index = self._groups[options] = faiss.IndexIDMap2(faiss.IndexFlatIP(self.dimension))
+            entry_id = self._next_id
+            self._next_id += 1
+            index.add_with_ids(np.asarray(embedding, dtype='float32').reshape(1, -1),
+                               np.array([entry_id], dtype='int64'))
+            self._entries[entry_id] = (options, query, value)
+            while len(self._entries) > self.maxsize:
+                self._evict()
+
+    def _evict(self):
+        entry_id, (options, _, _) = self._entries.popitem(last=False)
+        index = self._groups[options]
+        index.remove_ids(np.array([entry_id], dtype='int64'))
+        if index.ntotal == 0:
+            del self._groups[options]
+
+    def clear(self):
+        with self._lock:
+            self._groups.clear()
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'threshold': self.threshold,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+            'mean_hit_similarity': self._similarity_sum / self.hits if self.hits else None,
+        }
@@ -0,0 +1,49 @@
+import hashlib
+from functools import lru_cache
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from src.embeddings.lexical import tokenize
+
+
+@lru_cache(maxsize=200_000)
+def _bucket(token: str, dimension: int) -> Tuple[int, float]:
+    digest = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big')
+    return digest % dimension, 1.0 if (digest >> 63) else -1.0
+
+
+class StubEncoder:
+    """Deterministic feature-hashing encoder for offline benchmarks; no model download or torch needed"""
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+        self.model_name = f'stub-{dimension}'
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, sentences, normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        sentences = [sentences] if single else list(sentences)
+        embeddings = np.zeros((len(sentences), self.dimension), dtype='float32')
+        for row, text in enumerate(sentences):
+            tokens = tokenize(text)
+            for feature in tokens + [a + ' ' + b for a, b in zip(tokens, tokens[1:])]:
+                col, sign = _bucket(feature, self.dimension)
+                embeddings[row, col] += sign
+        if normalize_embeddings:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings[0] if single else embeddings
+
+
+class StubCrossEncoder:
+    """Scores a (query, document) pair by the share of query terms found in the document"""
+
+    def predict(self, sentences: Sequence[Sequence[str]], **kwargs) -> np.ndarray:
+        scores = np.zeros(len(sentences), dtype='float32')
+        for i, (query, document) in enumerate(sentences):
+            terms = set(tokenize(query))
+            if terms:
+                scores[i] = len(terms & set(tokenize(document))) / len(terms)
+        return scores
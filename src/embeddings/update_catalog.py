@@ -0,0 +1,61 @@
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(root_dir))
+
+from src.embeddings.backends import BACKENDS
+from src.embeddings.bundle import file_sha256, read_manifest
+from src.embeddings.catalog import JSONL_SUFFIXES, is_jsonl, write_json_array, write_jsonl
+from src.embeddings.indexes import INDEX_TYPES
+from src.embeddings.product_embeddings import ProductEmbeddings
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Apply a catalog diff ({\"upsert\": [products], \"remove\": [urls]}) to an index bundle"
+    )
+    parser.add_argument('diff', help="JSON file with 'upsert' and/or 'remove' keys")
+    parser.add_argument('--bundle', default=os.path.join('src', 'embeddings', 'products.bundle'))
+    parser.add_argument('--catalog', default=os.path.join('src', 'data', 'shl_products.json'),
+                        help="Catalog file rewritten with the merged products, in its own format "
+                             "(JSON array or JSON Lines)")
+    parser.add_argument('--backend', default='torch', choices=BACKENDS,
+                        help="Encoder for new and changed products; must match the one the bundle was built with")
+    parser.add_argument('--onnx-dir')
+    parser.add_argument('--index-type', choices=INDEX_TYPES,
+                        help="Rebuild the index as this type from the stored embeddings (default: keep the bundle's)")
+    args = parser.parse_args()
+
+    with open(args.diff, 'r', encoding='utf-8') as f:
+        diff = json.load(f)
+
+    # Opened with the model and index settings it was built with, so any index type loads
+    manifest = read_manifest(args.bundle)
+    embedder = ProductEmbeddings(manifest['model_name'], backend=args.backend, onnx_dir=args.onnx_dir,
+                                 index_type=manifest['index_type'], **(manifest.get('index_params') or {}))
+    embedder.load_bundle(args.bundle)
+    if args.index_type and args.index_type != embedder.index_type:
+        embedder.index_type = args.index_type
+        embedder._rebuild_index(embedder.embeddings, embedder.position_ids)
+
+    removed = embedder.remove_products(diff.get('remove', []))
+    upserted = embedder.upsert_products(diff.get('upsert', []))
+
+    # Written back in the format it was read in, one product at a time from the store
+    jsonl = is_jsonl(args.catalog) if os.path.exists(args.catalog) else args.catalog.endswith(JSONL_SUFFIXES)
+    (write_jsonl if jsonl else write_json_array)(embedder.products, args.catalog)
+    embedder.catalog_hash = file_sha256(args.catalog)
+    embedder.save_bundle(args.bundle)
+
+    print(f"Upserted: {upserted['added']} added, {upserted['updated']} updated, "
+          f"{upserted['unchanged']} unchanged ({upserted['reencoded']} re-encoded)")
+    print(f"Removed: {removed['removed']} ({removed['missing']} not found)")
+    print(f"Bundle now holds {len(embedder.products)} products in a '{embedder.index_type}' index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+root_dir = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(root_dir))
+
+from src.scraper.pages import parse_catalog_page, parse_product_page
+
+BASE_URL = "https://www.shl.com/solutions/products/product-catalog/"
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+              "Chrome/122.0.0.0 Safari/537.36")
+TABLE_COUNT = 2
+DEFAULT_CONCURRENCY = 8
+MAX_RETRIES = 3
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+
+class Fetcher:
+    """One pooled HTTP client with at most `concurrency` requests in flight and retries with backoff"""
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, timeout: float = 30.0, retries: int = MAX_RETRIES,
+                 backoff: float = 1.0, user_agent: str = USER_AGENT):
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.retries = max(1, retries)
+        self.backoff = backoff
+        self.user_agent = user_agent
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0, 'bytes': 0}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> 'Fetcher':
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        self._client = httpx.AsyncClient(limits=limits, timeout=self.timeout, follow_redirects=True,
+                                         headers={'User-Agent': self.user_agent})
+        self._slots = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._client.aclose()
+
+    async def get(self, url: str) -> str:
+        for attempt in range(self.retries):
+            retry_after = self.backoff * 2 ** attempt
+            try:
+                async with self._slots:
+                    self.stats['requests'] += 1
+                    response = await self._client.get(url)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    self.stats['bytes'] += len(response.content)
+                    return response.text
+                if response.headers.get('Retry-After', '').isdigit():
+                    retry_after = max(retry_after, float(response.headers['Retry-After']))
+                error: Exception = httpx.HTTPStatusError(f"HTTP {response.status_code} for {url}",
+                                                         request=response.request, response=response)
+            except httpx.TransportError as e:
+                error = e
+            if attempt + 1 < self.retries:
+                self.stats['retries'] += 1
+                print(f"⚠️ Retry {attempt + 1}/{self.retries} for {url}: {error}")
+                await asyncio.sleep(retry_after)
+        self.stats['failures'] += 1
+        raise error
+
+
+class Parser:
+    """Runs the page parsers inline or, with workers, in a process pool so parsing uses every core"""
+
+    def __init__(self, workers: int = 0):
+        self.pool = None
+        if workers > 0:
+            self.pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+
+    async def __call__(self, fn: Callable, *args):
+        if self.pool is None:
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+
+async def scrape_table(fetcher: Fetcher, parse: Parser, base_url: str, table_index: int) -> List[str]:
+    """Product links of one catalog table, following its Next links page by page"""
+    all_links: Dict[str, None] = {}
+    url, heading, page, seen = base_url, None, 1, set()
+    while url and url not in seen:
+        seen.add(url)
+        try:
+            tables = await parse(parse_catalog_page, await fetcher.get(url), url)
+        except Exception as e:
+            print(f"⚠️ Error processing table {table_index + 1}: {str(e)}")
+            break
+        # Later pages may list the tables differently, so the table is followed by its heading
+        table = next((t for t in tables if heading is not None and t.heading == heading), None)
+        if table is None:
+            if len(tables) <= table_index:
+                print(f"⚠️ Table {table_index + 1} not found on page {page}")
+                break
+            table = tables[table_index]
+        heading = table.heading
+        print(f"📄 Table {table_index + 1}, Page {page}: Found {len(table.links)} links")
+        if not table.links:
+            break
+        all_links.update(dict.fromkeys(table.links))
+        url, page = table.next_url, page + 1
+    return list(all_links)
+
+
+async def get_all_product_links(fetcher: Fetcher, parse: Parser, base_url: str = BASE_URL,
+                                tables: int = TABLE_COUNT) -> List[str]:
+    per_table = await asyncio.gather(*(scrape_table(fetcher, parse, base_url, i) for i in range(tables)))
+    return list(dict.fromkeys(link for links in per_table for link in links))
+
+
+async def extract_product_info(fetcher: Fetcher, parse: Parser, product_url: str, index: int) -> Optional[Dict]:
+    try:
+        html = await fetcher.get(product_url)
+    except Exception as e:
+        print(f"⚠️ [{index}] Failed to load product page: {product_url} ({e})")
+        return None
+    data = await parse(parse_product_page, html, product_url)
+    if data["title"]:
+        print(f"📝 [{index}] {data['title']}")
+    else:
+        print(f"⚠️ [{index}] Failed to extract title")
+    return data
+
+
+async def scrape_products(fetcher: Fetcher, parse: Parser, product_links: List[str]) -> List[Dict]:
+    """Every product page fetched concurrently; products come back in link order"""
+    results = await asyncio.gather(*(extract_product_info(fetcher, parse, url, i)
+                                     for i, url in enumerate(product_links, start=1)))
+    return [data for data in results if data and data["title"]]
+
+
+async def crawl(base_url: str = BASE_URL, concurrency: int = DEFAULT_CONCURRENCY, parse_workers: int = 0,
+                tables: int = TABLE_COUNT, limit: Optional[int] = None, **fetcher_options) -> Dict:
+    parse = Parser(parse_workers)
+    try:
+        async with Fetcher(concurrency, **fetcher_options) as fetcher:
+            start = time.perf_counter()
+            product_links = await get_all_product_links(fetcher, parse, base_url, tables)
+            links_s = time.perf_counter() - start
+            print(f"\n🔗 Total product URLs collected: {len(product_links)}\n")
+            if limit is not None:
+                product_links = product_links[:limit]
+            products = await scrape_products(fetcher, parse, product_links)
+            total_s = time.perf_counter() - start
+    finally:
+        parse.close()
+    return {
+        'products': products,
+        'links': len(product_links),
+        'links_seconds': round(links_s, 3),
+        'seconds': round(total_s, 3),
+        'pages_per_second': round(fetcher.stats['requests'] / total_s, 2) if total_s > 0 else None,
+        'fetcher': fetcher.stats,
+    }
+
+
+def parse_file(path: str, url: str) -> Dict:
+    """Parse a saved listing or product page offline"""
+    with open(path, 'r', encoding='utf-8') as f:
+        html = f.read()
+    if 'custom__table-wrapper' in html:
+        return {'tables': [vars(table) for table in parse_catalog_page(html, url)]}
+    return parse_product_page(html, url)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape the SHL product catalog over HTTP with asyncio")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    crawl_parser = subparsers.add_parser('crawl', help="Crawl the catalog tables and every product page")
+    crawl_parser.add_argument('--base-url', default=BASE_URL)
+    crawl_parser.add_argument('--output', default="shl_all_products_paginated.json")
+    crawl_parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                              help="Requests in flight (and pooled connections)")
+    crawl_parser.add_argument('--parse-workers', type=int, default=min(4, os.cpu_count() or 1),
+                              help="Processes parsing HTML; 0 parses on the event loop")
+    crawl_parser.add_argument('--tables', type=int, default=TABLE_COUNT)
+    crawl_parser.add_argument('--limit', type=int, help="Only scrape the first N product pages")
+    crawl_parser.add_argument('--timeout', type=float, default=30.0)
+    crawl_parser.add_argument('--retries', type=int, default=MAX_RETRIES)
+
+    parse_parser = subparsers.add_parser('parse', help="Parse a saved page, e.g. debug_catalog.html")
+    parse_parser.add_argument('path')
+    parse_parser.add_argument('--url', default=BASE_URL, help="URL the page was saved from, to resolve links")
+    args = parser.parse_args()
+
+    if args.command == 'parse':
+        print(json.dumps(parse_file(args.path, args.url), indent=2, ensure_ascii=False))
+        return
+
+    print("🚀 Starting async SHL scraper...\n")
+    report = asyncio.run(crawl(args.base_url, args.concurrency, args.parse_workers, args.tables, args.limit,
+                               timeout=args.timeout, retries=args.retries))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report['products'], f, indent=2, ensure_ascii=False)
+    print(f"\n✅ Done! Scraped {len(report['products'])} products in {report['seconds']:.1f}s "
+          f"({report['pages_per_second']} pages/s, {report['fetcher']['retries']} retries, "
+          f"{report['fetcher']['failures']} failures)")
+
+
+if __name__ == "__main__":
+    main()
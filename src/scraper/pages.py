@@ -0,0 +1,137 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from urllib.parse import urljoin
+
+from selectolax.lexbor import LexborHTMLParser, LexborNode
+
+# Block boxes start a new line in rendered text, like Selenium's element.text
+BLOCK_TAGS = frozenset(('address', 'article', 'aside', 'blockquote', 'dd', 'div', 'dl', 'dt', 'fieldset', 'figcaption',
+                        'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main',
+                        'nav', 'ol', 'p', 'pre', 'section', 'table', 'tr', 'ul'))
+HIDDEN_TAGS = frozenset(('script', 'style', 'template', 'noscript'))
+WHITESPACE = re.compile(r'\s+')
+
+
+def attr(node: LexborNode, name: str) -> str:
+    # Valueless attributes come back as None
+    return node.attributes.get(name) or ''
+
+
+def render_text(node: LexborNode) -> str:
+    """Rendered text: whitespace collapsed, line breaks at <br> and block boundaries, lines stripped"""
+    parts: List[str] = []
+    _render(node, parts)
+    lines = (' '.join(line.split()) for line in ''.join(parts).split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def _render(node: LexborNode, parts: List[str]):
+    for child in node.iter(include_text=True):
+        tag = child.tag
+        if tag == '-text':
+            parts.append(WHITESPACE.sub(' ', child.text_content))
+        elif tag == 'br':
+            parts.append('\n')
+        elif tag.startswith('-') or tag in HIDDEN_TAGS:
+            # Comments and doctypes
+            continue
+        elif tag in BLOCK_TAGS:
+            parts.append('\n')
+            _render(child, parts)
+            parts.append('\n')
+        else:
+            _render(child, parts)
+
+
+def own_texts(node: LexborNode) -> List[str]:
+    """Direct text children (XPath text())"""
+    return [child.text_content for child in node.iter(include_text=True) if child.is_text_node]
+
+
+@dataclass
+class CatalogTable:
+    heading: str
+    links: List[str] = field(default_factory=list)
+    next_url: Optional[str] = None
+
+
+def parse_catalog_page(html: str, page_url: str) -> List[CatalogTable]:
+    """The product tables of a catalog listing page, with absolute links and the next page of each"""
+    tables = []
+    for wrapper in LexborHTMLParser(html).css('div.custom__table-wrapper'):
+        heading = wrapper.css_first('th')
+        table = CatalogTable(render_text(heading) if heading is not None else '')
+        for link in wrapper.css('table tbody tr a'):
+            href = attr(link, 'href')
+            if href and urljoin(page_url, href) not in table.links:
+                table.links.append(urljoin(page_url, href))
+        # "ul.pagination li.pagination__item.-arrow.-next a.pagination__arrow", unless disabled
+        pagination = wrapper.css_first('ul.pagination')
+        item = pagination.css_first('li.pagination__item.-arrow.-next') if pagination is not None else None
+        arrow = item.css_first('a.pagination__arrow') if item is not None else None
+        if arrow is not None and attr(arrow, 'href') and 'disabled' not in attr(arrow, 'class'):
+            table.next_url = urljoin(page_url, attr(arrow, 'href'))
+        tables.append(table)
+    return tables
+
+
+def _section_text(tree: LexborHTMLParser, heading: str) -> str:
+    # "//h4[text()='<heading>']/following-sibling::p"
+    for h4 in tree.css('h4'):
+        if any(text.strip() == heading for text in own_texts(h4)):
+            sibling = h4.next
+            while sibling is not None and sibling.tag != 'p':
+                sibling = sibling.next
+            if sibling is not None:
+                return render_text(sibling)
+    return ''
+
+
+def parse_product_page(html: str, product_url: str) -> Dict:
+    """The fields extract_product_info reads from a product page, from its HTML"""
+    tree = LexborHTMLParser(html)
+    data = {
+        "url": product_url,
+        "title": "",
+        "description": "",
+        "job_level": "",
+        "languages": "",
+        "completion_time": "",
+        "test_types": [],
+        "remote_testing": "no",
+        "pdf_links": []
+    }
+
+    title = tree.css_first('h1')
+    if title is not None:
+        data["title"] = render_text(title)
+    data["description"] = _section_text(tree, 'Description')
+    data["job_level"] = _section_text(tree, 'Job levels')
+    data["languages"] = _section_text(tree, 'Languages')
+    data["completion_time"] = _section_text(tree, 'Assessment length').split('=')[-1].strip()
+
+    paragraphs = tree.css('p')
+    # "//p[contains(., 'Test Type')]//span[@class='product-catalogue__key']"
+    test_type = next((p for p in paragraphs if 'Test Type' in p.text(deep=True)), None)
+    if test_type is not None:
+        keys = (render_text(span) for span in test_type.css('span') if attr(span, 'class') == 'product-catalogue__key')
+        data["test_types"] = [key for key in keys if key]
+
+    # "//p[contains(text(), 'Remote Testing')]/span": XPath 1.0 looks at the first text node only
+    for p in paragraphs:
+        texts = own_texts(p)
+        span = next((c for c in p.iter() if c.tag == 'span'), None)
+        if texts and 'Remote Testing' in texts[0] and span is not None:
+            if "yes" in attr(span, 'class'):
+                data["remote_testing"] = "yes"
+            break
+
+    for link in tree.css('a[href]'):
+        href = attr(link, 'href')
+        if href:
+            href = urljoin(product_url, href)
+            if href.endswith(".pdf"):
+                data["pdf_links"].append({"name": render_text(link), "url": href})
+
+    return data
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional
+
+from src.utils.helper import stream_genai_response
+from src.utils.instrumentation import stage
+
+
+class AnalysisJob:
+    def __init__(self, query: str, job_id: Optional[str] = None):
+        self.id = job_id or uuid.uuid4().hex
+        self.query = query
+        self.status = "pending"
+        self.chunks: List[str] = []
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "error")
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "query": self.query,
+            "status": self.status,
+            "ai_analysis": "".join(self.chunks),
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class AnalysisStore:
+    """Runs GenAI analyses in the background and keeps the most recent ones for polling or streaming"""
+
+    def __init__(self, max_jobs: int = 1000, max_workers: int = 4, cache=None):
+        self.max_jobs = max_jobs
+        self.cache = cache
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="genai")
+        self.jobs: "OrderedDict[str, AnalysisJob]" = OrderedDict()
+
+    def submit(self, client, search_results: str, query: str, job_id: Optional[str] = None) -> AnalysisJob:
+        """Start an analysis; with a job_id, a kept job of that id is reused unless it failed"""
+        if job_id is not None:
+            job = self.jobs.get(job_id)
+            if job is not None and job.status != "error":
+                self.jobs.move_to_end(job_id)
+                return job
+        loop = asyncio.get_running_loop()
+        job = AnalysisJob(query, job_id)
+        self.jobs[job.id] = job
+        while len(self.jobs) > self.max_jobs:
+            self.jobs.popitem(last=False)
+        loop.run_in_executor(self.executor, self._run, loop, job, client, search_results, query)
+        return job
+
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        return self.jobs.get(job_id)
+
+    def _run(self, loop, job: AnalysisJob, client, search_results: str, query: str):
+        loop.call_soon_threadsafe(self._update, job, "running", None, None)
+        try:
+            with stage("genai"):
+                for chunk in stream_genai_response(client, search_results, query, cache=self.cache):
+                    loop.call_soon_threadsafe(self._update, job, None, chunk, None)
+        except Exception as e:
+            loop.call_soon_threadsafe(self._update, job, "error", None, f"Error: {str(e)}")
+            return
+        loop.call_soon_threadsafe(self._update, job, "done", None, None)
+
+    @staticmethod
+    def _update(job: AnalysisJob, status: Optional[str], chunk: Optional[str], error: Optional[str]):
+        if chunk is not None:
+            job.chunks.append(chunk)
+        if error is not None:
+            job.error = error
+        if status is not None:
+            job.status = status
+            if job.done:
+                job.finished_at = time.time()
+        job._notify()
+
+    async def stream(self, job: AnalysisJob) -> AsyncIterator[str]:
+        sent = 0
+        while True:
+            changed = job._changed
+            while sent < len(job.chunks):
+                yield f"data: {json.dumps(job.chunks[sent])}\n\n"
+                sent += 1
+            if job.done:
+                yield f"event: {job.status}\ndata: {json.dumps(job.error or '')}\n\n"
+                return
+            await changed.wait()
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        if self.cache is not None:
+            self.cache.close()
@@ -0,0 +1,114 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from src.embeddings.cache import LRUCache
+
+
+class GenAICache:
+    """Two-tier cache for GenAI analyses: an in-memory LRU in front of a size-bounded SQLite file"""
+
+    def __init__(self, path: Optional[str] = None, memory_size: int = 256, max_disk_bytes: int = 64 * 1024 * 1024):
+        self.memory = LRUCache(maxsize=memory_size)
+        self.max_disk_bytes = max_disk_bytes
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.saved_latency_ms = 0.0
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_cache ("
+                "key TEXT PRIMARY KEY, model TEXT, response TEXT, size INTEGER, "
+                "latency_ms REAL, created_at REAL, last_access REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS analysis_cache_access ON analysis_cache (last_access)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(prompt: str, model: str) -> str:
+        return hashlib.sha256(f"{model}\0{prompt}".encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.memory.get(key)
+        if entry is not None:
+            with self._lock:
+                self.memory_hits += 1
+                self.saved_latency_ms += entry[1]
+            return entry[0]
+
+        if self._db is not None:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT response, latency_ms FROM analysis_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE analysis_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+                    self._db.commit()
+                    self.disk_hits += 1
+                    self.saved_latency_ms += row[1]
+            if row is not None:
+                self.memory.set(key, (row[0], row[1]))
+                return row[0]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, response: str, model: str = '', latency_ms: float = 0.0):
+        self.memory.set(key, (response, latency_ms))
+        if self._db is None:
+            return
+        now = time.time()
+        size = len(response.encode('utf-8'))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO analysis_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, latency_ms, now, now)
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM analysis_cache").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM analysis_cache ORDER BY last_access").fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= self.max_disk_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM analysis_cache WHERE key = ?", stale)
+
+    def stats(self) -> Dict[str, float]:
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        stats = {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_ratio': hits / total if total else 0.0,
+            'saved_latency_ms': round(self.saved_latency_ms, 1),
+            'memory_entries': len(self.memory),
+        }
+        if self._db is not None:
+            with self._lock:
+                count, size = self._db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analysis_cache"
+                ).fetchone()
+            stats['disk_entries'] = count
+            stats['disk_bytes'] = size
+        return stats
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
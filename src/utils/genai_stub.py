@@ -0,0 +1,36 @@
+import os
+import time
+from types import SimpleNamespace
+
+
+class StubModels:
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def _answer(self, contents: str) -> str:
+        query = contents.split('"')[1] if '"' in contents else ""
+        return (
+            f"Stub analysis for \"{query}\".\n"
+            "1. Top matching solutions are listed in ranked order above.\n"
+            "2. Key features follow the test types of each product.\n"
+            "3. Recommended job levels match the listed job levels.\n"
+            "4. Use the highest ranked solution first."
+        )
+
+    def generate_content(self, model: str, contents: str):
+        time.sleep(self.delay)
+        return SimpleNamespace(text=self._answer(contents))
+
+    def generate_content_stream(self, model: str, contents: str):
+        for word in self._answer(contents).split(" "):
+            time.sleep(self.delay / 20)
+            yield SimpleNamespace(text=word + " ")
+
+
+class StubGenAIClient:
+    """Offline stand-in for genai.Client, enabled with GENAI_STUB=1"""
+
+    def __init__(self, delay: float = None):
+        if delay is None:
+            delay = float(os.getenv('GENAI_STUB_DELAY', '0.5'))
+        self.models = StubModels(delay)
@@ -1,6 +1,8 @@
 import os
+import time
 from dotenv import load_dotenv
 from google import genai
+from src.embeddings.evaluation import graded_recall_at_k, average_precision_at_k as graded_average_precision
 
 def get_graded_relevance(results):
     if not results:
@@ -11,29 +13,11 @@ def get_graded_relevance(results):
         for r in results if 'url' in r
     }
 
-def graded_recall_at_k(relevant_scores, retrieved, k):
-    top_k = retrieved[:k]
-    total_relevance = sum(relevant_scores.values())
-    if total_relevance == 0:
-        return 0.0
-    retrieved_relevance = sum(relevant_scores.get(url, 0) for url in top_k)
-    return retrieved_relevance / total_relevance
-
-def graded_average_precision(relevant_scores, retrieved, k):
-    hits = 0
-    sum_precisions = 0.0
-    total_relevant = sum(1 for score in relevant_scores.values() if score > 0)
-    if total_relevant == 0:
-        return 0.0
-    for i, item in enumerate(retrieved[:k], 1):
-        if item in relevant_scores and relevant_scores[item] > 0:
-            hits += 1
-            precision = hits / i
-            sum_precisions += precision * relevant_scores[item]
-    return sum_precisions / min(total_relevant, k)
-
 def init_genai():
     load_dotenv()
+    if os.getenv('GENAI_STUB'):
+        from src.utils.genai_stub import StubGenAIClient
+        return StubGenAIClient()
     api_key = os.getenv('GOOGLE_API_KEY')
     if not api_key:
         return None
@@ -49,11 +33,10 @@ def format_results(results, query):
         formatted += f"   Description: {result.get('description', '')[:200]}...\n\n"
     return formatted
 
-def get_genai_response(client, search_results, query):
-    if not client:
-        return "GenAI client not available."
-    
-    prompt = f"""Analyze these SHL assessment results for query "{query}":
+GENAI_MODEL = "gemini-2.0-flash"
+
+def build_prompt(search_results, query):
+    return f"""Analyze these SHL assessment results for query "{query}":
 {search_results}
 
 The test types mean this:
@@ -73,11 +56,53 @@ Provide:
 3. Recommended job levels
 4. Usage recommendations"""
 
+def get_genai_response(client, search_results, query, cache=None):
+    if not client:
+        return "GenAI client not available."
+    
+    prompt = build_prompt(search_results, query)
+    key = cache.make_key(prompt, GENAI_MODEL) if cache else None
+    if cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
     try:
+        start = time.perf_counter()
         response = client.models.generate_content(
-            model="gemini-2.0-flash",
+            model=GENAI_MODEL,
             contents=prompt
         )
-        return response.text if response else "Empty response"
+        if not response:
+            return "Empty response"
+        if cache and response.text:
+            cache.set(key, response.text, GENAI_MODEL, (time.perf_counter() - start) * 1000)
+        return response.text
     except Exception as e:
         return f"Error: {str(e)}"
+
+def stream_genai_response(client, search_results, query, cache=None):
+    prompt = build_prompt(search_results, query)
+    key = cache.make_key(prompt, GENAI_MODEL) if cache else None
+    if cache:
+        cached = cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+    start = time.perf_counter()
+    models = client.models
+    if hasattr(models, "generate_content_stream"):
+        chunks = []
+        for chunk in models.generate_content_stream(model=GENAI_MODEL, contents=prompt):
+            if chunk and chunk.text:
+                chunks.append(chunk.text)
+                yield chunk.text
+        text = "".join(chunks)
+    else:
+        response = models.generate_content(model=GENAI_MODEL, contents=prompt)
+        text = response.text if response else ""
+        yield text or "Empty response"
+
+    if cache and text:
+        cache.set(key, text, GENAI_MODEL, (time.perf_counter() - start) * 1000)
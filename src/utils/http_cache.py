@@ -0,0 +1,36 @@
+import hashlib
+import json
+from typing import Optional
+
+
+def entity_digest(*parts) -> str:
+    """Stable hash of everything a response body depends on"""
+    key = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=repr)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+def etag(digest: str, encoding: Optional[str] = None, weak: bool = False) -> str:
+    # Each content coding is its own representation, so compressed bodies get their own tag
+    tag = f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+    return f'W/{tag}' if weak else tag
+
+
+def if_none_match(header: Optional[str], digest: str, weak: bool = False) -> Optional[str]:
+    """The client's tag that matches digest (in any content coding) and is as weak as ours, or None"""
+    if not header:
+        return None
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return etag(digest, weak=weak)
+        # A weak tag never revalidates a strong response, nor a strong tag a weak one
+        if candidate.startswith('W/') != weak:
+            continue
+        opaque = candidate[2:] if weak else candidate
+        if opaque.strip('"').partition('-')[0] == digest:
+            return candidate
+    return None
+
+
+def cache_control(max_age: int) -> str:
+    return f'public, max-age={max_age}' if max_age > 0 else 'no-cache'
@@ -0,0 +1,161 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar('request_timings', default=None)
+_NOOP = nullcontext()
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: Tuple[Tuple[str, str], ...], extra: str = '') -> str:
+    parts = [f'{k}="{v}"' for k, v in key]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class Metrics:
+    """Thread-safe counters and cumulative histograms rendered in the Prometheus text format"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[tuple, float]] = {}
+        self._buckets: Dict[str, Sequence[float]] = {}
+        self._histograms: Dict[str, Dict[tuple, list]] = {}
+
+    def counter(self, name: str, help: str):
+        self._meta[name] = ('counter', help)
+        self._counters.setdefault(name, {})
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self._meta[name] = ('histogram', help)
+        self._buckets[name] = tuple(buckets)
+        self._histograms.setdefault(name, {})
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0.0) + value
+
+    def set_total(self, name: str, value: float, **labels):
+        """Publish a counter that is tracked elsewhere (e.g. cache hit totals)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name][_label_key(labels)] = float(value)
+
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        buckets = self._buckets[name]
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms[name].get(key)
+            if series is None:
+                series = self._histograms[name][key] = [[0] * len(buckets), 0.0, 0]
+            index = bisect_left(buckets, value)
+            if index < len(buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, (kind, help) in self._meta.items():
+                lines.append(f'# HELP {name} {help}')
+                lines.append(f'# TYPE {name} {kind}')
+                if kind == 'counter':
+                    for key, value in self._counters[name].items():
+                        lines.append(f'{name}{_format_labels(key)} {value:g}')
+                    continue
+                buckets = self._buckets[name]
+                bounds = [f'le="{bound:g}"' for bound in buckets] + ['le="+Inf"']
+                for key, (counts, total, count) in self._histograms[name].items():
+                    cumulative = 0
+                    for bound, bucket_count in zip(bounds, counts):
+                        cumulative += bucket_count
+                        lines.append(f'{name}_bucket{_format_labels(key, bound)} {cumulative}')
+                    lines.append(f'{name}_bucket{_format_labels(key, bounds[-1])} {count}')
+                    lines.append(f'{name}_sum{_format_labels(key)} {total:.6f}')
+                    lines.append(f'{name}_count{_format_labels(key)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics(enabled=os.getenv("METRICS_ENABLED", "1") != "0")
+metrics.counter('shl_requests_total', "HTTP requests by route and status code")
+metrics.counter('shl_errors_total', "HTTP requests that ended in a 5xx response")
+metrics.counter('shl_cache_hits_total', "Cache hits by cache")
+metrics.counter('shl_cache_misses_total', "Cache misses by cache")
+metrics.histogram('shl_request_seconds', "HTTP request latency by route")
+metrics.histogram('shl_stage_seconds', "Latency of each search stage")
+metrics.histogram('shl_search_batch_size', "Queries per coalesced search batch", BATCH_BUCKETS)
+
+
+class _Stage:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        metrics.observe('shl_stage_seconds', elapsed, stage=self.name)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[self.name] = timings.get(self.name, 0.0) + elapsed
+        return False
+
+
+def stage(name: str):
+    """Time a block into the stage histogram and the current request's Server-Timing"""
+    return _Stage(name) if metrics.enabled else _NOOP
+
+
+def start_request() -> Dict[str, float]:
+    timings: Dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def current_timings() -> Optional[Dict[str, float]]:
+    return _request_timings.get()
+
+
+def run_with_timings(fn: Callable, *args, **kwargs) -> Tuple[Any, Dict[str, float]]:
+    """Call fn with a fresh stage-timing scope (e.g. on an executor thread) and return its timings"""
+    timings: Dict[str, float] = {}
+    token = _request_timings.set(timings)
+    try:
+        return fn(*args, **kwargs), timings
+    finally:
+        _request_timings.reset(token)
+
+
+def merge_timings(target: Optional[Dict[str, float]], timings: Dict[str, float]):
+    if target is not None:
+        for name, seconds in timings.items():
+            target[name] = target.get(name, 0.0) + seconds
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    return ', '.join(f'{name};dur={seconds * 1000:.2f}' for name, seconds in timings.items())
@@ -0,0 +1,107 @@
+import gzip
+import json
+from collections.abc import Mapping
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.embeddings.product_store import ResultView, json_default
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SCORE_FIELDS = ('similarity_score', 'lexical_score', 'fusion_score', 'rerank_score')
+COMPACT_FIELDS = ('url',) + SCORE_FIELDS
+GZIP_LEVEL = 6
+# Quality 4 keeps brotli in the same time budget as gzip -6 for per-request compression
+BROTLI_QUALITY = 4
+
+
+def parse_fields(fields: Optional[Sequence[str]]) -> Optional[List[str]]:
+    """Field names from repeated and/or comma-separated values; None keeps every field"""
+    if not fields:
+        return None
+    names = [name.strip() for item in fields for name in item.split(',') if name.strip()]
+    return list(dict.fromkeys(names)) or None
+
+
+def project_result(result: Mapping, fields: Sequence[str]) -> Dict[str, Any]:
+    # Reads only the requested keys, so a product view never decodes the fields left out
+    if isinstance(result, ResultView):
+        return result.project(fields)
+    return {field: result[field] for field in fields if field in result}
+
+
+def project_results(results: List[Mapping], fields: Optional[Sequence[str]] = None,
+                    compact: bool = False) -> List:
+    """Results cut down to `fields`, or to the url and scores when compact; unchanged otherwise"""
+    if compact:
+        fields = COMPACT_FIELDS
+    if not fields:
+        return results
+    return [project_result(result, fields) for result in results]
+
+
+def stdlib_dumps(content: Any) -> bytes:
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(',', ':'),
+                      default=json_default).encode('utf-8')
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(content, default=json_default)
+    return stdlib_dumps(content)
+
+
+def available_encodings() -> Tuple[str, ...]:
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encoding: Optional[str], available: Sequence[str] = None) -> Optional[str]:
+    """Best content coding both sides support, by q-value and then by the order of `available`"""
+    if not accept_encoding:
+        return None
+    available = available_encodings() if available is None else available
+    weights = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name.strip().lower()] = q
+
+    best, best_q = None, 0.0
+    for name in available:
+        q = weights.get(name, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported content coding '{encoding}'")
+
+
+def encode_body(body: bytes, accept_encoding: Optional[str], min_bytes: int) -> Tuple[bytes, Optional[str]]:
+    """(body, content coding) — bodies under min_bytes are sent as they are"""
+    if len(body) < min_bytes:
+        return body, None
+    encoding = negotiate_encoding(accept_encoding)
+    if encoding is None:
+        return body, None
+    return compress(body, encoding), encoding
@@ -0,0 +1,59 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+
+class BackgroundLoader:
+    """Builds a resource on a background thread and records how long each startup phase took"""
+
+    def __init__(self, load: Callable[['BackgroundLoader'], Any]):
+        self._load = load
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.value: Any = None
+        self.error: Optional[str] = None
+        self.phase_name = "pending"
+        self.timings: Dict[str, float] = {}
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="startup", daemon=True)
+            self._thread.start()
+
+    @contextmanager
+    def phase(self, name: str):
+        self.phase_name = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[f"{name}_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            self.value = self._load(self)
+            self.phase_name = "ready"
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.phase_name = "failed"
+        finally:
+            self.timings["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            self._done.set()
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set() and self.error is None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        self._done.wait(timeout)
+        return self.ready
+
+    def status(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "phase": self.phase_name,
+            "error": self.error,
+            "timings": dict(self.timings),
+        }